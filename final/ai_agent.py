@@ -1,44 +1,414 @@
-import pandas as pd
+import os
+import math
+import time
 import random
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
 from sklearn.linear_model import Ridge # 假設我們在 ml_models.py 中用了這個模型
+from draft_pool import DraftPool
+from roster_slots import RosterSlots, POSITION_COLUMN
+
+# MCTS 預設參數
+MCTS_TIME_BUDGET = 0.2 # 每次選秀的思考時間 (秒)
+MCTS_MAX_WORKERS = 2 # 平行搜尋的行程數上限 (所有 session 與背景執行緒共用同一個行程池)
+MCTS_RESULT_GRACE = 0.05 # 等待平行搜尋結果的額外時間 (秒)；逾時的 worker 結果直接捨棄
+MCTS_CANDIDATES = 8 # 每個決策點只展開分數前 N 名的球員
+MCTS_EXPLORATION = 0.7 # UCT 探索係數
+OPPONENT_TOP = 3 # 對手模型：從前 N 名中挑選
+OPPONENT_NOISE = 0.3 # 對手模型：不選第一名的機率
+
+def _as_pool(available_for_ai):
+    """
+    Accepts either a DraftPool or (for older callers) a DataFrame of available players.
+    """
+    if isinstance(available_for_ai, pd.DataFrame):
+        return DraftPool(available_for_ai)
+    return available_for_ai
+
+def _as_roster_slots(roster_slots):
+    if roster_slots is None or isinstance(roster_slots, RosterSlots):
+        return roster_slots
+    return RosterSlots(roster_slots)
+
+def _position_masks(pool, position_column):
+    """
+    Eligibility masks of the pool's players in slot order (see roster_slots).
+    """
+    if position_column not in pool.frame.columns:
+        raise KeyError(f"Roster slots need the '{position_column}' column (see roster_slots.add_position_columns).")
+    return pool.frame[position_column].to_numpy(dtype=np.int64)
+
+def _fitting_players(pool, roster_slots, roster, position_column=POSITION_COLUMN):
+    """
+    Bool array (slot order) of the players `roster` can still add without being unable to
+    fill `roster_slots`, or None when there are no roster constraints.
+    """
+    roster_slots = _as_roster_slots(roster_slots)
+    if roster_slots is None:
+        return None
+    masks = _position_masks(pool, position_column)
+    state = roster_slots.state(masks[[pool.slot(player_id) for player_id in roster or []]])
+    return state.allowed_types()[masks]
 
-def ai_pick_easy(available_for_ai):
+def ai_pick_easy(available_for_ai, score_column='fantasy_score', roster_slots=None, roster=None,
+                 position_column=POSITION_COLUMN):
     """
     EASY AI: Picks the player with the highest actual 'fantasy_score'.
+    With `roster_slots` (slot names or a RosterSlots), only players the AI's `roster` can
+    still fit are considered.
     """
-    # 選擇實際分數最高的球員
-    best_player = available_for_ai.sort_values(by='fantasy_score', ascending=False).iloc[0]
-    return best_player.name # name of the Series/row is the player_id (index)
+    pool = _as_pool(available_for_ai)
+    # 選擇實際分數最高的球員 (排名索引已建好，只需移動游標跳過已選球員)
+    return pool.best_available(score_column, _fitting_players(pool, roster_slots, roster, position_column)) # player_id
 
-def ai_pick_medium(available_for_ai, draft_model):
+def ai_pick_medium(available_for_ai, draft_model, score_column='pred_score', roster_slots=None, roster=None,
+                   position_column=POSITION_COLUMN):
     """
     MEDIUM AI: Picks the player with the highest predicted 'pred_score' from the model.
+    Any other score registered on the pool can be used through `score_column`.
+    Roster constraints work as in ai_pick_easy.
     """
+    pool = _as_pool(available_for_ai)
     # 確保預測分數欄位存在
-    if 'pred_score' not in available_for_ai.columns:
+    if score_column not in pool.score_columns:
         # 如果沒有預測分數，降級到 Easy 邏輯
-        print("Warning: 'pred_score' missing for MEDIUM AI. Falling back to EASY pick.")
-        return ai_pick_easy(available_for_ai)
+        print(f"Warning: '{score_column}' missing for MEDIUM AI. Falling back to EASY pick.")
+        return ai_pick_easy(pool, roster_slots=roster_slots, roster=roster, position_column=position_column)
         
     # 選擇預測分數最高的球員
-    best_player = available_for_ai.sort_values(by='pred_score', ascending=False).iloc[0]
-    return best_player.name # player_id
+    return pool.best_available(score_column, _fitting_players(pool, roster_slots, roster, position_column)) # player_id
 
-def ai_pick_hard(available_for_ai, draft_model):
+def ai_pick_hard(available_for_ai, draft_model, score_column='pred_score', rng=None,
+                 schedule=None, pick_num=None, team=None, rosters=None,
+                 time_budget=MCTS_TIME_BUDGET, n_workers=None, std_column='pred_std',
+                 roster_slots=None, position_column=POSITION_COLUMN, order_column=None, iterations=None):
     """
-    HARD AI: Picks a player with a high predicted 'pred_score', 
-    but introduces a slight randomness to simulate different strategies/sleepers.
-    
-    Strategy: Pick a player from the top 5 predicted scores.
+    HARD AI: Monte Carlo Tree Search over the rest of the draft.
+
+    When the draft context is given (schedule, pick_num, team, rosters), the AI searches for
+    `time_budget` seconds (or exactly `iterations` iterations, reproducibly), modelling the opponents' future picks and judging finished drafts
+    the way simulate_match does (roster totals of `score_column`). If the player table has a
+    `std_column` (pred_std), the search is risk-aware. See ai_pick_mcts.
+
+    Without a draft context it falls back to the old strategy: pick a player from the
+    top 5 predicted scores, with a slight randomness to simulate sleepers.
+    `rng` (a random.Random) makes the choice reproducible; defaults to the global random module.
+    With `roster_slots`, every team (in the search, opponents too) only drafts players its
+    roster can still fit. `order_column` (e.g. 'vorp' from vorp.VorpEngine.register) ranks the
+    candidates instead of `score_column`.
     """
-    if 'pred_score' not in available_for_ai.columns:
-        print("Warning: 'pred_score' missing for HARD AI. Falling back to EASY pick.")
-        return ai_pick_easy(available_for_ai)
+    pool = _as_pool(available_for_ai)
+    roster = rosters[team] if rosters is not None and team is not None else None
+    if score_column not in pool.score_columns:
+        print(f"Warning: '{score_column}' missing for HARD AI. Falling back to EASY pick.")
+        return ai_pick_easy(pool, roster_slots=roster_slots, roster=roster, position_column=position_column)
+
+    if schedule is not None and pick_num is not None and team is not None and rosters is not None:
+        return ai_pick_mcts(pool, schedule, pick_num, team, rosters, score_column=score_column,
+                            time_budget=time_budget, n_workers=n_workers, iterations=iterations,
+                            seed=None if rng is None else rng.getrandbits(32), std_column=std_column,
+                            roster_slots=roster_slots, position_column=position_column,
+                            order_column=order_column)
     
-    # 選擇前 5 名預測分數的球員
-    top_players = available_for_ai.sort_values(by='pred_score', ascending=False).head(5)
+    # 選擇前 5 名預測分數的球員 (部分選取，不做全排序)
+    top_players = pool.top_k(order_column or score_column, 5, _fitting_players(pool, roster_slots, roster, position_column))
+    if not top_players:
+        return None
     
     # 隨機從這前 5 名中挑選一位
-    selected_player = random.choice(top_players.index.tolist())
+    selected_player = (rng or random).choice(top_players)
     
-    return selected_player
\ No newline at end of file
+    return selected_player
+
+# ----------------------------------------------------
+# MCTS (Monte Carlo Tree Search)
+# ----------------------------------------------------
+
+def _top_available(order, drafted, k, types=None, blocked=0):
+    """
+    First k slots of `order` that are not set in the `drafted` bitmask. With per-slot
+    eligibility `types`, slots whose type bit is set in `blocked` (see RosterState) are skipped.
+    """
+    result = []
+    for slot in order:
+        if not (drafted >> slot) & 1 and not (types is not None and (blocked >> types[slot]) & 1):
+            result.append(slot)
+            if len(result) == k:
+                break
+    return result
+
+def _opponent_pick(order, drafted, rng, types=None, blocked=0):
+    """
+    Opponent model: usually the best available player, sometimes one of the next few.
+    """
+    top = _top_available(order, drafted, OPPONENT_TOP, types, blocked)
+    if not top:
+        return None
+    if len(top) > 1 and rng.random() < OPPONENT_NOISE:
+        return rng.choice(top[1:])
+    return top[0]
+
+def _reward(totals, team, variances=None, rng=None):
+    """
+    1 for a win, 0.5 for a shared top score, 0 for a loss (same rule as simulate_match).
+
+    With per-team `variances` (sums of pred_std² over each roster) the totals are first drawn
+    from N(total, variance), so the search values each roster by its chance of winning rather
+    than its expected score: high-ceiling players look better when behind, safe ones when ahead.
+    """
+    if variances is not None:
+        totals = [t + rng.gauss(0.0, math.sqrt(v)) if v > 0 else t for t, v in zip(totals, variances)]
+    own = totals[team]
+    best_other = max(t for i, t in enumerate(totals) if i != team)
+    if own > best_other:
+        return 1.0
+    if own == best_other:
+        return 0.5
+    return 0.0
+
+def _mcts_search(scores, order, opponent_order, teams, pick_num, team, drafted, own, totals,
+                 time_budget, seed, variances=None, team_variances=None, n_candidates=MCTS_CANDIDATES,
+                 types=None, team_states=None, max_iterations=None):
+    """
+    Runs MCTS from our turn at `pick_num` until the time budget is spent, or for exactly
+    `max_iterations` iterations when given (the result then only depends on the seed).
+
+    Only our own picks are tree decisions; opponent picks are sampled from the opponent model
+    (open-loop search). Nodes live in a transposition table keyed by the drafted-set bitmask
+    together with the bitmask of our own roster, so the same position reached through a
+    different pick order shares statistics.
+
+    `variances` (per slot) and `team_variances` (per team, for players already drafted) make
+    the rewards risk-aware; see _reward. `types` (eligibility mask per slot) and `team_states`
+    (a RosterState per team) restrict every team to players its roster can still fit.
+
+    Returns:
+        dict: root candidate slot -> [visits, total reward].
+    """
+    rng = random.Random(seed)
+    table = {}
+    total_picks = len(teams)
+    deadline = time.perf_counter() + time_budget
+
+    def blocked(states, t):
+        return states[t].blocked if states is not None else 0
+
+    def copy_states(states):
+        return [state.copy() for state in states] if states is not None else None
+
+    def new_node(drafted_mask, states):
+        candidates = _top_available(order, drafted_mask, n_candidates, types, blocked(states, team))
+        return {"visits": 0, "stats": {slot: [0, 0.0] for slot in candidates}}
+
+    def rollout(drafted_mask, team_totals, team_vars, states, p):
+        team_totals = list(team_totals)
+        team_vars = list(team_vars) if team_vars is not None else None
+        states = copy_states(states)
+        while p < total_picks:
+            t = teams[p]
+            if t == team:
+                picked = _top_available(order, drafted_mask, 1, types, blocked(states, t))
+                slot = picked[0] if picked else None
+            else:
+                slot = _opponent_pick(opponent_order, drafted_mask, rng, types, blocked(states, t))
+            if slot is None:
+                break
+            drafted_mask |= 1 << slot
+            team_totals[t] += scores[slot]
+            if team_vars is not None:
+                team_vars[t] += variances[slot]
+            if states is not None:
+                states[t].add(types[slot])
+            p += 1
+        return _reward(team_totals, team, team_vars, rng)
+
+    root = new_node(drafted, team_states)
+    table[(drafted, own)] = root
+    if len(root["stats"]) <= 1:
+        return root["stats"]
+
+    iterations = 0
+    while (iterations < max_iterations if max_iterations is not None
+           else iterations == 0 or time.perf_counter() < deadline):
+        iterations += 1
+        drafted_mask, own_mask, team_totals, p = drafted, own, list(totals), pick_num
+        team_vars = list(team_variances) if variances is not None else None
+        states = copy_states(team_states)
+        path = []
+        reward = None
+        while p < total_picks:
+            t = teams[p]
+            if t != team:
+                slot = _opponent_pick(opponent_order, drafted_mask, rng, types, blocked(states, t))
+                if slot is None:
+                    break
+                drafted_mask |= 1 << slot
+                team_totals[t] += scores[slot]
+                if team_vars is not None:
+                    team_vars[t] += variances[slot]
+                if states is not None:
+                    states[t].add(types[slot])
+                p += 1
+                continue
+
+            key = (drafted_mask, own_mask)
+            node = table.get(key)
+            if node is None:
+                node = table[key] = new_node(drafted_mask, states)
+                reward = rollout(drafted_mask, team_totals, team_vars, states, p)
+                node["visits"] += 1
+                break
+
+            stats = node["stats"]
+            if not stats:
+                break
+            # UCT: untried moves first, then mean reward + exploration bonus
+            log_visits = math.log(node["visits"] + 1)
+            slot = max(stats, key=lambda s: float("inf") if stats[s][0] == 0 else
+                       stats[s][1] / stats[s][0] + MCTS_EXPLORATION * math.sqrt(log_visits / stats[s][0]))
+            path.append((node, slot))
+            drafted_mask |= 1 << slot
+            own_mask |= 1 << slot
+            team_totals[t] += scores[slot]
+            if team_vars is not None:
+                team_vars[t] += variances[slot]
+            if states is not None:
+                states[t].add(types[slot])
+            p += 1
+
+        if reward is None:
+            reward = _reward(team_totals, team, team_vars, rng)
+        for node, slot in path:
+            node["visits"] += 1
+            node["stats"][slot][0] += 1
+            node["stats"][slot][1] += reward
+
+    return root["stats"]
+
+def _mcts_worker(args, seed, options):
+    return _mcts_search(*args, seed, **options)
+
+_mcts_executor = None
+_mcts_executor_lock = threading.Lock()
+
+def _get_mcts_executor():
+    """
+    Process pool for parallel rollouts, created on first use and reused across picks
+    (and across threads, e.g. speculative searches), with at most MCTS_MAX_WORKERS processes.
+    Workers are spawned, not forked, since the caller may be a threaded server.
+    """
+    global _mcts_executor
+    with _mcts_executor_lock:
+        if _mcts_executor is None:
+            _mcts_executor = ProcessPoolExecutor(max_workers=MCTS_MAX_WORKERS,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(_mcts_executor.shutdown, wait=False, cancel_futures=True)
+    return _mcts_executor
+
+def ai_pick_mcts(pool, schedule, pick_num, team, rosters, score_column='pred_score', opponent_column=None,
+                 time_budget=MCTS_TIME_BUDGET, n_workers=None, seed=None, std_column='pred_std',
+                 roster_slots=None, position_column=POSITION_COLUMN, order_column=None, iterations=None):
+    """
+    Picks a player with Monte Carlo Tree Search.
+
+    Args:
+        pool (DraftPool): Current pool (drafted players already marked).
+        schedule (DraftSchedule): Pick order of the draft.
+        pick_num (int): The 0-based overall pick being made (must belong to `team`).
+        team (int): The AI's team index in `schedule`.
+        rosters (list[list]): Player ids drafted so far by each team.
+        score_column: Score the finished rosters are judged by (as in simulate_match).
+        opponent_column: Score the opponent model drafts by (defaults to `order_column`).
+        time_budget (float): Wall-clock seconds to think. The choice then depends on machine
+            load, so the same seed can give different picks.
+        n_workers (int): Extra processes running independent searches from the same root
+            (root parallelization); their visit counts are merged. Default and maximum:
+            MCTS_MAX_WORKERS (capped by CPU count - 1). 0 searches in this process only.
+            A worker whose result is not back by the end of the budget is ignored.
+        iterations (int): Run exactly this many iterations in this process instead of
+            using the time budget and workers, so the pick only depends on `seed`.
+        std_column: Column of the pool's frame with the uncertainty of `score_column`
+            (e.g. pred_std from BootstrapRidge). When present, the search maximises the chance
+            of winning under that uncertainty instead of the expected score. None disables it.
+        roster_slots: Slot names or a RosterSlots shared by all teams. The search then only
+            considers picks that keep each roster fillable (using the eligibility masks in
+            `position_column`). None drafts without positions.
+        order_column: Score that decides which players are expanded and drafted in rollouts
+            (defaults to `score_column`), e.g. 'vorp' so scarce positions are considered
+            before the same raw score at a deep position. Rewards still use `score_column`.
+
+    Returns:
+        The chosen player_id (the most visited root candidate).
+    """
+    order_column = order_column or score_column
+    opponent_column = opponent_column or order_column
+    scores = pool.scores(score_column).tolist()
+    order = pool.ranking(order_column).full_order().tolist()
+    opponent_order = pool.ranking(opponent_column).full_order().tolist()
+
+    variances = None
+    if std_column is not None and std_column in pool.frame.columns:
+        std = pool.frame[std_column].to_numpy(dtype=np.float64, na_value=0.0)
+        variances = (std * std).tolist()
+
+    totals = [0.0] * schedule.num_teams
+    team_variances = [0.0] * schedule.num_teams
+    own = 0
+    for t, roster in enumerate(rosters):
+        for player_id in roster:
+            slot = pool.slot(player_id)
+            totals[t] += scores[slot]
+            if variances is not None:
+                team_variances[t] += variances[slot]
+            if t == team:
+                own |= 1 << slot
+
+    options = {}
+    if variances is not None:
+        options.update(variances=variances, team_variances=team_variances)
+    roster_slots = _as_roster_slots(roster_slots)
+    if roster_slots is not None:
+        masks = _position_masks(pool, position_column)
+        options.update(types=masks.tolist(),
+                       team_states=[roster_slots.state(masks[[pool.slot(p) for p in roster]]) for roster in rosters])
+
+    teams = schedule.order.tolist()
+    if seed is None:
+        seed = random.getrandbits(32)
+    args = (scores, order, opponent_order, teams, pick_num, team, pool.drafted_bitmask(), own, totals, time_budget)
+
+    if iterations is not None:
+        n_workers = 0
+        options['max_iterations'] = iterations
+    n_workers = min(MCTS_MAX_WORKERS, (os.cpu_count() or 1) - 1, MCTS_MAX_WORKERS if n_workers is None else n_workers)
+    deadline = time.perf_counter() + time_budget + MCTS_RESULT_GRACE
+
+    futures = []
+    if n_workers > 0:
+        try:
+            executor = _get_mcts_executor()
+            futures = [executor.submit(_mcts_worker, args, seed + 1 + i, options) for i in range(n_workers)]
+        except Exception as e:
+            print(f"Warning: Could not start parallel MCTS ({e}). Searching in-process only.")
+
+    merged = _mcts_search(*args, seed, **options)
+    for future in futures:
+        try:
+            # 只等到思考時間結束；行程池忙碌 (其他 session 或背景搜尋) 而趕不上的 worker 直接捨棄
+            result = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+        except Exception:
+            future.cancel() # 還在排隊時不再執行；已在執行的會自行在時間預算內結束
+            continue # 某個 worker 失敗或逾時時，仍可用其他搜尋結果
+        for slot, (visits, total) in result.items():
+            merged.setdefault(slot, [0, 0.0])
+            merged[slot][0] += visits
+            merged[slot][1] += total
+
+    if not merged:
+        return ai_pick_easy(pool, score_column, roster_slots, rosters[team], position_column)
+    best_slot = max(merged, key=lambda s: (merged[s][0], merged[s][1]))
+    return pool.id_of(best_slot)
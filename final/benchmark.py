@@ -0,0 +1,238 @@
+"""
+Benchmark of candidate projection models for pred_score.
+
+Runs each regressor on the create_ml_features matrix and measures:
+- fit time on the full data (best of `repeats`)
+- predict latency per 1,000 players
+- peak resident memory (RSS) during fit + predict, measured in a fresh child process so native
+  allocations (BLAS, sklearn's compiled code, joblib threads) are counted too; both the
+  absolute peak and the growth over the child's RSS before fitting are reported (Unix only;
+  null on Windows, see _measure_peak_rss)
+- K-fold cross-validated RMSE / MAE / R²
+
+and writes a JSON report, so the choice of projection model rests on measured
+latency vs. accuracy instead of habit.
+
+Usage:
+    python benchmark.py --data NBA_PlayerStats_202425.csv --output benchmark_report.json
+"""
+import os
+import sys
+import json
+import time
+import platform
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import sklearn
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
+from sklearn.linear_model import Ridge
+from sklearn.model_selection import KFold
+from sklearn.neighbors import KNeighborsRegressor
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from ml_models import RidgeSolver, RIDGE_ALPHAS
+
+class ClosedFormRidge:
+    """
+    fit/predict adapter around RidgeSolver (alpha chosen by analytic LOO, as in train_draft_model).
+    """
+
+    def __init__(self, alphas=RIDGE_ALPHAS):
+        self.alphas = alphas
+
+    def fit(self, X, y):
+        solver = RidgeSolver(X)
+        alpha, cv_results = solver.select_alpha(y, self.alphas)
+        self.model_ = solver.fit(y, alpha, cv_results)
+        return self
+
+    def predict(self, X):
+        return self.model_.predict(X)
+
+# Candidate factories; each call returns a fresh unfitted model
+CANDIDATES = {
+    "ridge_closed_form": lambda: ClosedFormRidge(),
+    "ridge_sklearn": lambda: Ridge(alpha=1.0),
+    "random_forest": lambda: RandomForestRegressor(n_estimators=200, random_state=42, n_jobs=-1),
+    "hist_gradient_boosting": lambda: HistGradientBoostingRegressor(random_state=42),
+    "knn": lambda: make_pipeline(StandardScaler(), KNeighborsRegressor(n_neighbors=10, weights="distance")),
+}
+
+def _predict_latency(model, X, n_rows=1000, repeats=3):
+    """
+    Seconds to predict 1,000 players (the feature rows are tiled up to n_rows).
+    """
+    rows = np.resize(np.arange(len(X)), max(n_rows, len(X)))
+    X_batch = X[rows]
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(X_batch)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000 / len(X_batch)
+
+def _max_rss_mb():
+    """
+    Peak RSS of this process and of its finished children (e.g. joblib workers), in MB.
+    """
+    import resource
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * unit / 2**20
+
+def _proc_status_mb(field):
+    with open("/proc/self/status", encoding="ascii") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024 # kB
+    raise OSError(f"{field} not in /proc/self/status")
+
+def _reset_peak_rss():
+    """
+    Resets the kernel's peak-RSS counter (VmHWM; Linux >= 4.0). False where unsupported.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        _proc_status_mb("VmHWM")
+        return True
+    except OSError:
+        return False
+
+def _measure_peak_rss(name, X, y):
+    """
+    Runs in a fresh child process: fits and predicts candidate `name`, returning
+    (peak RSS, peak RSS - RSS before fitting) in MB.
+
+    On Linux the peak counter is reset right before fitting, so the transient peak of
+    importing the libraries does not hide the model's own. Elsewhere the lifetime peak
+    (ru_maxrss) is used, and the growth can then read 0 for models smaller than that.
+    """
+    if _reset_peak_rss():
+        before = _proc_status_mb("VmRSS")
+        CANDIDATES[name]().fit(X, y).predict(X)
+        peak = _proc_status_mb("VmHWM")
+        return peak, peak - before
+    before = _max_rss_mb()
+    CANDIDATES[name]().fit(X, y).predict(X)
+    peak = _max_rss_mb()
+    return peak, peak - before
+
+def _peak_rss(name, X, y):
+    """
+    (peak_rss_mb, rss_growth_mb) of one fit + predict, or (None, None) where RSS cannot be
+    measured.
+    """
+    try:
+        import resource # noqa: F401  (Unix only)
+    except ImportError:
+        return None, None
+    # A spawned process starts with nothing else allocated, so its peak belongs to this model
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(_measure_peak_rss, name, X, y).result()
+
+def _cross_validate(factory, X, y, folds, seed):
+    predictions = np.empty_like(y)
+    for train, test in KFold(n_splits=folds, shuffle=True, random_state=seed).split(X):
+        predictions[test] = factory().fit(X[train], y[train]).predict(X[test])
+    errors = predictions - y
+    total = ((y - y.mean()) ** 2).sum()
+    return {
+        "cv_rmse": float(np.sqrt((errors ** 2).mean())),
+        "cv_mae": float(np.abs(errors).mean()),
+        "cv_r2": float(1 - (errors ** 2).sum() / total) if total > 0 else 0.0,
+    }
+
+def benchmark_model(name, X, y, folds=5, repeats=3, seed=42):
+    """
+    Measures one candidate, looked up by `name` in CANDIDATES (the name is also what the
+    memory run passes to its child process). X and y are float64 NumPy arrays.
+    """
+    factory = CANDIDATES[name]
+    fit_time = np.inf
+    for _ in range(repeats):
+        model = factory()
+        start = time.perf_counter()
+        model.fit(X, y)
+        fit_time = min(fit_time, time.perf_counter() - start)
+
+    peak_rss, rss_growth = _peak_rss(name, X, y)
+    result = {
+        "model": name,
+        "fit_time_s": fit_time,
+        "predict_s_per_1k": _predict_latency(model, X),
+        "peak_rss_mb": peak_rss,
+        "rss_growth_mb": rss_growth,
+    }
+    result.update(_cross_validate(factory, X, y, folds, seed))
+    return result
+
+def run_benchmark(X, y, models=None, folds=5, repeats=3, seed=42):
+    """
+    Benchmarks the named candidates (all of CANDIDATES by default) and returns the report dict.
+
+    Args:
+        X: Feature matrix from create_ml_features.
+        y: Target (fantasy_score).
+    """
+    names = list(models or CANDIDATES)
+    unknown = [name for name in names if name not in CANDIDATES]
+    if unknown:
+        raise ValueError(f"Unknown model(s): {', '.join(unknown)}. Choose from: {', '.join(CANDIDATES)}")
+
+    features = list(getattr(X, "columns", []))
+    X = np.ascontiguousarray(np.asarray(X, dtype=np.float64))
+    y = np.asarray(y, dtype=np.float64)
+    results = [benchmark_model(name, X, y, folds, repeats, seed) for name in names]
+    return {
+        "dataset": {"n_players": X.shape[0], "n_features": X.shape[1], "features": features},
+        "settings": {"folds": folds, "repeats": repeats, "seed": seed},
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "sklearn": sklearn.__version__,
+            "cpu_count": os.cpu_count(),
+            "platform": sys.platform,
+        },
+        "results": results,
+    }
+
+def format_report(report):
+    def mb(value):
+        return "n/a" if value is None else f"{value:.1f}"
+
+    lines = [f"{'model':<24}{'fit (s)':>10}{'pred/1k (ms)':>14}{'peak RSS (MB)':>15}{'+RSS (MB)':>11}"
+             f"{'CV RMSE':>10}{'CV R2':>8}"]
+    for row in report["results"]:
+        lines.append(
+            f"{row['model']:<24}{row['fit_time_s']:>10.4f}{row['predict_s_per_1k'] * 1000:>14.3f}"
+            f"{mb(row['peak_rss_mb']):>15}{mb(row['rss_growth_mb']):>11}{row['cv_rmse']:>10.4f}{row['cv_r2']:>8.4f}"
+        )
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    import argparse
+    from data_loader import load_player_data, filter_nba_players
+    from feature_engineering import compute_fantasy_score, create_ml_features
+
+    parser = argparse.ArgumentParser(description="Benchmark projection models for pred_score.")
+    parser.add_argument("--data", default="NBA_PlayerStats_202425.csv")
+    parser.add_argument("--output", default="benchmark_report.json")
+    parser.add_argument("--models", nargs="+", default=None, help=f"subset of: {', '.join(CANDIDATES)}")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    df = compute_fantasy_score(filter_nba_players(load_player_data(args.data)))
+    X, y, _ = create_ml_features(df)
+
+    report = run_benchmark(X, y, args.models, args.folds, args.repeats, args.seed)
+    report["dataset"]["path"] = args.data
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(format_report(report))
+    print(f"\nReport written to {args.output}")
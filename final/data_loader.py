@@ -1,37 +1,251 @@
+import os
+import json
+import queue
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 
-def load_player_data(filepath):
+try:
+    import pyarrow  # noqa: F401 (Feather 需要 pyarrow，沒有時改用 pickle)
+    CACHE_FORMAT = "feather"
+except ImportError:
+    CACHE_FORMAT = "pickle"
+
+# 快取存放在 CSV 同目錄下的 .nba_cache 資料夾
+CACHE_DIR_NAME = ".nba_cache"
+# 載入流程 (欄位處理方式) 改變時遞增，讓舊快取自動失效
+CACHE_VERSION = 2
+
+# 後續流程實際用到的欄位與型別 (欄位名稱為小寫)。
+# compute_fantasy_score / create_ml_features 只需要約 20 欄，其餘的 *_rank 欄位
+# 與重複的 _base/_adv 欄位 (gp_base/gp_adv、fgm_base/fgm_adv...) 不會被讀入。
+PLAYER_SCHEMA = {
+    # 識別欄位
+    "player_id": "int32",
+    "player_name": str,
+    "team_id": "int32",
+    "team_abbreviation": "category",
+    # 基礎數據 (場均)
+    "gp_base": "float32",
+    "min_base": "float32",
+    "fgm_base": "float32",
+    "fga_base": "float32",
+    "fg_pct_base": "float32",
+    "fg3m": "float32",
+    "fg3a": "float32",
+    "fg3_pct": "float32",
+    "ftm": "float32",
+    "fta": "float32",
+    "ft_pct": "float32",
+    "oreb": "float32",
+    "dreb": "float32",
+    "reb": "float32",
+    "ast": "float32",
+    "tov": "float32",
+    "stl": "float32",
+    "blk": "float32",
+    "pts": "float32",
+    "plus_minus": "float32",
+    "dd2": "float32",
+    "td3": "float32",
+}
+
+NBA_TEAMS = {
+    "ATL","BOS","BKN","CHA","CHI","CLE","DAL","DEN","DET",
+    "GSW","HOU","IND","LAC","LAL","MEM","MIA","MIL","MIN",
+    "NOP","NYK","OKC","ORL","PHI","PHX","POR","SAC","SAS",
+    "TOR","UTA","WAS"
+}
+# 篩選後 team_abbreviation 的固定類別，讓每次載入 / 每個串流區塊的 category 型別都相同
+TEAM_DTYPE = pd.CategoricalDtype(sorted(NBA_TEAMS))
+
+def _file_hash(filepath):
+    """
+    計算檔案內容的 SHA-1，只在 size/mtime 不符時才會用到。
+    """
+    digest = hashlib.sha1()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _schema_tag(schema):
+    """
+    將 schema 轉成短標籤，不同 schema 的快取分開存放，互不覆蓋。
+    """
+    if schema is None:
+        return "full"
+    text = json.dumps({col: str(dtype) for col, dtype in schema.items()}, sort_keys=True)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:10]
+
+def _cache_paths(filepath, schema=None):
+    """
+    回傳 (快取資料檔, 快取描述檔) 的路徑。
+    """
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(filepath)), CACHE_DIR_NAME)
+    base = f"{os.path.basename(filepath)}.{_schema_tag(schema)}"
+    return os.path.join(cache_dir, f"{base}.{CACHE_FORMAT}"), os.path.join(cache_dir, f"{base}.meta.json")
+
+def _read_cache(filepath, schema=None):
+    """
+    若快取仍有效則讀取並回傳 DataFrame，否則回傳 None。
+    有效條件：版本與格式一致，且檔案 size + mtime 相同；
+    若 size/mtime 不同但內容 hash 相同 (例如 git checkout 只更新了 mtime)，更新描述檔後沿用快取。
+    """
+    data_path, meta_path = _cache_paths(filepath, schema)
+    if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+        return None
+
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("version") != CACHE_VERSION or meta.get("format") != CACHE_FORMAT:
+        return None
+
+    stat = os.stat(filepath)
+    if meta.get("size") != stat.st_size or meta.get("mtime_ns") != stat.st_mtime_ns:
+        if meta.get("sha1") != _file_hash(filepath):
+            return None
+        meta["size"], meta["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    if CACHE_FORMAT == "feather":
+        return pd.read_feather(data_path).set_index("player_id")
+    return pd.read_pickle(data_path)
+
+def _write_cache(filepath, df, schema=None):
+    """
+    將處理後的 DataFrame 寫入二進位欄式快取 (先寫暫存檔再替換，避免半寫入的快取)。
+    """
+    data_path, meta_path = _cache_paths(filepath, schema)
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+
+    stat = os.stat(filepath)
+    meta = {
+        "version": CACHE_VERSION,
+        "format": CACHE_FORMAT,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha1": _file_hash(filepath),
+    }
+
+    tmp_path = data_path + ".tmp"
+    if CACHE_FORMAT == "feather":
+        df.reset_index().to_feather(tmp_path)
+    else:
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, data_path)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+def _projection(filepath, schema):
+    """
+    依 CSV 標頭把 schema (小寫欄位名) 對應回原始欄位名，回傳 (usecols, dtype, CSV 原本的欄位數)。
+    """
+    header = pd.read_csv(filepath, nrows=0).columns
+    original_names = {c.lower(): c for c in header}
+    usecols = [original_names[col] for col in schema if col in original_names]
+    dtype = {original_names[col]: schema[col] for col in schema if col in original_names}
+    return usecols, dtype, len(header)
+
+def _read_projected_csv(filepath, schema):
+    """
+    只解析 schema 中列出的欄位，並在解析時直接指定型別 (usecols + dtype)。
+    回傳 (DataFrame, CSV 原本的欄位數)。
+    """
+    usecols, dtype, total_columns = _projection(filepath, schema)
+    df = pd.read_csv(filepath, usecols=usecols, dtype=dtype)
+    df.columns = [c.lower() for c in df.columns]
+    return df, total_columns
+
+def _set_player_index(df, first_id=1):
+    """
+    欄位名稱轉小寫並以 player_id 為索引；數據中沒有 player_id 時，依列的順序
+    從 first_id 起編號 (串流時傳入該區塊第一列在檔案中的位置，編號才會與整檔載入一致)。
+    """
+    df.columns = [c.lower() for c in df.columns]
+    if 'player_id' not in df.columns:
+        df.insert(0, 'player_id', range(first_id, first_id + len(df)))
+    df.set_index('player_id', inplace=True)
+    df.index.name = 'player_id'
+    return df
+
+def drop_redundant_columns(df):
+    """
+    移除與 _base 版本內容完全相同的 _adv 欄位 (例如 gp_adv、min_adv)，
+    以及所有 *_rank 排名欄位。只在不使用 schema 讀入完整表格時需要。
+    """
+    redundant = [c for c in df.columns if "_rank" in c]
+    for col in df.columns:
+        if col.endswith("_adv"):
+            base_col = col[:-len("_adv")] + "_base"
+            if base_col in df.columns and df[col].equals(df[base_col]):
+                redundant.append(col)
+    return df.drop(columns=redundant)
+
+def report_memory_usage(df, total_columns):
+    """
+    印出投影後 DataFrame 實際量測的記憶體用量 (memory_usage(deep=True))，並與讀入全部欄位的情況比較。
+    全表沒有真的讀入 (那正是投影要省下的成本)，其大小只是以每格 8 bytes (float64 / 物件指標)
+    推估的數字，字串欄位實際上更大，所以輸出中的全表大小與節省比例都標示為估計值。
+    """
+    used = df.memory_usage(deep=True).sum()
+    full_estimate = len(df) * (total_columns * 8) + df.index.memory_usage()
+    saved = 1 - used / full_estimate if full_estimate else 0.0
+    print(f"Loaded {df.shape[1]}/{total_columns} columns: {used / 1024:.1f} KB measured "
+          f"(full table estimated at ~{full_estimate / 1024:.1f} KB from 8 bytes/cell, "
+          f"estimated saving ~{saved:.0%}).")
+
+def load_player_data(filepath, use_cache=True, schema=PLAYER_SCHEMA):
     """
     載入球員數據並將欄位名稱轉為小寫。
+
+    預設只讀入 PLAYER_SCHEMA 列出的欄位並使用精簡型別 (float32 數據、category 隊伍、int32 id)；
+    傳入 schema=None 則讀入完整表格 (會移除重複的 _adv 與 *_rank 欄位)。
+    第一次讀取某個 CSV 時會在旁邊寫入二進位快取，之後只要檔案未變更就直接讀快取，
+    省去解析 150+ 欄 CSV 的時間。設定 use_cache=False 可強制重新解析。
     """
+    if use_cache:
+        try:
+            cached = _read_cache(filepath, schema)
+            if cached is not None:
+                return cached
+        except FileNotFoundError:
+            pass # CSV 本身不存在，交給下面的錯誤處理
+        except Exception as e:
+            print(f"Warning: Could not read cache for {filepath} ({e}). Re-parsing CSV.")
+
     try:
-        df = pd.read_csv(filepath)
-        df.columns = [c.lower() for c in df.columns]
-        # 為了後續的 join 和查詢，確保 player_id 是索引
-        if 'player_id' in df.columns:
-            df.set_index('player_id', inplace=True)
-            df.index.name = 'player_id'
+        if schema is not None:
+            df, total_columns = _read_projected_csv(filepath, schema)
         else:
-            # 如果數據中沒有 player_id，創建一個
-            df.insert(0, 'player_id', range(1, len(df) + 1))
-            df.set_index('player_id', inplace=True)
-            df.index.name = 'player_id'
-        
-        return df
+            df = pd.read_csv(filepath)
+            df.columns = [c.lower() for c in df.columns]
+            total_columns = df.shape[1]
+            df = drop_redundant_columns(df)
+        # 為了後續的 join 和查詢，確保 player_id 是索引
+        df = _set_player_index(df)
     except FileNotFoundError:
         print(f"Error: File not found at {filepath}. Using an empty DataFrame.")
         return pd.DataFrame()
 
+    report_memory_usage(df, total_columns)
+
+    if use_cache:
+        try:
+            _write_cache(filepath, df, schema)
+        except Exception as e:
+            # 唯讀的部署環境寫不了快取，不影響正常載入
+            print(f"Warning: Could not write cache for {filepath} ({e}).")
+
+    return df
+
 def filter_nba_players(df):
     """
     只篩選出在 NBA 隊伍中的球員數據。
+    category 型別的 team_abbreviation 會改用固定的 TEAM_DTYPE，類別不再依資料而異。
     """
-    NBA_TEAMS = {
-    "ATL","BOS","BKN","CHA","CHI","CLE","DAL","DEN","DET",
-    "GSW","HOU","IND","LAC","LAL","MEM","MIA","MIL","MIN",
-    "NOP","NYK","OKC","ORL","PHI","PHX","POR","SAC","SAS",
-    "TOR","UTA","WAS"
-    }
 
     # 確保 'team_abbreviation' 欄位存在
     if 'team_abbreviation' not in df.columns:
@@ -39,6 +253,8 @@ def filter_nba_players(df):
         return df.copy()
 
     df = df[df['team_abbreviation'].isin(NBA_TEAMS)].copy()
+    if isinstance(df['team_abbreviation'].dtype, pd.CategoricalDtype):
+        df['team_abbreviation'] = df['team_abbreviation'].astype(TEAM_DTYPE)
     return df
 
 def standardize_column_names(df):
@@ -47,4 +263,87 @@ def standardize_column_names(df):
     but for now, just returns the DataFrame as load_player_data handles lowercasing.
     """
     print("Column names standardized to lowercase.")
-    return df
\ No newline at end of file
+    return df
+
+def _iter_file_chunks(filepath, chunksize, schema):
+    """
+    逐塊讀取單一 CSV，每塊都與 load_player_data 相同地轉小寫欄位、設定 (或補上) player_id 索引，
+    再篩選 NBA 球員。
+
+    category 欄位若逐塊推斷，每塊的類別都不同 (無法 concat 或比較)，所以先以字串讀入：
+    team_abbreviation 篩選後轉成固定的 TEAM_DTYPE，其他 category 欄位 (類別集合未知) 保持字串。
+    """
+    category_columns = []
+    if schema is not None:
+        usecols, dtype, _ = _projection(filepath, schema)
+        category_columns = [col for col, kind in dtype.items() if str(kind) == "category"]
+        dtype = {col: (str if col in category_columns else kind) for col, kind in dtype.items()}
+        reader = pd.read_csv(filepath, usecols=usecols, dtype=dtype, chunksize=chunksize)
+    else:
+        reader = pd.read_csv(filepath, chunksize=chunksize)
+    category_columns = [c.lower() for c in category_columns]
+
+    first_id = 1
+    with reader:
+        for chunk in reader:
+            rows = len(chunk)
+            chunk = filter_nba_players(_set_player_index(chunk, first_id))
+            first_id += rows
+            if 'team_abbreviation' in category_columns and 'team_abbreviation' in chunk.columns:
+                chunk['team_abbreviation'] = chunk['team_abbreviation'].astype(TEAM_DTYPE)
+            if not chunk.empty:
+                yield chunk
+
+def iter_player_chunks(filepaths, chunksize=20000, schema=PLAYER_SCHEMA, max_workers=None, max_pending=8):
+    """
+    以串流方式讀取多個賽季的球員 CSV，逐塊產出 (filepath, chunk)。
+
+    每個檔案由執行緒池中的一個 worker 解析，解析好的區塊放進容量為 max_pending 的佇列，
+    所以同時存在記憶體中的區塊數有上限，與檔案數量無關。
+    區塊的產出順序取決於各檔案解析的快慢，不保證依照 filepaths 的順序。
+    """
+    filepaths = list(filepaths)
+    if not filepaths:
+        return
+    if max_workers is None:
+        max_workers = min(len(filepaths), os.cpu_count() or 1)
+
+    chunks = queue.Queue(maxsize=max_pending)
+    stop = threading.Event()
+    done = object() # 每個檔案讀完時放入的結束標記
+
+    def put(item):
+        # 消費端提早停止時不要永遠卡在 put 上
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce(filepath):
+        try:
+            for chunk in _iter_file_chunks(filepath, chunksize, schema):
+                if not put((filepath, chunk)):
+                    return
+        except FileNotFoundError:
+            print(f"Error: File not found at {filepath}. Skipping.")
+        except Exception as e:
+            print(f"Error while reading {filepath}: {e}. Skipping.")
+        finally:
+            put(done)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for filepath in filepaths:
+            executor.submit(produce, filepath)
+        try:
+            remaining = len(filepaths)
+            while remaining:
+                item = chunks.get()
+                if item is done:
+                    remaining -= 1
+                else:
+                    yield item
+        finally:
+            stop.set()
@@ -0,0 +1,187 @@
+"""
+Append-only, compact binary log of draft events.
+
+Every pick is one fixed-size 14-byte record (player id, team, flags, AI seed, milliseconds
+since the draft started). The draft state is never stored: it is rebuilt by replaying the
+log onto an array-backed DraftPool, starting from the nearest periodic snapshot of the
+drafted bitmask. Undo and redo only move a cursor over the records, and a new pick after
+an undo drops the undone tail. The whole log serializes to a few kilobytes even for a
+300-pick draft, so a session can be saved after every pick and resumed later.
+"""
+import os
+import json
+import time
+import struct
+import numpy as np
+
+LOG_MAGIC = b"NDL1"
+LOG_VERSION = 1
+SNAPSHOT_INTERVAL = 32 # a drafted-bitmask snapshot every N events
+
+EVENT_DTYPE = np.dtype([
+    ("player_id", "<i4"),
+    ("team", "u1"),
+    ("flags", "u1"),
+    ("seed", "<u4"),
+    ("time_ms", "<u4"),
+])
+FLAG_AI = 1 # the pick was made by an AI (its seed is in `seed`)
+
+_EVENT = struct.Struct("<iBBII")
+_HEADER = struct.Struct("<4sBHdI") # magic, version, meta length, start time, cursor
+
+class DraftLog:
+    """
+    Event-sourced draft state.
+
+    Attributes:
+        meta (dict): Draft settings needed to resume (JSON-serializable).
+        start_time (float): Unix time of the first event.
+        cursor (int): Number of events currently applied; events past it can be redone.
+    """
+
+    def __init__(self, meta=None, start_time=None):
+        self.meta = dict(meta or {})
+        self.start_time = time.time() if start_time is None else start_time
+        self.cursor = 0
+        self._events = bytearray()
+        # Snapshots are bitmasks in the slot order of one pool's id map
+        self._snapshot_slots = None
+        self._snapshots = {0: 0}
+
+    def __len__(self):
+        return self.cursor
+
+    @property
+    def n_events(self):
+        """
+        Recorded events, including undone ones that can be redone.
+        """
+        return len(self._events) // EVENT_DTYPE.itemsize
+
+    @property
+    def can_undo(self):
+        return self.cursor > 0
+
+    @property
+    def can_redo(self):
+        return self.cursor < self.n_events
+
+    def append(self, player_id, team, ai_seed=None):
+        """
+        Records a pick. Any undone events past the cursor are discarded.
+        """
+        if self.cursor < self.n_events:
+            del self._events[self.cursor * EVENT_DTYPE.itemsize:]
+            self._snapshots = {pos: mask for pos, mask in self._snapshots.items() if pos <= self.cursor}
+        elapsed_ms = min(int((time.time() - self.start_time) * 1000), 0xFFFFFFFF)
+        flags = FLAG_AI if ai_seed is not None else 0
+        self._events += _EVENT.pack(player_id, team, flags, (ai_seed or 0) & 0xFFFFFFFF, max(elapsed_ms, 0))
+        self.cursor += 1
+
+    def undo(self, n=1):
+        """
+        Moves the cursor back by up to n events; returns how many were undone.
+        """
+        n = min(n, self.cursor)
+        self.cursor -= n
+        return n
+
+    def redo(self, n=1):
+        """
+        Moves the cursor forward by up to n undone events; returns how many were redone.
+        """
+        n = min(n, self.n_events - self.cursor)
+        self.cursor += n
+        return n
+
+    def events(self, applied_only=True):
+        """
+        Events as a NumPy structured array (EVENT_DTYPE), a copy of the log.
+        """
+        events = np.frombuffer(bytes(self._events), dtype=EVENT_DTYPE)
+        return events[:self.cursor] if applied_only else events
+
+    def picks(self):
+        """
+        Applied picks as a list of player ids, in pick order.
+        """
+        return self.events()["player_id"].tolist()
+
+    def rosters(self, num_teams):
+        """
+        Player ids of every team's applied picks.
+        """
+        events = self.events()
+        return [events["player_id"][events["team"] == team].tolist() for team in range(num_teams)]
+
+    def drafted_bitmask(self, pool):
+        """
+        Drafted set after the applied events as a bitmask in `pool`'s slot order (see
+        DraftPool.drafted_bitmask), built from the nearest snapshot at or before the cursor.
+        """
+        if self._snapshot_slots is not pool.slot_of:
+            # Different id map: snapshots must be rebuilt in this pool's slot order
+            self._snapshot_slots = pool.slot_of
+            self._snapshots = {0: 0}
+
+        start = max(pos for pos in self._snapshots if pos <= self.cursor)
+        mask = self._snapshots[start]
+        player_ids = self.events()["player_id"].tolist()
+        for pos in range(start, self.cursor):
+            mask |= 1 << pool.slot_of[player_ids[pos]]
+            if (pos + 1) % SNAPSHOT_INTERVAL == 0:
+                self._snapshots[pos + 1] = mask
+        return mask
+
+    def replay(self, pool):
+        """
+        Applies the log to `pool` (replacing its drafted set) and returns it.
+        """
+        pool.load_drafted_bitmask(self.drafted_bitmask(pool))
+        return pool
+
+    def to_bytes(self):
+        meta = json.dumps(self.meta, separators=(",", ":")).encode("utf-8")
+        return _HEADER.pack(LOG_MAGIC, LOG_VERSION, len(meta), self.start_time, self.cursor) + meta + bytes(self._events)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Raises:
+            ValueError: If `data` is not a draft log of a supported version.
+        """
+        if len(data) < _HEADER.size:
+            raise ValueError("Draft log is truncated.")
+        magic, version, meta_len, start_time, cursor = _HEADER.unpack_from(data)
+        if magic != LOG_MAGIC or version != LOG_VERSION:
+            raise ValueError("Not a draft log (or an unsupported version).")
+        body = data[_HEADER.size + meta_len:]
+        if len(body) % EVENT_DTYPE.itemsize:
+            raise ValueError("Draft log is truncated.")
+        log = cls(json.loads(data[_HEADER.size:_HEADER.size + meta_len].decode("utf-8")), start_time)
+        log._events = bytearray(body)
+        log.cursor = min(cursor, log.n_events)
+        return log
+
+    def save(self, path):
+        """
+        Writes the log atomically (temporary file, then replace).
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.to_bytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+    def __reduce__(self):
+        # Pickle as the compact encoding (snapshots are rebuilt on demand)
+        return (DraftLog.from_bytes, (self.to_bytes(),))
+
+    def __repr__(self):
+        return f"DraftLog({self.cursor}/{self.n_events} events)"
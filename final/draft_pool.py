@@ -0,0 +1,287 @@
+import copy
+import threading
+import numpy as np
+
+class RankingIndex:
+    """
+    Best-first ranking of one score column, built lazily by partial selection.
+
+    Only the top `block` players are selected (np.argpartition) and sorted up front; further
+    blocks are selected from the remaining players on demand, so reading the top of the ranking
+    never pays for a full sort. The ranking does not know about drafted players: each DraftPool
+    walks it with its own cursor, so one index can be shared by many pools.
+    """
+
+    def __init__(self, scores, block=64, order=None):
+        self.scores = np.ascontiguousarray(scores, dtype=np.float64)
+        self.block = block
+        n = len(self.scores)
+        # Unranked slots get rank n until their block is selected
+        self._ranks = np.full(n, n, dtype=np.int64)
+        self._lock = threading.Lock()
+        if order is not None:
+            self._order = np.asarray(order, dtype=np.int64)
+            self._rest = np.empty(0, dtype=np.int64)
+            self._ranks[self._order] = np.arange(n)
+        else:
+            self._order = np.empty(0, dtype=np.int64)
+            self._rest = np.arange(n, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.scores)
+
+    @property
+    def n_ranked(self):
+        return len(self._order)
+
+    def _extend(self, size):
+        """
+        Selects and sorts the next `size` best players from the unranked remainder.
+        """
+        with self._lock:
+            rest = self._rest
+            if len(rest) == 0:
+                return
+            if len(rest) > size:
+                keys = -self.scores[rest]
+                kth = np.partition(keys, size - 1)[size - 1]
+                # Everything strictly better than the cut-off, then ties in slot order
+                # (rest stays in slot order), so blocks agree with a full stable sort
+                picked = keys < kth
+                ties = np.flatnonzero(keys == kth)
+                picked[ties[:size - picked.sum()]] = True
+                head, rest = rest[picked], rest[~picked]
+            else:
+                head, rest = rest, rest[:0]
+            # Best first; ties keep slot order so the ranking is deterministic
+            head = head[np.lexsort((head, -self.scores[head]))]
+            self._ranks[head] = np.arange(len(self._order), len(self._order) + len(head))
+            self._order = np.concatenate([self._order, head])
+            self._rest = rest
+
+    def slot_at(self, position):
+        """
+        Slot ranked at `position` (0 = best), or None past the end.
+        """
+        while position >= len(self._order) and len(self._rest):
+            self._extend(max(self.block, position + 1 - len(self._order)))
+        if position >= len(self._order):
+            return None
+        return self._order[position]
+
+    def rank(self, slot):
+        """
+        Position of `slot` in the ranking, or len(self) if its block has not been selected yet.
+        """
+        return self._ranks[slot]
+
+    def full_order(self):
+        """
+        All slots best first (ranks everything that is left; the result is kept).
+        """
+        if len(self._rest):
+            self._extend(len(self._rest))
+        return self._order
+
+class DraftPool:
+    """
+    Array-backed draft pool.
+
+    Player ids are mapped to dense integer slots (their row position in the source frame).
+    Drafted players are tracked in a boolean mask instead of an `is_drafted` column, and every
+    score column has a RankingIndex plus a cursor that only ever skips drafted players,
+    so best-available is amortized O(1), top-k is O(k + skipped) and draft/restore are O(1).
+    The source DataFrame is referenced, never copied.
+    """
+
+    def __init__(self, df, score_columns=("fantasy_score", "pred_score"), rankings=None):
+        self.frame = df
+        self.index = df.index
+        self.ids = df.index.to_numpy()
+        self._id_list = self.ids.tolist() # ids are returned as plain Python ints
+        self.slot_of = {player_id: slot for slot, player_id in enumerate(self._id_list)}
+        self.drafted = np.zeros(len(self.ids), dtype=bool)
+        self.n_available = len(self.ids)
+
+        self._rankings = {}
+        self._cursors = {}
+        # Prebuilt RankingIndex objects can be shared instead of rebuilt
+        for col, ranking in (rankings or {}).items():
+            self.set_ranking(col, ranking)
+        for col in score_columns:
+            if col in df.columns and col not in self._rankings:
+                self.set_scores(col, df[col].to_numpy(dtype=np.float64, na_value=-np.inf))
+
+    def __len__(self):
+        return self.n_available
+
+    def __contains__(self, player_id):
+        return self.is_available(player_id)
+
+    @property
+    def score_columns(self):
+        return list(self._rankings)
+
+    @property
+    def rankings(self):
+        return dict(self._rankings)
+
+    def set_scores(self, col, scores, order=None):
+        """
+        Adds or replaces a score column, e.g. a custom score. `scores` are in row order of the
+        source frame; `order` (row positions, best first) can be passed when it is already known,
+        to skip the selection.
+        """
+        self.set_ranking(col, RankingIndex(scores, order=order))
+
+    def set_ranking(self, col, ranking):
+        self._rankings[col] = ranking
+        self._cursors[col] = 0
+
+    def new_draft(self):
+        """
+        Returns an empty pool over the same players that shares this pool's id map and
+        rankings; only the drafted mask and cursors are new. Much cheaper than building a
+        DraftPool from the frame again.
+        """
+        pool = copy.copy(self)
+        pool.drafted = np.zeros(len(self.ids), dtype=bool)
+        pool.n_available = len(self.ids)
+        pool._rankings = dict(self._rankings)
+        pool._cursors = {col: 0 for col in self._rankings}
+        return pool
+
+    def ranking(self, col):
+        return self._rankings[col]
+
+    def id_of(self, slot):
+        return self._id_list[slot]
+
+    def drafted_bitmask(self):
+        """
+        Drafted set as a Python int with bit `slot` set for every drafted player.
+        """
+        packed = np.packbits(self.drafted, bitorder="little")
+        return int.from_bytes(packed.tobytes(), "little")
+
+    def load_drafted_bitmask(self, mask):
+        """
+        Replaces the drafted set with a bitmask from drafted_bitmask(), e.g. one kept between
+        Streamlit reruns instead of the pool itself. Cursors restart from the top.
+        """
+        n = len(self.ids)
+        packed = np.frombuffer(mask.to_bytes((n + 7) // 8, "little"), dtype=np.uint8)
+        self.drafted = np.unpackbits(packed, count=n, bitorder="little").astype(bool)
+        self.n_available = n - int(self.drafted.sum())
+        self._cursors = {col: 0 for col in self._rankings}
+
+    def slot(self, player_id):
+        """
+        Dense slot of a player id. Raises KeyError for unknown ids.
+        """
+        return self.slot_of[player_id]
+
+    def is_available(self, player_id):
+        slot = self.slot_of.get(player_id)
+        return slot is not None and not self.drafted[slot]
+
+    def is_drafted(self, player_id):
+        return bool(self.drafted[self.slot_of[player_id]])
+
+    def draft(self, player_id):
+        """
+        Marks a player as drafted.
+
+        Raises:
+            KeyError: If the id is not in the pool.
+            ValueError: If the player was already drafted.
+        """
+        slot = self.slot_of[player_id]
+        if self.drafted[slot]:
+            raise ValueError(f"Player {player_id} has already been drafted.")
+        self.drafted[slot] = True
+        self.n_available -= 1
+
+    def restore(self, player_id):
+        """
+        Puts a drafted player back into the pool (used to undo a pick).
+        """
+        slot = self.slot_of[player_id]
+        if not self.drafted[slot]:
+            return
+        self.drafted[slot] = False
+        self.n_available += 1
+        # A restored player may rank above a cursor that has already moved past them
+        for col, ranking in self._rankings.items():
+            self._cursors[col] = min(self._cursors[col], ranking.rank(slot))
+
+    def _advance(self, col):
+        """
+        Moves the cursor of `col` past drafted players and returns (cursor, slot at cursor).
+        """
+        ranking = self._rankings[col]
+        cursor = self._cursors[col]
+        slot = ranking.slot_at(cursor)
+        while slot is not None and self.drafted[slot]:
+            cursor += 1
+            slot = ranking.slot_at(cursor)
+        self._cursors[col] = cursor
+        return cursor, slot
+
+    def best_available(self, col, allowed=None):
+        """
+        Id of the best undrafted player by `col`, or None if the pool is empty.
+        `allowed` (bool array in slot order) restricts the choice, e.g. to players a roster
+        can still fit; players it rules out are skipped without moving the cursor.
+        """
+        if allowed is not None:
+            top = self.top_k(col, 1, allowed)
+            return top[0] if top else None
+        _, slot = self._advance(col)
+        if slot is None:
+            return None
+        return self._id_list[slot]
+
+    def top_k(self, col, k, allowed=None):
+        """
+        Ids of the k best undrafted players by `col`, best first (only `allowed` slots if given).
+        """
+        ranking = self._rankings[col]
+        position, slot = self._advance(col)
+        result = []
+        while slot is not None and len(result) < k:
+            if not self.drafted[slot] and (allowed is None or allowed[slot]):
+                result.append(self._id_list[slot])
+            position += 1
+            slot = ranking.slot_at(position)
+        return result
+
+    def score(self, player_id, col):
+        return self._rankings[col].scores[self.slot_of[player_id]]
+
+    def scores(self, col):
+        """
+        Score array of `col` in slot order (read-only view).
+        """
+        view = self._rankings[col].scores.view()
+        view.flags.writeable = False
+        return view
+
+    def available_slots(self, col=None):
+        """
+        Slots of undrafted players, ordered best first by `col` (slot order if col is None).
+        """
+        if col is None:
+            return np.flatnonzero(~self.drafted)
+        order = self._rankings[col].full_order()
+        return order[~self.drafted[order]]
+
+    def available_ids(self, col=None):
+        return self.ids[self.available_slots(col)]
+
+    def available_frame(self, col=None):
+        """
+        Rows of the source frame for undrafted players, ordered best first by `col`.
+        Builds a new (small) frame, so use it for display, not in per-pick hot paths.
+        """
+        return self.frame.iloc[self.available_slots(col)]
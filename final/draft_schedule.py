@@ -0,0 +1,70 @@
+import numpy as np
+
+DRAFT_FORMATS = ("snake", "linear", "third_round_reversal")
+
+class DraftSchedule:
+    """
+    Precomputed pick-order table for an N-team, R-round draft.
+
+    Teams are numbered 0..num_teams-1 in first-round order. Supported formats:
+    - snake: odd rounds run 0..N-1, even rounds N-1..0
+    - linear: every round runs 0..N-1
+    - third_round_reversal: like snake, but round 3 repeats round 2's (reversed) order,
+      and the snake alternation continues from there
+
+    Every lookup is a table read, so asking whose turn it is costs O(1) for any league size.
+    """
+
+    def __init__(self, num_teams=2, num_rounds=5, draft_format="snake"):
+        if draft_format not in DRAFT_FORMATS:
+            raise ValueError(f"Unknown draft format '{draft_format}'. Choose one of: {', '.join(DRAFT_FORMATS)}")
+        if num_teams < 1 or num_rounds < 1:
+            raise ValueError("A draft needs at least one team and one round.")
+
+        self.num_teams = num_teams
+        self.num_rounds = num_rounds
+        self.draft_format = draft_format
+
+        forward = np.arange(num_teams, dtype=np.int32)
+        rounds = [forward[::-1] if self._is_reversed(r) else forward for r in range(num_rounds)]
+        self.order = np.concatenate(rounds)
+        self.order.flags.writeable = False
+        self._teams = self.order.tolist()
+
+    def _is_reversed(self, round_index):
+        """
+        Whether the 0-based round runs last team to first.
+        """
+        if self.draft_format == "linear":
+            return False
+        if self.draft_format == "third_round_reversal" and round_index >= 2:
+            return round_index % 2 == 0
+        return round_index % 2 == 1
+
+    @property
+    def total_picks(self):
+        return len(self._teams)
+
+    def __len__(self):
+        return self.total_picks
+
+    def team_for_pick(self, pick_num):
+        """
+        Team (0-based) making the 0-based overall pick `pick_num`.
+        """
+        return self._teams[pick_num]
+
+    def round_of(self, pick_num):
+        """
+        0-based round of an overall pick.
+        """
+        return pick_num // self.num_teams
+
+    def picks_for_team(self, team):
+        """
+        Overall pick numbers belonging to `team`, in order.
+        """
+        return np.flatnonzero(self.order == team).tolist()
+
+    def __repr__(self):
+        return f"DraftSchedule(num_teams={self.num_teams}, num_rounds={self.num_rounds}, draft_format='{self.draft_format}')"
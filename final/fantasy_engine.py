@@ -1,28 +1,37 @@
 import random
 import pandas as pd # 需要導入 pandas 來處理 dataframe
+from draft_pool import DraftPool
+from draft_schedule import DraftSchedule
+from match_engine import DEFAULT_SIMULATIONS
+from roster_slots import RosterSlots, add_position_columns, POSITION_COLUMN
 
 # 假設 simulate_match 函數中，player_team 和 ai_team 是 player_id 的列表
 
-def draft_phase(df, difficulty, draft_model):
+def draft_phase(df, difficulty, draft_model, num_rounds=5, draft_format="snake", roster_slots=None):
   """
   執行夢幻籃球選秀流程。
   df: 包含所有球員數據的 DataFrame。
   difficulty: 遊戲難度 ('easy', 'medium', 'hard')。
   draft_model: 訓練好的 ML 模型 (Ridge)，在 medium/hard 難度下使用。
+  num_rounds: 選秀輪數 (每隊選幾名球員)。
+  draft_format: 'snake'、'linear' 或 'third_round_reversal'。
+  roster_slots: 陣容位置 (例如 roster_slots.roster_slots_for(num_rounds))；None 表示不限位置。
+    啟用時雙方都只能選陣容還放得下的球員 (df 沒有位置欄位時會依數據推測)。
   """
   player_team = []
   ai_team = []
 
-  # 1. 準備選秀池：計算並添加 'pred_score'
-  draftable_players = df.copy()
-  draftable_players['is_drafted'] = False
+  if roster_slots is not None:
+    roster_slots = RosterSlots(roster_slots) if not isinstance(roster_slots, RosterSlots) else roster_slots
+    if POSITION_COLUMN not in df.columns:
+      add_position_columns(df)
+
+  # 1. 準備選秀池：以 DraftPool 記錄已選球員 (不複製 df，也不新增 is_drafted 欄位)
+  draftable_players = DraftPool(df)
 
   # 確保 'Player'/'player_name' 欄位存在，以便輸出
-  if 'player_name' in draftable_players.columns:
-      draftable_players.rename(columns={'player_name': 'Player'}, inplace=True)
+  name_column = 'Player' if 'Player' in df.columns else 'player_name'
   
-  # Define total draft rounds (5 players per team = 10 picks)
-  total_picks = 10
 
   print("\n--- Draft Phase Begins ---")
 
@@ -57,6 +66,11 @@ def draft_phase(df, difficulty, draft_model):
       break
   print("---------------------------------------------------")
 
+  # 依先後手建立選秀順序表 (team 0 = 第一順位)
+  schedule = DraftSchedule(num_teams=2, num_rounds=num_rounds, draft_format=draft_format)
+  player_team_index = 0 if player_gets_first_pick else 1
+  total_picks = schedule.total_picks
+
 
   # 匯入 AI agent 函數 (必須在需要時匯入，以避免循環依賴，或假設它們在主程式中已導入)
   from ai_agent import ai_pick_easy, ai_pick_medium, ai_pick_hard
@@ -64,53 +78,35 @@ def draft_phase(df, difficulty, draft_model):
   for pick_num in range(total_picks):
     print(f"\nPick {pick_num + 1}/{total_picks}")
 
-    # Determine the current snake round number (0-indexed: 0, 1, 2, 3, 4)
-    snake_round_number = pick_num // 2
-
-    is_player_picking_now = False
-    if player_gets_first_pick:
-      if snake_round_number % 2 == 0: # Forward round (Player -> AI)
-        is_player_picking_now = (pick_num % 2 == 0)
-      else: # Reverse round (AI -> Player)
-        is_player_picking_now = (pick_num % 2 != 0)
-    else: # AI gets first pick
-      if snake_round_number % 2 == 0: # Forward round (AI -> Player)
-        is_player_picking_now = (pick_num % 2 != 0)
-      else: # Reverse round (Player -> AI)
-        is_player_picking_now = (pick_num % 2 == 0)
+    # 查表決定這一順位屬於哪一隊
+    is_player_picking_now = schedule.team_for_pick(pick_num) == player_team_index
 
     if is_player_picking_now:
       print("Player's turn to pick...")
       
-      # 1. Get available players (使用 .copy() 確保我們不會修改原始 df)
-      available_players = draftable_players[draftable_players['is_drafted'] == False].copy()
-
-      # *** 修正區塊：僅在顯示時調整欄位名稱 ***
-      
       # 內部使用的欄位名稱
       AI_SORT_COLUMN = 'pred_score'        # AI 模型預測的分數 (用於排序)
       PLAYER_DISPLAY_COLUMN = 'fantasy_score' # 傳統分數 (顯示給玩家看)
       
       # 確保排序欄位存在，如果不存在，則使用 fantasy_score 排序 (以防萬一)
-      if AI_SORT_COLUMN not in available_players.columns:
+      if AI_SORT_COLUMN not in draftable_players.score_columns:
           AI_SORT_COLUMN = PLAYER_DISPLAY_COLUMN
           
       print("\nAvailable Players (Display Score is traditional Fantasy Score):")
       
-      # 1. 根據 AI 的預測分數進行排序
-      sorted_players = available_players.sort_values(by=AI_SORT_COLUMN, ascending=False)
+      # 1. 依 AI 的預測分數取出前 20 名可選球員 (DraftPool 已維護排序，不需重新排序)
+      top_ids = draftable_players.top_k(AI_SORT_COLUMN, 20)
       
       # 2. 選擇用於顯示的欄位
-      # 檢查 'Player' 欄位是否存在 (已假設在框架.py中已重命名 'player_name' -> 'Player')
-      display_cols = ['Player', 'team_abbreviation', PLAYER_DISPLAY_COLUMN]
+      display_cols = [name_column, 'team_abbreviation', 'Pos', PLAYER_DISPLAY_COLUMN]
       
       # 篩選出實際存在的欄位
-      final_display_cols = [col for col in display_cols if col in sorted_players.columns]
+      final_display_cols = [col for col in display_cols if col in df.columns]
       
       # 3. 輸出並重新命名分數欄位供顯示
-      print(sorted_players[final_display_cols]
-            .rename(columns={PLAYER_DISPLAY_COLUMN: 'Display_Score (FScore)'}) # 僅在輸出時顯示為 'Display_Score'
-            .head(20).to_string())
+      print(df.loc[top_ids, final_display_cols]
+            .rename(columns={name_column: 'Player', PLAYER_DISPLAY_COLUMN: 'Display_Score (FScore)'}) # 僅在輸出時顯示為 'Display_Score'
+            .to_string())
       print("...")
 
 
@@ -123,15 +119,22 @@ def draft_phase(df, difficulty, draft_model):
           player_selected_id = int(player_input)
 
           # 3b. Check if player_id exists in draftable_players index
-          if player_selected_id not in draftable_players.index:
+          if player_selected_id not in draftable_players.slot_of:
             print("Invalid player_id (index). Please enter an existing player_id.")
             continue
 
           # 3c. Check if the chosen player is already drafted
-          if draftable_players.loc[player_selected_id, 'is_drafted']:
+          if draftable_players.is_drafted(player_selected_id):
             print(f"Player with ID {player_selected_id} is already drafted. Choose another player.")
             continue
 
+          # 3d. Check that the roster can still fill its slots with this player
+          if roster_slots is not None and not roster_slots.state(df.loc[player_team, POSITION_COLUMN]).fits(
+              int(df.loc[player_selected_id, POSITION_COLUMN])):
+            print(f"Player {player_selected_id} ({df.loc[player_selected_id, 'Pos']}) does not fit your remaining "
+                  f"roster slots ({', '.join(roster_slots.slots)}). Choose another player.")
+            continue
+
           # If all checks pass, break the loop
           break
 
@@ -144,44 +147,68 @@ def draft_phase(df, difficulty, draft_model):
       # 4. Add to player_team
       player_team.append(player_selected_id)
       # 5. Mark as drafted
-      draftable_players.loc[player_selected_id, 'is_drafted'] = True
-      print(f"Player {draftable_players.loc[player_selected_id, 'Player']} (ID: {player_selected_id}) drafted by Player.")
+      draftable_players.draft(player_selected_id)
+      print(f"Player {df.loc[player_selected_id, name_column]} (ID: {player_selected_id}) drafted by Player.")
 
     else: # AI picks
       print("AI's turn to pick...")
-      available_for_ai = draftable_players[draftable_players['is_drafted'] == False].copy()
+      available_for_ai = draftable_players
 
       ai_selected_id = None
+      # 位置限制 (若有)：AI 只選自己陣容還放得下的球員
+      slots = {'roster_slots': roster_slots}
       if difficulty == "easy":
-        ai_selected_id = ai_pick_easy(available_for_ai)
+        ai_selected_id = ai_pick_easy(available_for_ai, roster=ai_team, **slots)
       elif difficulty == "medium":
         # 由於 draft_model 已用於計算 pred_score，這裡只需要傳入可用球員
-        ai_selected_id = ai_pick_medium(available_for_ai, draft_model) 
+        ai_selected_id = ai_pick_medium(available_for_ai, draft_model, roster=ai_team, **slots) 
       elif difficulty == "hard":
-        ai_selected_id = ai_pick_hard(available_for_ai, draft_model)
+        # Hard 使用 MCTS，需要知道選秀順序與雙方目前的陣容
+        rosters = [player_team, ai_team] if player_team_index == 0 else [ai_team, player_team]
+        ai_selected_id = ai_pick_hard(available_for_ai, draft_model, schedule=schedule, pick_num=pick_num,
+                                      team=1 - player_team_index, rosters=rosters, **slots)
       else: # Default to easy if difficulty is not recognized
-          ai_selected_id = ai_pick_easy(available_for_ai)
+          ai_selected_id = ai_pick_easy(available_for_ai, roster=ai_team, **slots)
 
       # 檢查 ai_selected_id 是否有效，防止在空數據集上出錯
-      if ai_selected_id is None or ai_selected_id not in draftable_players.index:
+      if ai_selected_id is None or not draftable_players.is_available(ai_selected_id):
           print("AI failed to pick a valid player. Forcing an easy pick.")
-          ai_selected_id = ai_pick_easy(available_for_ai)
+          ai_selected_id = ai_pick_easy(available_for_ai, roster=ai_team, **slots)
 
       ai_team.append(ai_selected_id)
-      draftable_players.loc[ai_selected_id, 'is_drafted'] = True
-      print(f"AI drafted player {draftable_players.loc[ai_selected_id, 'Player']} (ID: {ai_selected_id}).")
+      draftable_players.draft(ai_selected_id)
+      print(f"AI drafted player {df.loc[ai_selected_id, name_column]} (ID: {ai_selected_id}).")
 
 
   print("\n--- Draft Phase Ends ---")
   return player_team, ai_team
 
-def simulate_match(player_team, ai_team, df, difficulty): # <--- 必須有 difficulty 參數
+def simulate_match(player_team, ai_team, df, difficulty, engine=None, n_sims=DEFAULT_SIMULATIONS,
+                   scoring="points", scoring_rules=None, seed=None, categories=None): # <--- 必須有 difficulty 參數
   """
   模擬比賽，比較兩隊球員的總得分。
   - Easy 難度使用傳統 fantasy_score。
   - Medium/Hard 難度使用 pred_score (即模型預測的潛力分數)。
+
+  傳入 engine (match_engine.MatchEngine) 時改為隨機模擬 n_sims 場對戰 (scoring 為 'points' 或
+  'categories')：勝負由勝率決定，player_score / ai_score 為模擬分數的平均，並額外回傳
+  win_prob、分數分布 (scores、score_quantiles) 與各類別差距 (category_margins)。
+  categories：類別制比賽的類別 (例如 feature_engineering.CATEGORY_FORMATS['8cat'])，預設九類別。
   """
-  
+  if engine is not None:
+    extra = {'categories': tuple(categories)} if categories is not None else {}
+    result = engine.simulate(player_team, ai_team, n_sims, scoring, scoring_rules, seed=seed, **extra)
+    result["player_score"], result["ai_score"] = result["score_mean"].tolist()
+    if result["win_prob"] > result["loss_prob"]:
+      result["winner"] = "Player"
+    elif result["win_prob"] < result["loss_prob"]:
+      result["winner"] = "AI"
+    else:
+      result["winner"] = "Draw"
+    result["score_type"] = f"simulated {scoring}"
+    return result
+
+
   # 根據難度選擇使用的分數欄位
   if difficulty.lower() == "easy":
       score_column = "fantasy_score"
@@ -194,9 +221,14 @@ def simulate_match(player_team, ai_team, df, difficulty): # <--- 必須有 diffi
           print(f"Error: '{score_column}' missing for {difficulty} difficulty. Falling back to 'fantasy_score'.")
           score_column = "fantasy_score"
 
-  # 使用 .loc[team_list] 確保取得正確的球員數據
-  player_score = df.loc[player_team, score_column].sum()
-  ai_score = df.loc[ai_team, score_column].sum()
+  # 以索引位置直接加總 (避免 .loc 的多層檢查，模擬器每次選秀都會呼叫)
+  scores = df[score_column].to_numpy()
+  player_positions = df.index.get_indexer(player_team)
+  ai_positions = df.index.get_indexer(ai_team)
+  if (player_positions < 0).any() or (ai_positions < 0).any():
+      raise KeyError("Some drafted player_ids are not in the player table.")
+  player_score = scores[player_positions].sum()
+  ai_score = scores[ai_positions].sum()
   
   if player_score > ai_score:
     winner = "Player"
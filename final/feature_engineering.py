@@ -1,4 +1,76 @@
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
+from data_loader import iter_player_chunks, PLAYER_SCHEMA
+from scoring_expr import compile_scoring_expression
+
+# The stats a points-league scoring rule can weight, and the default weights
+SCORING_STATS = ["pts", "reb", "ast", "stl", "blk", "tov"]
+DEFAULT_SCORING_RULES = {"pts": 1, "reb": 1.2, "ast": 1.5, "stl": 3, "blk": 3, "tov": -1}
+
+# Model features, using base stats and some advanced stats if available
+FEATURE_COLUMNS = [
+    "pts", "reb", "ast", "stl", "blk", "tov",
+    "min_base", "fgm_base", "fga_base", "fg_pct_base",
+    "fg3m", "fg3a", "fg3_pct", "ftm", "fta", "ft_pct",
+    "oreb", "dreb", "plus_minus", "gp_base"
+]
+FEATURE_STORE_CACHE_SIZE = 8 # number of FeatureStores kept by feature_store()
+
+def scoring_weight_matrix(scoring_rule_sets):
+    """
+    Stacks N scoring rule dicts into a (len(SCORING_STATS) x N) weight matrix.
+    Stats a rule set leaves out get their default weight, like compute_fantasy_score.
+    """
+    weights = np.empty((len(SCORING_STATS), len(scoring_rule_sets)), dtype=np.float64)
+    for j, rules in enumerate(scoring_rule_sets):
+        for i, stat in enumerate(SCORING_STATS):
+            weights[i, j] = rules.get(stat, DEFAULT_SCORING_RULES[stat])
+    return weights
+
+def stat_matrix(df):
+    """
+    Returns the SCORING_STATS columns as a C-contiguous float64 (n_players x n_stats) array.
+    Missing columns are treated as zeros.
+    """
+    stats = np.zeros((len(df), len(SCORING_STATS)), dtype=np.float64)
+    for i, stat in enumerate(SCORING_STATS):
+        if stat in df.columns:
+            stats[:, i] = df[stat].to_numpy(dtype=np.float64, na_value=0.0)
+    return stats
+
+def compute_fantasy_score_matrix(df, scoring_rule_sets):
+    """
+    Scores every player under many scoring systems at once.
+
+    Args:
+        df (pd.DataFrame): Player stats.
+        scoring_rule_sets (list | dict[str, ...]): N scoring rules, or a mapping of
+            preset name -> scoring rules. Each entry is a weight dict or a scoring
+            expression string (see scoring_expr).
+
+    Returns:
+        np.ndarray of shape (n_players, N) for a list, or a DataFrame indexed like `df`
+        with one column per preset name for a dict.
+        All weight dicts are computed as a single stat-matrix x weight-matrix product;
+        expressions are evaluated with their compiled vectorized plans.
+    """
+    if isinstance(scoring_rule_sets, dict):
+        names = list(scoring_rule_sets)
+        scores = compute_fantasy_score_matrix(df, list(scoring_rule_sets.values()))
+        return pd.DataFrame(scores, index=df.index, columns=names)
+
+    linear = [j for j, rules in enumerate(scoring_rule_sets) if not isinstance(rules, str)]
+    scores = np.empty((len(df), len(scoring_rule_sets)), dtype=np.float64)
+    if linear:
+        scores[:, linear] = stat_matrix(df) @ scoring_weight_matrix([scoring_rule_sets[j] for j in linear])
+    for j, rules in enumerate(scoring_rule_sets):
+        if isinstance(rules, str):
+            scores[:, j] = compile_scoring_expression(rules).evaluate(df)
+    return scores
 
 def compute_fantasy_score(df, scoring_rules=None):
     """
@@ -11,14 +83,21 @@ def compute_fantasy_score(df, scoring_rules=None):
     STL: 3
     BLK: 3
     TOV: -1
+
+    `scoring_rules` may also be a scoring expression string, e.g.
+    "pts + 1.2*reb + 1.5*ast + 3*stl + 3*blk - tov + (5*dd2 + 10*td3) / gp_base"
+    (see scoring_expr for the syntax). Expressions are compiled once and cached.
     """
     if scoring_rules is None:
-        scoring_rules = {"pts": 1, "reb": 1.2, "ast": 1.5, "stl": 3, "blk": 3, "tov": -1}
+        scoring_rules = DEFAULT_SCORING_RULES
+
+    if isinstance(scoring_rules, str):
+        df['fantasy_score'] = compile_scoring_expression(scoring_rules).evaluate(df)
+        return df
     
     # Ensure required columns exist (case-insensitive check handled by data_loader usually, 
     # but good to be safe or assume lowercase from standardize_column_names)
-    required_cols = ["pts", "reb", "ast", "stl", "blk", "tov"]
-    for col in required_cols:
+    for col in SCORING_STATS:
         # Check if the column is missing before attempting computation
         if col not in df.columns:
             # For demonstration, we'll create the missing column with 0s to allow testing
@@ -26,42 +105,417 @@ def compute_fantasy_score(df, scoring_rules=None):
             # print(f"Warning: Column '{col}' missing. Creating a zero column for demonstration.")
             df[col] = 0.0 # Adding 0.0 for missing columns
             
-    df['fantasy_score'] = (
-        df['pts'] * scoring_rules.get('pts', 1) +
-        df['reb'] * scoring_rules.get('reb', 1.2) +
-        df['ast'] * scoring_rules.get('ast', 1.5) +
-        df['stl'] * scoring_rules.get('stl', 3) +
-        df['blk'] * scoring_rules.get('blk', 3) +
-        df['tov'] * scoring_rules.get('tov', -1)
-    )
+    df['fantasy_score'] = compute_fantasy_score_matrix(df, [scoring_rules])[:, 0]
     
     return df
 
+class ScoreBreakdown:
+    """
+    Keeps the per-stat contribution vectors behind a linear score so a weight change can be
+    applied as a delta (delta_w x stat column) instead of re-running the whole pipeline.
+
+    The columns are the SCORING_STATS stat matrix by default (fantasy_score); any other
+    (n_players x n_stats) matrix that is linear in the weights works the same way, e.g. the
+    projection basis behind pred_score (ml_models.scoring_prediction_basis).
+
+    Attributes:
+        weights (np.ndarray): Current weight per stat in SCORING_STATS order.
+        contributions (np.ndarray): (n_players x n_stats) weight x stat values.
+        scores (np.ndarray): Current score per player (row order of the source df).
+        order (np.ndarray): Row positions sorted by score, best first (ties in row order).
+    """
+
+    def __init__(self, df, scoring_rules=None, stats=None):
+        if scoring_rules is None:
+            scoring_rules = DEFAULT_SCORING_RULES
+        self.index = df.index
+        self.stats = stat_matrix(df) if stats is None else np.asarray(stats, dtype=np.float64)
+        self.weights = scoring_weight_matrix([scoring_rules])[:, 0]
+        self.contributions = self.stats * self.weights
+        self.scores = self.contributions.sum(axis=1)
+        self.order = np.argsort(-self.scores, kind="stable")
+
+    @property
+    def scoring_rules(self):
+        return dict(zip(SCORING_STATS, self.weights.tolist()))
+
+    def copy(self):
+        """
+        An independent breakdown at the same weights (the stat matrix is shared, read-only),
+        so a cached breakdown can seed one for new weights without being modified.
+        """
+        other = copy.copy(self)
+        other.weights = self.weights.copy()
+        other.contributions = self.contributions.copy()
+        other.scores = self.scores.copy()
+        other.order = self.order.copy()
+        return other
+
+    def set_weight(self, stat, weight):
+        """
+        Changes one stat's weight, updating scores by the delta and re-ranking.
+        Returns True if anything changed.
+        """
+        if not self._set_weight(stat, weight):
+            return False
+        self._rerank()
+        return True
+
+    def _set_weight(self, stat, weight):
+        i = SCORING_STATS.index(stat)
+        delta = weight - self.weights[i]
+        if delta == 0:
+            return False
+
+        self.scores += delta * self.stats[:, i]
+        self.contributions[:, i] = self.stats[:, i] * weight
+        self.weights[i] = weight
+        return True
+
+    def _rerank(self):
+        # The previous order is nearly sorted after a small tweak, and NumPy's stable sort
+        # (timsort) is adaptive, so this costs close to a linear pass; the row number breaks
+        # ties, as in a full stable sort
+        order = self.order
+        self.order = order[np.lexsort((order, -self.scores[order]))]
+
+    def update(self, scoring_rules):
+        """
+        Applies every weight in `scoring_rules` that differs from the current one (re-ranking
+        once). Returns True if anything changed.
+        """
+        changed = False
+        for stat, weight in scoring_rules.items():
+            if stat in SCORING_STATS:
+                changed = self._set_weight(stat, weight) or changed
+        if changed:
+            self._rerank()
+        return changed
+
+    def clipped_order(self, floor=0.0):
+        """
+        Order of np.maximum(floor, scores) (e.g. pred_score, which is floored at 0): the
+        current order with the clipped tail put back in row order.
+        """
+        above = self.scores[self.order] > floor
+        return np.concatenate([self.order[above], np.sort(self.order[~above])])
+
+    def apply_to(self, df):
+        """
+        Writes the current scores into df['fantasy_score'] (df must share this breakdown's index).
+        """
+        df['fantasy_score'] = pd.Series(self.scores, index=self.index).reindex(df.index)
+        return df
+
+    def ranked_ids(self):
+        """
+        Player ids sorted by the current score, best first.
+        """
+        return self.index[self.order]
+
+# Head-to-head / roto categories (TOV counts against a player; 8-cat leagues drop it)
+NINE_CATEGORIES = ("fg_pct", "ft_pct", "fg3m", "pts", "reb", "ast", "stl", "blk", "tov")
+EIGHT_CATEGORIES = tuple(cat for cat in NINE_CATEGORIES if cat != "tov")
+CATEGORY_FORMATS = {"9cat": NINE_CATEGORIES, "8cat": EIGHT_CATEGORIES}
+# Raw columns every category value is a linear combination of
+CATEGORY_INPUTS = ["fgm_base", "fga_base", "ftm", "fta", "fg3m", "pts", "reb", "ast", "stl", "blk", "tov"]
+# Percentage categories: (made column, attempts column), valued by volume
+PERCENT_CATEGORIES = {"fg_pct": ("fgm_base", "fga_base"), "ft_pct": ("ftm", "fta")}
+NEGATIVE_CATEGORIES = ("tov",)
+
+class CategoryValuation:
+    """
+    Z-score valuation for category leagues, relative to a reference pool (the players still
+    available, by default everyone).
+
+    Counting categories are z-scored as they are. FG% and FT% are volume-weighted: a player's
+    value is made - league% x attempts (their makes above what a league-average shooter
+    would make on their attempts), with league% taken over the reference pool. TOV is negated.
+
+    Every category value is a linear combination of the CATEGORY_INPUTS columns, so the
+    reference pool is summarized by its count, column sums and Gram matrix: drafting k
+    players updates them in O(k), and the means and variances of all categories follow
+    from them without another pass over the pool. Z-scores for all players and the totals
+    of every punt variant (z-scores @ punt matrix) are then one vectorized pass.
+
+    Attributes:
+        categories (tuple[str]): Valued categories.
+        variants (list[str]): Total columns: 'cat_value' (no punt) and 'cat_value_punt_<cat>'.
+        punt_matrix (np.ndarray): (n_categories x n_variants) 0/1 weights of each variant.
+        available (np.ndarray): Reference-pool mask, in row order of the source frame.
+    """
+
+    def __init__(self, df, categories=NINE_CATEGORIES, punts=None):
+        """
+        Args:
+            categories: Categories to value, or a CATEGORY_FORMATS key ('9cat', '8cat').
+            punts: Optional mapping of variant name -> categories punted. By default one
+                single-category punt per category.
+        """
+        if isinstance(categories, str):
+            categories = CATEGORY_FORMATS[categories]
+        unknown = [cat for cat in categories if cat not in NINE_CATEGORIES]
+        if unknown:
+            raise ValueError(f"Unknown categories: {', '.join(unknown)}. Choose from: {', '.join(NINE_CATEGORIES)}")
+        self.categories = tuple(categories)
+        self.index = df.index
+        self._row_of = {player_id: row for row, player_id in enumerate(self.index.tolist())}
+        self.raw = np.zeros((len(df), len(CATEGORY_INPUTS)), dtype=np.float64)
+        for i, col in enumerate(CATEGORY_INPUTS):
+            if col in df.columns:
+                self.raw[:, i] = df[col].to_numpy(dtype=np.float64, na_value=0.0)
+
+        if punts is None:
+            punts = {f"cat_value_punt_{cat}": (cat,) for cat in self.categories}
+        self.variants = ["cat_value"] + list(punts)
+        self.punt_matrix = np.ones((len(self.categories), len(self.variants)), dtype=np.float64)
+        for j, punted in enumerate(punts.values(), start=1):
+            for cat in punted:
+                self.punt_matrix[self.categories.index(cat), j] = 0.0
+        self.reset()
+
+    def reset(self, available=None):
+        """
+        Recomputes the reference-pool moments from scratch for `available` (a boolean mask in
+        row order; all players if None).
+        """
+        self.available = np.ones(len(self.raw), dtype=bool) if available is None else np.array(available, dtype=bool)
+        reference = self.raw[self.available]
+        self._count = len(reference)
+        self._sum = reference.sum(axis=0)
+        self._gram = reference.T @ reference
+        self._values = None
+
+    def copy(self):
+        """
+        An independent copy of the current reference pool, so exclude() / include() on it leave
+        this valuation untouched. Copies the moments and the mask, not the player stats.
+        """
+        valuation = copy.copy(self)
+        valuation.available = self.available.copy()
+        valuation._sum = self._sum.copy()
+        valuation._gram = self._gram.copy()
+        return valuation
+
+    def at(self, available):
+        """
+        A valuation against another reference pool that shares this one's raw data.
+        """
+        valuation = copy.copy(self)
+        valuation.reset(available)
+        return valuation
+
+    def _update(self, player_ids, sign):
+        try:
+            rows = np.fromiter((self._row_of[player_id] for player_id in player_ids), dtype=np.int64)
+        except KeyError:
+            raise KeyError("Some player_ids are not in the valuation's player table.") from None
+        rows = np.unique(rows[self.available[rows] == (sign < 0)])
+        if len(rows) == 0:
+            return
+        block = self.raw[rows]
+        self._count += sign * len(rows)
+        self._sum += sign * block.sum(axis=0)
+        self._gram += sign * (block.T @ block)
+        self.available[rows] = sign > 0
+        self._values = None
+
+    def exclude(self, player_ids):
+        """
+        Removes drafted players from the reference pool (incremental, O(len(player_ids))).
+        """
+        self._update(player_ids, -1)
+
+    def include(self, player_ids):
+        """
+        Puts players back into the reference pool (e.g. after an undo).
+        """
+        self._update(player_ids, 1)
+
+    def league_pct(self, category):
+        """
+        Reference-pool made / attempts of a percentage category.
+        """
+        made, attempts = (CATEGORY_INPUTS.index(col) for col in PERCENT_CATEGORIES[category])
+        return self._sum[made] / self._sum[attempts] if self._sum[attempts] > 0 else 0.0
+
+    def _coefficients(self):
+        """
+        (n_inputs x n_categories) matrix mapping CATEGORY_INPUTS rows to category values.
+        """
+        coef = np.zeros((len(CATEGORY_INPUTS), len(self.categories)), dtype=np.float64)
+        for j, cat in enumerate(self.categories):
+            if cat in PERCENT_CATEGORIES:
+                made, attempts = PERCENT_CATEGORIES[cat]
+                coef[CATEGORY_INPUTS.index(made), j] = 1.0
+                coef[CATEGORY_INPUTS.index(attempts), j] = -self.league_pct(cat)
+            else:
+                coef[CATEGORY_INPUTS.index(cat), j] = -1.0 if cat in NEGATIVE_CATEGORIES else 1.0
+        return coef
+
+    def _compute(self):
+        if self._values is None:
+            coef = self._coefficients()
+            if self._count > 0:
+                mean = self._sum @ coef / self._count
+                var = np.einsum("ij,ik,kj->j", coef, self._gram, coef) / self._count - mean ** 2
+                std = np.sqrt(np.maximum(var, 0.0))
+                std[std == 0] = 1.0
+            else:
+                mean, std = np.zeros(len(self.categories)), np.ones(len(self.categories))
+            z = (self.raw @ coef - mean) / std
+            self._values = (z, z @ self.punt_matrix)
+        return self._values
+
+    def zscores(self):
+        """
+        (n_players x n_categories) z-scores of every player against the reference pool.
+        """
+        return self._compute()[0]
+
+    def totals(self):
+        """
+        (n_players x n_variants) summed z-scores of every punt variant.
+        """
+        return self._compute()[1]
+
+    def frame(self):
+        """
+        z_<category> and variant total columns as a DataFrame indexed by player_id.
+        """
+        z, totals = self._compute()
+        return pd.concat([
+            pd.DataFrame(z, index=self.index, columns=[f"z_{cat}" for cat in self.categories]),
+            pd.DataFrame(totals, index=self.index, columns=self.variants),
+        ], axis=1)
+
+    def register(self, pool, variants=("cat_value",)):
+        """
+        Adds variant totals as score columns of a DraftPool (matched by player id), so the
+        AI pickers can rank by them, e.g. ai_pick_medium(pool, None, score_column='cat_value').
+        """
+        rows = self.index.get_indexer(pool.ids)
+        totals = self.totals()
+        for variant in variants:
+            scores = np.full(len(rows), -np.inf)
+            scores[rows >= 0] = totals[rows[rows >= 0], self.variants.index(variant)]
+            pool.set_scores(variant, scores)
+        return pool
+
+def _feature_fingerprint(df, columns):
+    """
+    SHA-1 of the column names and dtypes plus a per-row hash of the values and the index
+    (pd.util.hash_pandas_object), so equal data always gives the same key whatever its memory
+    layout, including object columns.
+    """
+    digest = hashlib.sha1(repr(columns).encode("utf-8"))
+    digest.update(repr([str(df[col].dtype) for col in columns]).encode("utf-8"))
+    digest.update(str(df.index.dtype).encode("utf-8"))
+    row_hashes = pd.util.hash_pandas_object(df[columns], index=True).to_numpy()
+    digest.update(np.ascontiguousarray(row_hashes).tobytes())
+    return digest.hexdigest()
+
+class FeatureStore:
+    """
+    The model features of one player table as a single C-contiguous float32 matrix.
+
+    The matrix is built once (missing values filled with 0) and marked read-only, so every
+    consumer (training, prediction, AI scoring, similarity) can share it without copying.
+    Build it with feature_store(), which memoizes stores by the content of the data.
+
+    Attributes:
+        matrix (np.ndarray): (n_players x n_features) float32, read-only.
+        columns (list[str]): Feature names, in matrix column order.
+        column_index (dict): Feature name -> column.
+        player_ids (np.ndarray): Player id of each row.
+        row_of (dict): Player id -> row.
+        fingerprint (str): Content hash the store is memoized by.
+    """
+
+    def __init__(self, df, columns=FEATURE_COLUMNS, fingerprint=None):
+        self.columns = [col for col in columns if col in df.columns]
+        self.column_index = {col: i for i, col in enumerate(self.columns)}
+        self.player_ids = df.index.to_numpy()
+        self._index = pd.Index(self.player_ids, name="player_id")
+        self.row_of = {player_id: row for row, player_id in enumerate(self.player_ids.tolist())}
+        self.fingerprint = fingerprint or _feature_fingerprint(df, self.columns)
+
+        matrix = np.empty((len(df), len(self.columns)), dtype=np.float32)
+        for i, col in enumerate(self.columns):
+            matrix[:, i] = df[col].to_numpy(dtype=np.float32, na_value=0.0)
+        np.nan_to_num(matrix, copy=False) # e.g. NaN left in an object column
+        matrix.flags.writeable = False
+        self.matrix = matrix
+
+    def __len__(self):
+        return len(self.matrix)
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    def column(self, name):
+        """
+        One feature as a (read-only, strided) view.
+        """
+        return self.matrix[:, self.column_index[name]]
+
+    def rows(self, player_ids):
+        """
+        Feature rows of the given player ids (a new array). Raises KeyError for unknown ids.
+        """
+        return self.matrix[[self.row_of[player_id] for player_id in player_ids]]
+
+    def frame(self):
+        """
+        The matrix as a DataFrame indexed by player_id, for APIs that want column names
+        (e.g. sklearn). It wraps the shared buffer, so it is cheap and also read-only.
+        """
+        return pd.DataFrame(self.matrix, index=self._index, columns=self.columns, copy=False)
+
+    def __repr__(self):
+        return f"FeatureStore({len(self)} players x {len(self.columns)} features, {self.fingerprint[:12]})"
+
+_feature_stores = OrderedDict()
+_feature_stores_lock = threading.Lock()
+
+def feature_store(df, columns=FEATURE_COLUMNS):
+    """
+    Returns the FeatureStore for `df`, reusing an existing one when the same players and
+    feature values were seen before (e.g. on every Streamlit rerun, or by every consumer
+    of one table). The most recent FEATURE_STORE_CACHE_SIZE stores are kept.
+    """
+    selected = [col for col in columns if col in df.columns]
+    key = _feature_fingerprint(df, selected)
+    with _feature_stores_lock:
+        store = _feature_stores.get(key)
+        if store is not None:
+            _feature_stores.move_to_end(key)
+            return store
+
+    store = FeatureStore(df, selected, fingerprint=key)
+    with _feature_stores_lock:
+        store = _feature_stores.setdefault(key, store)
+        _feature_stores.move_to_end(key)
+        while len(_feature_stores) > FEATURE_STORE_CACHE_SIZE:
+            _feature_stores.popitem(last=False)
+    return store
+
 def create_ml_features(df):
     """
     Selects relevant features for Machine Learning and returns X, y, and player identifiers.
     
     Returns:
-        X (pd.DataFrame): Feature matrix
+        X (pd.DataFrame): Feature matrix (a read-only float32 view of the shared FeatureStore;
+            use feature_store(df) directly for the NumPy matrix and the id/column maps)
         y (pd.Series): Target variable (fantasy_score)
         player_ids (pd.DataFrame): Player identifiers (id, name, team) to map back predictions
     """
-    # Define features to use for prediction
-    # Using base stats and some advanced stats if available
-    feature_cols = [
-        "pts", "reb", "ast", "stl", "blk", "tov", 
-        "min_base", "fgm_base", "fga_base", "fg_pct_base",
-        "fg3m", "fg3a", "fg3_pct", "ftm", "fta", "ft_pct",
-        "oreb", "dreb", "plus_minus", "gp_base"
-    ]
-    
-    # Filter to only columns that actually exist in the dataframe
-    selected_features = [col for col in feature_cols if col in df.columns]
-    
     if "fantasy_score" not in df.columns:
         raise ValueError("Target column 'fantasy_score' not found. Run compute_fantasy_score first.")
-        
-    X = df[selected_features].fillna(0) # Simple imputation
+
+    # Only the columns that actually exist in the dataframe; missing values are filled with 0
+    X = feature_store(df).frame()
     y = df["fantasy_score"]
     
     # Keep track of who is who
@@ -71,4 +525,17 @@ def create_ml_features(df):
     player_ids = df[existing_id_cols].copy()
     player_ids['player_id'] = df.index
     
-    return X, y, player_ids
\ No newline at end of file
+    return X, y, player_ids
+
+def stream_fantasy_scores(filepaths, scoring_rules=None, chunksize=20000, schema=PLAYER_SCHEMA, max_workers=None):
+    """
+    Streams many seasons of player stat files through load -> filter -> compute_fantasy_score
+    without concatenating them into one DataFrame.
+
+    Yields:
+        (filepath, chunk): the source file and a scored chunk of at most `chunksize` rows.
+    Memory stays bounded by the number of in-flight chunks, so callers that aggregate
+    (or write each chunk out) can ingest any number of seasons.
+    """
+    for filepath, chunk in iter_player_chunks(filepaths, chunksize=chunksize, schema=schema, max_workers=max_workers):
+        yield filepath, compute_fantasy_score(chunk, scoring_rules)
@@ -1,10 +1,10 @@
 from data_loader import load_player_data, filter_nba_players, standardize_column_names
 from feature_engineering import compute_fantasy_score, create_ml_features
-from ml_models import train_draft_model
+from ml_models import train_draft_model, train_bootstrap_ensemble
 # from ai_agent import ai_pick_easy, ai_pick_medium, ai_pick_hard # 不一定需要導入
 from fantasy_engine import simulate_match, draft_phase
+from match_engine import MatchEngine
 import pandas as pd
-from feature_engineering import create_ml_features # 需要再次導入來獲取 X
 
 def main():
 
@@ -48,6 +48,8 @@ def main():
             df['pred_score'] = pred_scores
             # 確保 pred_score 是非負值
             df['pred_score'] = df['pred_score'].clip(lower=0)
+            # 預測的不確定性 (bootstrap 集成)，HARD AI 用來評估高上限 / 低下限的球員
+            df['pred_std'] = train_bootstrap_ensemble(X, y, draft_model.alpha).prediction_frame(X)['pred_std']
             print("Successfully calculated 'pred_score' on the main DataFrame.")
         except Exception as e:
             print(f"Error during model prediction in main: {e}. 'pred_score' will be missing.")
@@ -63,15 +65,18 @@ def main():
 
     # ---- Step 5: Simulate Match ----
     print("\n--- 5. Match Simulation ---")
-    # 傳入 difficulty 參數
-    result = simulate_match(player_team, ai_team, df, difficulty) 
+    # 傳入 difficulty 參數；以隨機對戰模擬 (每名球員依出賽率與場均數據抽樣) 決定勝負
+    result = simulate_match(player_team, ai_team, df, difficulty, engine=MatchEngine(df), scoring_rules=scoring_rules)
 
     # ---- Step 6: Display Results ----
     print("\n--- Final Results ---")
     print(f"Scoring Mode: {result['score_type']}") 
     print(f"Player's Team Score: {result['player_score']:.2f}")
     print(f"AI's Team Score: {result['ai_score']:.2f}")
+    print(f"Win Probability: Player {result['win_prob']:.1%} / AI {result['loss_prob']:.1%} (Draw {result['tie_prob']:.1%})")
     print(f"Winner: **{result['winner']}**")
+    print("\nCategory margins (Player - AI):")
+    print(result['category_margins'].to_string(float_format="{:.3f}".format))
     
     # 顯示隊伍陣容
     player_names = df.loc[player_team, 'Player'].tolist() if 'Player' in df.columns else player_team
@@ -0,0 +1,202 @@
+"""
+Stochastic head-to-head match engine.
+
+Instead of comparing two sums of season averages, every matchup is simulated n_sims times
+at once as a NumPy tensor of shape (sims x players x stats):
+
+- games played: each player appears in each of the matchup's `n_games` games with
+  probability gp_base / SEASON_GAMES (Binomial);
+- every counting stat is Poisson around games played x the per-game average. Shots are
+  split into 3PM, other makes and misses (Poisson thinning of attempts by the player's
+  percentages), so FGA = FGM + misses and pts = 2*FGM + 3PM + FTM hold for every
+  sampled stat line.
+
+All Poisson draws of a matchup are made in a single call. A result carries the win
+probability, the score distribution of both teams and the per-category margins, in points
+or category scoring (9-cat by default, or any subset of CATEGORIES such as 8-cat). A 5-vs-5 matchup takes ~15 ms for 1,000 sims and ~4 ms for
+the 200 sims win_probability() uses in search loops (sampling dominates).
+"""
+import numpy as np
+import pandas as pd
+from feature_engineering import SCORING_STATS, scoring_weight_matrix
+
+SEASON_GAMES = 82
+GAMES_PER_MATCHUP = 3 # games per player in one head-to-head period (a week)
+DEFAULT_SIMULATIONS = 1000
+
+# Stats in the last axis of a sampled tensor (matchup totals, not per-game)
+MATCH_STATS = ("pts", "reb", "ast", "stl", "blk", "tov", "fg3m", "fgm", "fga", "ftm", "fta")
+POISSON_STATS = ("reb", "ast", "stl", "blk", "tov")
+# Head-to-head categories; percentages are volume-weighted (team makes / team attempts)
+CATEGORIES = ("fg_pct", "ft_pct", "fg3m", "pts", "reb", "ast", "stl", "blk", "tov")
+LOWER_IS_BETTER = ("tov",)
+
+# Independent Poisson components of a stat line, per game
+_COMPONENTS = ("fg3m", "fg2m", "fg_miss", "ftm", "ft_miss") + POISSON_STATS
+_STAT = {stat: i for i, stat in enumerate(MATCH_STATS)}
+
+def _column(df, col):
+    if col not in df.columns:
+        return np.zeros(len(df))
+    return df[col].to_numpy(dtype=np.float64, na_value=0.0)
+
+def _ratio(made, attempts):
+    return np.divide(made, attempts, out=np.zeros_like(made, dtype=np.float64), where=attempts > 0)
+
+def _score_totals(totals, scoring, scoring_rules, categories=CATEGORIES):
+    """
+    Scores sampled team totals (n_sims x 2 x stats). Returns (scores, category margins of
+    team_a - team_b, category wins as +1/0/-1 for team_a), over `categories`.
+    """
+    if scoring not in ("points", "categories"):
+        raise ValueError(f"Unknown scoring '{scoring}'. Choose 'points' or 'categories'.")
+    unknown = [cat for cat in categories if cat not in CATEGORIES]
+    if unknown:
+        raise ValueError(f"Unknown categories: {', '.join(unknown)}. Choose from: {', '.join(CATEGORIES)}")
+    n_sims = len(totals)
+    values = np.empty((n_sims, 2, len(categories)), dtype=np.float64)
+    for j, cat in enumerate(categories):
+        if cat == "fg_pct":
+            values[..., j] = _ratio(totals[..., _STAT["fgm"]], totals[..., _STAT["fga"]])
+        elif cat == "ft_pct":
+            values[..., j] = _ratio(totals[..., _STAT["ftm"]], totals[..., _STAT["fta"]])
+        else:
+            values[..., j] = totals[..., _STAT[cat]]
+    margins = values[:, 0] - values[:, 1]
+    direction = np.array([-1.0 if cat in LOWER_IS_BETTER else 1.0 for cat in categories])
+    category_wins = np.sign(margins * direction)
+
+    if scoring == "points":
+        if scoring_rules is None or isinstance(scoring_rules, dict):
+            weights = scoring_weight_matrix([scoring_rules or {}])[:, 0]
+        else:
+            weights = np.asarray(scoring_rules, dtype=np.float64)
+        scores = totals[..., [_STAT[stat] for stat in SCORING_STATS]] @ weights
+    else:
+        scores = np.stack([(category_wins > 0).sum(axis=1), (category_wins < 0).sum(axis=1)], axis=1)
+        scores = scores.astype(np.float64)
+
+    return scores, margins, category_wins
+
+class MatchEngine:
+    """
+    Per-player rates for sampling matchups, built once from the per-game averages of a
+    player table (needs gp_base, fgm_base, fga_base, fg3m, ftm, fta, reb, ast, stl, blk, tov).
+
+    Attributes:
+        index (pd.Index): Player ids, in row order of the rate arrays.
+        availability (np.ndarray): Probability a player plays a given game.
+        n_games (int): Games per player in a matchup.
+    """
+
+    def __init__(self, df, n_games=GAMES_PER_MATCHUP, season_games=SEASON_GAMES):
+        self.index = df.index
+        self.n_games = n_games
+        self.availability = np.clip(_column(df, "gp_base") / season_games, 0.0, 1.0)
+        fga, fta = _column(df, "fga_base"), _column(df, "fta")
+        fgm = np.minimum(_column(df, "fgm_base"), fga)
+        ftm = np.minimum(_column(df, "ftm"), fta)
+        fg3m = np.minimum(_column(df, "fg3m"), fgm)
+        # Per-game rate of each _COMPONENTS entry (n_players x n_components)
+        self.rates = np.column_stack([fg3m, fgm - fg3m, fga - fgm, ftm, fta - ftm]
+                                     + [_column(df, stat) for stat in POISSON_STATS])
+
+    def rows(self, player_ids):
+        """
+        Row positions of player ids. Raises KeyError for unknown ids.
+        """
+        rows = self.index.get_indexer(player_ids)
+        if (rows < 0).any():
+            raise KeyError("Some player_ids are not in the match engine's player table.")
+        return rows
+
+    def sample(self, rows, n_sims=DEFAULT_SIMULATIONS, rng=None):
+        """
+        Samples matchup stat totals for the players at `rows`.
+
+        Returns:
+            np.ndarray of shape (n_sims, len(rows), len(MATCH_STATS)).
+        """
+        rng = rng if rng is not None else np.random.default_rng()
+        rows = np.asarray(rows, dtype=np.int64)
+        shape = (n_sims, len(rows))
+        games = rng.binomial(self.n_games, np.broadcast_to(self.availability[rows], shape))
+
+        fg3m, fg2m, fg_miss, ftm, ft_miss, *counting = np.moveaxis(
+            rng.poisson(games[..., None] * self.rates[rows]).astype(np.float64), -1, 0)
+
+        out = np.empty(shape + (len(MATCH_STATS),), dtype=np.float64)
+        fgm = fg3m + fg2m
+        out[..., _STAT["fg3m"]] = fg3m
+        out[..., _STAT["fgm"]] = fgm
+        out[..., _STAT["fga"]] = fgm + fg_miss
+        out[..., _STAT["ftm"]] = ftm
+        out[..., _STAT["fta"]] = ftm + ft_miss
+        out[..., _STAT["pts"]] = 2 * fgm + fg3m + ftm
+        for stat, values in zip(POISSON_STATS, counting):
+            out[..., _STAT[stat]] = values
+        return out
+
+    def team_totals(self, team_a, team_b, n_sims=DEFAULT_SIMULATIONS, rng=None):
+        """
+        Sampled matchup totals of both rosters, shape (n_sims, 2, len(MATCH_STATS)).
+        """
+        rows_a, rows_b = self.rows(team_a), self.rows(team_b)
+        lines = self.sample(np.concatenate([rows_a, rows_b]), n_sims, rng)
+        return np.stack([lines[:, :len(rows_a)].sum(axis=1), lines[:, len(rows_a):].sum(axis=1)], axis=1)
+
+    def simulate(self, team_a, team_b, n_sims=DEFAULT_SIMULATIONS, scoring="points", scoring_rules=None,
+                 quantiles=(0.1, 0.5, 0.9), seed=None, categories=CATEGORIES):
+        """
+        Simulates n_sims matchups between two rosters (lists of player ids).
+
+        Args:
+            scoring: 'points' (totals weighted by `scoring_rules`) or 'categories'
+                (the team winning more of `categories` wins; a sim's score is its categories won).
+            scoring_rules: Weight dict over SCORING_STATS, or a weight vector in that order
+                (points scoring; defaults to DEFAULT_SCORING_RULES).
+            seed: Seed for the sampling (same seed, same result).
+            categories: Head-to-head categories, a subset of CATEGORIES (e.g. 8-cat without
+                'tov'); also the rows of category_margins.
+
+        Returns:
+            dict with
+            - win_prob / loss_prob / tie_prob: outcome probabilities for team_a;
+            - scores: (n_sims, 2) sampled scores of team_a and team_b;
+            - score_mean, score_std: per team;
+            - score_quantiles: DataFrame (quantile x team);
+            - category_margins: DataFrame indexed by `categories` with the mean and std of
+              team_a - team_b and team_a's probability of winning the category;
+            - scoring, n_sims.
+        """
+        totals = self.team_totals(team_a, team_b, n_sims, np.random.default_rng(seed))
+        scores, margins, category_wins = _score_totals(totals, scoring, scoring_rules, categories)
+
+        diff = scores[:, 0] - scores[:, 1]
+        return {
+            "win_prob": float((diff > 0).mean()),
+            "loss_prob": float((diff < 0).mean()),
+            "tie_prob": float((diff == 0).mean()),
+            "scores": scores,
+            "score_mean": scores.mean(axis=0),
+            "score_std": scores.std(axis=0),
+            "score_quantiles": pd.DataFrame(np.quantile(scores, quantiles, axis=0), index=list(quantiles),
+                                            columns=["team_a", "team_b"]),
+            "category_margins": pd.DataFrame({
+                "mean_margin": margins.mean(axis=0),
+                "std_margin": margins.std(axis=0),
+                "win_prob": (category_wins > 0).mean(axis=0),
+            }, index=list(categories)),
+            "scoring": scoring,
+            "n_sims": n_sims,
+        }
+
+    def win_probability(self, team_a, team_b, n_sims=200, scoring="points", scoring_rules=None, seed=None,
+                        categories=CATEGORIES):
+        """
+        Probability that team_a beats team_b (ties count half), for use in search loops.
+        """
+        totals = self.team_totals(team_a, team_b, n_sims, np.random.default_rng(seed))
+        scores, _, _ = _score_totals(totals, scoring, scoring_rules, categories)
+        diff = scores[:, 0] - scores[:, 1]
+        return float((diff > 0).mean() + 0.5 * (diff == 0).mean())
@@ -1,32 +1,439 @@
+import os
+import pickle
+import hashlib
+import numpy as np
 import pandas as pd
-from sklearn.linear_model import Ridge
-from sklearn.model_selection import cross_val_score
+import sklearn
+from scipy.linalg import cho_factor, cho_solve
+from scipy.stats import norm
 
-def train_draft_model(X, y):
+# 訓練好的模型存放位置 (與本檔案同目錄的 .model_cache 資料夾)
+MODEL_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".model_cache")
+MODEL_CACHE_MAX_BYTES = 64 * 1024 * 1024 # 快取總大小上限
+MODEL_CACHE_MAX_ENTRIES = 32 # 快取檔案數上限
+# 選擇 Ridge alpha 時搜尋的範圍
+RIDGE_ALPHAS = tuple(np.logspace(-3, 3, 13).tolist())
+BOOTSTRAP_SAMPLES = 200 # 不確定性估計用的 bootstrap 模型數
+PRED_QUANTILES = (0.1, 0.9) # 預測分布輸出的分位數 (pred_q10、pred_q90)
+# 模型類別的程式碼 (擬合方式或 pickle 的屬性) 改變時遞增，讓舊的快取模型自動失效
+MODEL_CACHE_VERSION = 2
+
+def model_fingerprint(X, y, model_class, params):
+    """
+    以 X、y 的內容、特徵名稱、模型類別 (module + qualname)、超參數、sklearn 版本與
+    MODEL_CACHE_VERSION 計算模型的 key (SHA-256)。
+    任何一項改變都會得到不同的 key，所以舊模型 (或其他類別的模型) 不會被誤用。
+    """
+    digest = hashlib.sha256()
+    X_values = np.ascontiguousarray(np.asarray(X))
+    y_values = np.ascontiguousarray(np.asarray(y))
+    features = list(X.columns) if isinstance(X, pd.DataFrame) else []
+    header = {
+        "features": features,
+        "X": [X_values.shape, str(X_values.dtype)],
+        "y": [y_values.shape, str(y_values.dtype)],
+        "model": f"{model_class.__module__}.{model_class.__qualname__}",
+        "params": sorted((k, repr(v)) for k, v in params.items()),
+        "sklearn": sklearn.__version__,
+        "version": MODEL_CACHE_VERSION,
+    }
+    digest.update(repr(header).encode("utf-8"))
+    digest.update(X_values.tobytes())
+    digest.update(y_values.tobytes())
+    return digest.hexdigest()
+
+class ModelStore:
+    """
+    本地模型快取：以 key 存取 pickle 後的模型，超過大小或數量上限時淘汰最久未使用 (LRU) 的檔案。
+    使用時間以檔案的 mtime 記錄，讀取時會更新。
+    """
+
+    def __init__(self, directory=MODEL_CACHE_DIR, max_bytes=MODEL_CACHE_MAX_BYTES, max_entries=MODEL_CACHE_MAX_ENTRIES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def load(self, key):
+        """
+        回傳快取中的模型，沒有或無法讀取時回傳 None。
+        """
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                model = pickle.load(f)
+        except Exception as e:
+            print(f"Warning: Could not load cached model {key[:12]} ({e}). Retraining.")
+            return None
+        os.utime(path) # 標記為最近使用
+        return model
+
+    def save(self, key, model):
+        """
+        寫入模型 (先寫暫存檔再替換)，接著依 LRU 淘汰超出上限的檔案。
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".pkl"):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime_ns, stat.st_size, name))
+        entries.sort() # 最舊的在前
+
+        total = sum(size for _, size, _ in entries)
+        while entries and (total > self.max_bytes or len(entries) > self.max_entries):
+            _, size, name = entries.pop(0)
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+class RidgeModel:
+    """
+    RidgeSolver 解出的單一目標 Ridge 模型，介面與 sklearn Ridge 相同 (coef_、intercept_、predict)。
+    """
+
+    def __init__(self, coef, intercept, alpha, feature_names=None, cv_results=None):
+        self.coef_ = coef
+        self.intercept_ = intercept
+        self.alpha = alpha
+        self.feature_names_in_ = feature_names
+        # select_alpha 的結果 (alphas、loo_mse、gcv_mse)，固定 alpha 訓練時為 None
+        self.cv_results_ = cv_results
+
+    def predict(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef_ + self.intercept_
+
+    def get_params(self, deep=True):
+        return {"alpha": self.alpha}
+
+    def __repr__(self):
+        return f"RidgeModel(alpha={self.alpha})"
+
+class RidgeSolver:
+    """
+    以 NumPy/SciPy 實作的 Ridge 回歸 (與 sklearn Ridge(fit_intercept=True) 相同的目標函數)。
+
+    X 固定時，昂貴的部分 (XᵀX + αI 的 Cholesky 分解) 只算一次並依 alpha 快取，
+    之後任何數量的目標 (例如不同計分規則下的 fantasy_score) 都只需要矩陣乘法與三角求解。
+    需要掃描多個 alpha 時使用 X 的 SVD，一次分解即可得到所有 alpha 的解。
+    """
+
+    def __init__(self, X):
+        self.feature_names = list(X.columns) if isinstance(X, pd.DataFrame) else None
+        X = np.asarray(X, dtype=np.float64)
+        self.x_mean = X.mean(axis=0)
+        self.Xc = np.ascontiguousarray(X - self.x_mean)
+        self.gram = self.Xc.T @ self.Xc
+        self._factors = {}
+        self._svd = None
+
+    def _factor(self, alpha):
+        """
+        XᵀX + αI 的 Cholesky 分解 (依 alpha 快取)。
+        """
+        if alpha not in self._factors:
+            self._factors[alpha] = cho_factor(self.gram + alpha * np.eye(self.gram.shape[0]))
+        return self._factors[alpha]
+
+    def svd(self):
+        """
+        中心化 X 的精簡 SVD (U, s, Vt)，只計算一次。
+        """
+        if self._svd is None:
+            self._svd = np.linalg.svd(self.Xc, full_matrices=False)
+        return self._svd
+
+    def solve(self, Y, alpha=1.0):
+        """
+        一次解出多個目標的係數。
+
+        Args:
+            Y: (n_samples,) 或 (n_samples, n_targets) 的目標。
+        Returns:
+            (coef, intercept)：coef 為 (n_features,) 或 (n_features, n_targets)。
+        """
+        Y = np.asarray(Y, dtype=np.float64)
+        y_mean = Y.mean(axis=0)
+        coef = cho_solve(self._factor(alpha), self.Xc.T @ (Y - y_mean))
+        intercept = y_mean - self.x_mean @ coef
+        return coef, intercept
+
+    def solve_path(self, Y, alphas):
+        """
+        以 SVD 一次算出多個 alpha 的係數：coef(α) = V diag(s / (s² + α)) Uᵀ Yc。
+        回傳 (n_alphas, n_features[, n_targets]) 的係數與對應的截距。
+        """
+        Y = np.asarray(Y, dtype=np.float64)
+        y_mean = Y.mean(axis=0)
+        U, s, Vt = self.svd()
+        UtY = U.T @ (Y - y_mean)
+        coefs = []
+        for alpha in alphas:
+            d = s / (s * s + alpha)
+            coefs.append(Vt.T @ (d.reshape(-1, *([1] * (UtY.ndim - 1))) * UtY))
+        coefs = np.stack(coefs)
+        intercepts = y_mean - np.einsum("f,af...->a...", self.x_mean, coefs)
+        return coefs, intercepts
+
+    def fit(self, y, alpha=1.0, cv_results=None):
+        """
+        解出單一目標並回傳 RidgeModel。
+        """
+        coef, intercept = self.solve(y, alpha)
+        return RidgeModel(coef, float(intercept), alpha, self.feature_names, cv_results)
+
+    def cv_path(self, y, alphas=RIDGE_ALPHAS):
+        """
+        以 SVD 解析地計算每個 alpha 的留一交叉驗證 (LOO) 與廣義交叉驗證 (GCV) 誤差，不需要重新訓練。
+
+        帽子矩陣 H(α) = U diag(s² / (s² + α)) Uᵀ + 11ᵀ/n (最後一項來自不受懲罰的截距)，
+        留一殘差為 e_i / (1 - H_ii)，GCV 則以 1 - tr(H)/n 取代每個 1 - H_ii。
+
+        Returns:
+            dict: alphas、loo_mse、gcv_mse (皆為與 alphas 等長的陣列)。
+        """
+        y = np.asarray(y, dtype=np.float64)
+        n = len(y)
+        alphas = np.asarray(alphas, dtype=np.float64)
+        U, s, _ = self.svd()
+        s2 = s * s
+        shrink = s2[:, None] / (s2[:, None] + alphas[None, :]) # (k, n_alphas)
+
+        yc = y - y.mean()
+        fitted = U @ (shrink * (U.T @ yc)[:, None]) # 中心化後的預測值 (n, n_alphas)
+        residuals = yc[:, None] - fitted
+        leverage = (U * U) @ shrink + 1.0 / n
+        loo = residuals / np.maximum(1.0 - leverage, 1e-12)
+        gcv_denom = np.maximum(1.0 - leverage.sum(axis=0) / n, 1e-12)
+        return {
+            "alphas": alphas,
+            "loo_mse": (loo * loo).mean(axis=0),
+            "gcv_mse": (residuals * residuals).mean(axis=0) / (gcv_denom * gcv_denom),
+        }
+
+    def select_alpha(self, y, alphas=RIDGE_ALPHAS, criterion="loo"):
+        """
+        回傳 (LOO 或 GCV 誤差最小的 alpha, cv_path 的結果)。
+        """
+        if criterion not in ("loo", "gcv"):
+            raise ValueError(f"Unknown criterion '{criterion}'. Choose 'loo' or 'gcv'.")
+        results = self.cv_path(y, alphas)
+        best = int(np.argmin(results[f"{criterion}_mse"]))
+        results["criterion"] = criterion
+        results["best_index"] = best
+        return float(results["alphas"][best]), results
+
+    def fitted(self, Y, alpha=1.0):
+        """
+        訓練資料上的預測值 (n_samples, n_targets)。
+        """
+        coef, intercept = self.solve(Y, alpha)
+        return self.Xc @ coef + (intercept + self.x_mean @ coef)
+
+def scoring_prediction_basis(X, stats, alpha=1.0, solver=None):
+    """
+    預測值對目標是線性的，而 fantasy_score = stats @ weights，所以先把每個數據欄當成目標解一次，
+    得到 (n_players, n_stats) 的基底 P；任何新的計分權重 w 的預測分數就是 P @ w，
+    不需要重新訓練。
+
+    Args:
+        X: 特徵矩陣。
+        stats: (n_players, n_stats) 的計分數據矩陣 (feature_engineering.stat_matrix)。
+        solver (RidgeSolver): 可重複使用已分解好的 solver。
+    """
+    solver = solver or RidgeSolver(X)
+    return solver.fitted(stats, alpha)
+
+class BootstrapRidge:
+    """
+    Ridge 的 bootstrap 集成，用來估計每位球員預測分數的不確定性。
+
+    每個 bootstrap 樣本等同於以重抽次數為權重的加權 Ridge，所以不需要真的複製數據：
+    B 個加權 Gram 矩陣以一次 einsum 算出，再以一次批次 np.linalg.solve 解出全部係數，
+    成本與訓練一個模型同一數量級，而不是 B 次 sklearn fit。
+
+    Y 可以是多個目標 (例如每個計分數據欄)；預測時給權重即可得到任意計分規則的分布，
+    與 scoring_prediction_basis 相同的線性性質。
+    """
+
+    def __init__(self, alpha=1.0, n_boot=BOOTSTRAP_SAMPLES, seed=0):
+        self.alpha = alpha
+        self.n_boot = n_boot
+        self.seed = seed
+
+    def fit(self, X, Y):
+        X = np.asarray(X, dtype=np.float64)
+        Y = np.asarray(Y, dtype=np.float64)
+        self.single_target_ = Y.ndim == 1
+        Y = Y.reshape(len(Y), -1)
+        n, n_features = X.shape
+
+        rng = np.random.default_rng(self.seed)
+        counts = rng.multinomial(n, np.full(n, 1.0 / n), size=self.n_boot).astype(np.float64) # (B, n)
+
+        # 先以整體平均中心化，數值上較穩定
+        shift = X.mean(axis=0)
+        Xc = X - shift
+        x_mean = counts @ Xc / n # 每個樣本的加權平均 (B, p)
+        y_mean = counts @ Y / n # (B, k)
+
+        # 每位球員的外積 x xᵀ 與 x yᵀ 攤平後，B 個加權和就是一次矩陣乘法
+        outer_xx = np.einsum("nf,ng->nfg", Xc, Xc).reshape(n, -1)
+        outer_xy = np.einsum("nf,nk->nfk", Xc, Y).reshape(n, -1)
+        gram = (counts @ outer_xx).reshape(-1, n_features, n_features)
+        gram -= n * np.einsum("bf,bg->bfg", x_mean, x_mean)
+        diag = np.arange(n_features)
+        gram[:, diag, diag] += self.alpha
+        rhs = (counts @ outer_xy).reshape(-1, n_features, Y.shape[1])
+        rhs -= n * np.einsum("bf,bk->bfk", x_mean, y_mean)
+
+        self.coefs_ = np.linalg.solve(gram, rhs) # (B, p, k)
+        self.intercepts_ = y_mean - np.einsum("bf,bfk->bk", x_mean + shift, self.coefs_) # (B, k)
+
+        # 沒被抽到的球員 (out-of-bag) 的殘差共變異，作為預測分布中無法由模型解釋的部分
+        residuals = Y[None] - (np.matmul(X, self.coefs_) + self.intercepts_[:, None, :])
+        oob = counts == 0
+        n_oob = max(int(oob.sum()), 1)
+        oob_residuals = (residuals * oob[:, :, None]).reshape(-1, Y.shape[1])
+        self.residual_cov_ = oob_residuals.T @ oob_residuals / n_oob
+        return self
+
+    def predict_distribution(self, X, weights=None):
+        """
+        每個 bootstrap 模型的預測 (n_players, B)。
+        多目標模型需要給 weights (長度 k)，回傳的是 Y @ weights 的預測。
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if weights is None:
+            if not self.single_target_:
+                raise ValueError("weights are required for a multi-target ensemble.")
+            weights = np.ones(1)
+        weights = np.asarray(weights, dtype=np.float64)
+        coefs = self.coefs_ @ weights # (B, p)
+        intercepts = self.intercepts_ @ weights # (B,)
+        return X @ coefs.T + intercepts
+
+    def prediction_moments(self, X):
+        """
+        每名球員在 B 個 bootstrap 模型間的預測平均 (n_players, k) 與共變異 (n_players, k, k)。
+        Y @ w 的預測平均與變異就是 mean @ w 與 wᵀ cov w，所以算一次之後，
+        prediction_frame(..., moments=...) 對任何權重都只要 O(n k²)，不必重新產生 B 個預測。
+        """
+        X = np.asarray(X, dtype=np.float64)
+        samples = np.matmul(X, self.coefs_) + self.intercepts_[:, None, :] # (B, n, k)
+        mean = samples.mean(axis=0)
+        centered = samples - mean
+        cov = np.einsum("bnk,bnl->nkl", centered, centered) / max(len(samples) - 1, 1) # ddof=1
+        return mean, cov
+
+    def prediction_frame(self, X, weights=None, quantiles=PRED_QUANTILES, index=None, moments=None):
+        """
+        pred_mean、pred_std 與分位數欄位 (pred_q10、pred_q90 ...)。
+
+        預測變異 = bootstrap 模型之間的變異 + out-of-bag 殘差變異；
+        分位數以此平均與標準差的常態近似計算，下限取 0 (與 pred_score 相同)。
+        moments 為 prediction_moments(X) 的結果時直接由它計算 (結果相同)。
+        """
+        w = np.ones(1) if weights is None else np.asarray(weights, dtype=np.float64)
+        if moments is not None:
+            mean_basis, cov = moments
+            mean = mean_basis @ w
+            model_var = np.maximum(((cov @ w) * w).sum(axis=1), 0.0) if len(self.coefs_) > 1 else np.zeros(len(mean))
+        else:
+            samples = self.predict_distribution(X, weights)
+            model_var = samples.var(axis=1, ddof=1) if samples.shape[1] > 1 else np.zeros(len(samples))
+            mean = samples.mean(axis=1)
+        std = np.sqrt(model_var + max(float(w @ self.residual_cov_ @ w), 0.0))
+        columns = {"pred_mean": mean, "pred_std": std}
+        for q in quantiles:
+            columns[f"pred_q{round(q * 100)}"] = np.maximum(0, mean + norm.ppf(q) * std)
+        if index is None and isinstance(X, pd.DataFrame):
+            index = X.index
+        return pd.DataFrame(columns, index=index)
+
+def train_bootstrap_ensemble(X, Y, alpha=1.0, n_boot=BOOTSTRAP_SAMPLES, seed=0, use_cache=True, store=None):
+    """
+    訓練 BootstrapRidge (同樣使用 ModelStore 快取)。
+    alpha 通常用 train_draft_model 選出的 model.alpha。
+    """
+    if use_cache:
+        store = store or ModelStore()
+        key = model_fingerprint(X, Y, BootstrapRidge, {"alpha": alpha, "n_boot": n_boot, "seed": seed})
+        cached = store.load(key)
+        if cached is not None:
+            return cached
+
+    ensemble = BootstrapRidge(alpha, n_boot, seed).fit(X, Y)
+
+    if use_cache:
+        try:
+            store.save(key, ensemble)
+        except Exception as e:
+            print(f"Warning: Could not cache bootstrap ensemble ({e}).")
+    return ensemble
+
+def train_draft_model(X, y, use_cache=True, store=None, alphas=RIDGE_ALPHAS, criterion="loo"):
     """
     使用 Ridge Regression 訓練選秀模型，並返回已訓練的模型。
-    
+    alpha 由留一交叉驗證 (或 GCV) 從 alphas 中選出；兩者都由同一次 SVD 解析算出，
+    不需要額外訓練。
+    相同的數據、特徵與超參數訓練過的模型會從本地快取載入，不再重新訓練。
+
     Args:
         X (pd.DataFrame): 特徵矩陣。
         y (pd.Series): 目標變數 (fantasy_score)。
-        
+        use_cache (bool): 是否使用模型快取。
+        store (ModelStore): 自訂快取位置，預設使用 MODEL_CACHE_DIR。
+        alphas: 候選的 alpha；只給一個值時直接使用該 alpha。
+        criterion (str): 'loo' 或 'gcv'。
+
     Returns:
-        Ridge: 訓練好的 Ridge 回歸模型。
+        RidgeModel: 訓練好的 Ridge 回歸模型。選出的 alpha 在 model.alpha，
+        各 alpha 的交叉驗證誤差在 model.cv_results_。
     """
+    alphas = tuple(float(a) for a in np.atleast_1d(alphas))
+
+    if use_cache:
+        store = store or ModelStore()
+        key = model_fingerprint(X, y, RidgeModel, {"alphas": alphas, "criterion": criterion})
+        cached = store.load(key)
+        if cached is not None:
+            print("\n--- Loaded cached draft model (Ridge Regression) ---")
+            return cached
+
     print("\n--- Training Draft Model (Ridge Regression) ---")
-    
-    # 初始化模型
-    model = Ridge(alpha=1.0)
-    
-    # 執行簡單的交叉驗證來評估性能 (可選)
-    try:
-        scores = cross_val_score(model, X, y, cv=5, scoring='neg_mean_squared_error')
-        # print(f"Cross-Validation MSE Scores: {scores.mean():.2f}")
-    except ValueError:
-        print("Warning: Could not perform cross-validation (e.g., too few samples/features).")
-        
+
+    solver = RidgeSolver(X)
+    cv_results = None
+    alpha = alphas[0]
+    if len(alphas) > 1:
+        if len(y) < 3:
+            print("Warning: Could not perform cross-validation (too few samples). Using the first alpha.")
+        else:
+            alpha, cv_results = solver.select_alpha(y, alphas, criterion)
+            best_mse = cv_results[f"{criterion}_mse"][cv_results["best_index"]]
+            print(f"Selected alpha={alpha:g} ({criterion.upper()} RMSE: {np.sqrt(best_mse):.4g})")
+
     # 在所有數據上訓練最終模型
-    model.fit(X, y)
+    model = solver.fit(y, alpha, cv_results)
     print("Draft model training complete.")
-    
-    return model
\ No newline at end of file
+
+    if use_cache:
+        try:
+            store.save(key, model)
+        except Exception as e:
+            # 唯讀的部署環境寫不了快取，不影響訓練結果
+            print(f"Warning: Could not cache draft model ({e}).")
+
+    return model
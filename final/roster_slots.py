@@ -0,0 +1,209 @@
+"""
+Roster slots, position eligibility and a bitmask feasibility check.
+
+Positions are bits (PG=1, SG=2, SF=4, PF=8, C=16); a player's eligibility and a slot's
+accepted positions are both 5-bit masks, and a player fits a slot when the masks intersect.
+
+Feasibility is Hall's condition for matching every rostered player to a distinct slot.
+Because adjacency only depends on masks, the neighbourhood of any set of players is the set
+of slots intersecting the union U of their masks, and the worst set for a given U is every
+player whose mask lies inside U. So a roster fits iff, for all 31 non-empty U,
+
+    #players with mask ⊆ U  <=  #slots whose mask intersects U.
+
+A RosterState keeps slack[U] (right side minus left side) and the bitmask of player types
+that no longer fit: adding a player only touches the supersets of its mask, and testing a
+candidate is a single bit test, cheap enough for every pick and every MCTS rollout step.
+A roster that satisfies the condition can always be completed while the pool still has a
+player for one of its open slots (UTIL and BENCH accept everyone).
+
+The player table has no positions, so infer_positions() derives them from per-minute
+stats (see its docstring).
+"""
+import numpy as np
+import pandas as pd
+
+POSITIONS = ("PG", "SG", "SF", "PF", "C")
+POSITION_BITS = {pos: 1 << i for i, pos in enumerate(POSITIONS)}
+ALL_POSITIONS = (1 << len(POSITIONS)) - 1
+N_TYPES = ALL_POSITIONS + 1 # eligibility masks 0..31 (0 = no position, fits nothing)
+
+SLOT_POSITIONS = {
+    "PG": POSITION_BITS["PG"],
+    "SG": POSITION_BITS["SG"],
+    "SF": POSITION_BITS["SF"],
+    "PF": POSITION_BITS["PF"],
+    "C": POSITION_BITS["C"],
+    "G": POSITION_BITS["PG"] | POSITION_BITS["SG"],
+    "F": POSITION_BITS["SF"] | POSITION_BITS["PF"],
+    "UTIL": ALL_POSITIONS,
+    "BENCH": ALL_POSITIONS,
+}
+# A standard 13-man head-to-head roster
+DEFAULT_ROSTER_SLOTS = ("PG", "SG", "G", "SF", "PF", "F", "C", "C", "UTIL", "UTIL", "BENCH", "BENCH", "BENCH")
+# Slots kept first when a draft has fewer rounds than a full roster
+SLOT_PRIORITY = ("PG", "SG", "SF", "PF", "C", "G", "F", "UTIL", "UTIL", "UTIL")
+
+POSITION_COLUMN = "pos_mask" # eligibility mask column of a player table
+DUAL_ELIGIBILITY_MARGIN = 0.2 # in position units, see infer_positions
+
+# SUPERSETS[e]: every U containing e; SUBSET_BITS[U]: bitmask of every type contained in U
+SUPERSETS = [[u for u in range(1, N_TYPES) if u & e == e] for e in range(N_TYPES)]
+SUBSET_BITS = [sum(1 << e for e in range(1, N_TYPES) if u & e == e) for u in range(N_TYPES)]
+
+def roster_slots_for(num_rounds):
+    """
+    Slots for a draft of `num_rounds` picks per team: the SLOT_PRIORITY starters first,
+    padded with BENCH slots.
+    """
+    return SLOT_PRIORITY[:num_rounds] + ("BENCH",) * max(0, num_rounds - len(SLOT_PRIORITY))
+
+def position_label(mask):
+    """
+    'PG/SG'-style label of an eligibility mask.
+    """
+    return "/".join(pos for pos in POSITIONS if mask & POSITION_BITS[pos])
+
+def _zscore(values):
+    std = values.std()
+    return (values - values.mean()) / std if std > 0 else np.zeros_like(values)
+
+def infer_positions(df, margin=DUAL_ELIGIBILITY_MARGIN):
+    """
+    Heuristic position eligibility from per-minute stats, since the player table has no
+    position column.
+
+    A "size" score (rebounds, offensive rebounds and blocks per minute up; assists per minute
+    and the 3PA share of field-goal attempts down; all z-scored) is ranked and cut into five
+    equal bands, PG (smallest) to C.
+    Players within `margin` of a band edge are also eligible at the neighbouring position.
+
+    Returns:
+        np.ndarray of uint8 eligibility masks, in row order of `df`.
+    """
+    minutes = np.maximum(df["min_base"].to_numpy(dtype=np.float64, na_value=0.0), 1.0) if "min_base" in df.columns \
+        else np.ones(len(df))
+
+    def rate(col):
+        if col not in df.columns:
+            return np.zeros(len(df))
+        return df[col].to_numpy(dtype=np.float64, na_value=0.0) / minutes
+
+    three_share = np.divide(rate("fg3a"), rate("fga_base"), out=np.zeros(len(df)), where=rate("fga_base") > 0)
+    size = (_zscore(rate("reb")) + _zscore(rate("oreb")) + 0.5 * _zscore(rate("blk"))
+            - 0.5 * _zscore(rate("ast")) - _zscore(three_share))
+    n_positions = len(POSITIONS)
+    # Position coordinate in [0, 5): rank quantile of the size score
+    coordinate = (np.argsort(np.argsort(size, kind="stable"), kind="stable") + 0.5) / max(len(df), 1) * n_positions
+    primary = np.minimum(coordinate.astype(np.int64), n_positions - 1)
+    masks = (1 << primary).astype(np.uint8)
+    offset = coordinate - primary
+    lower = (offset < margin) & (primary > 0)
+    upper = (offset > 1 - margin) & (primary < n_positions - 1)
+    masks[lower] |= (1 << (primary[lower] - 1)).astype(np.uint8)
+    masks[upper] |= (1 << (primary[upper] + 1)).astype(np.uint8)
+    return masks
+
+def add_position_columns(df, margin=DUAL_ELIGIBILITY_MARGIN):
+    """
+    Adds POSITION_COLUMN (eligibility mask) and a 'Pos' label column to `df` in place.
+    """
+    masks = infer_positions(df, margin)
+    df[POSITION_COLUMN] = masks
+    labels = {mask: position_label(mask) for mask in np.unique(masks).tolist()}
+    df["Pos"] = pd.Series(masks, index=df.index).map(labels)
+    return df
+
+class RosterSlots:
+    """
+    A roster template: slot names plus the Hall capacities used by the feasibility check.
+
+    Attributes:
+        slots (tuple[str]): Slot names (keys of SLOT_POSITIONS).
+        capacity (list[int]): capacity[U] = number of slots whose mask intersects U.
+    """
+
+    def __init__(self, slots=DEFAULT_ROSTER_SLOTS):
+        unknown = [slot for slot in slots if slot not in SLOT_POSITIONS]
+        if unknown:
+            raise ValueError(f"Unknown slot(s): {', '.join(unknown)}. Choose from: {', '.join(SLOT_POSITIONS)}")
+        self.slots = tuple(slots)
+        masks = [SLOT_POSITIONS[slot] for slot in self.slots]
+        self.capacity = [sum(1 for mask in masks if mask & u) for u in range(N_TYPES)]
+
+    def __len__(self):
+        return len(self.slots)
+
+    def state(self, player_masks=()):
+        """
+        RosterState of a roster holding players with the given eligibility masks.
+        """
+        state = RosterState(self)
+        for mask in player_masks:
+            state.add(int(mask))
+        return state
+
+    def is_feasible(self, player_masks):
+        """
+        True if the players can be placed in distinct slots.
+        """
+        return self.state(player_masks).feasible
+
+    def __repr__(self):
+        return f"RosterSlots({', '.join(self.slots)})"
+
+class RosterState:
+    """
+    Incremental Hall's-condition state of one roster.
+
+    Attributes:
+        slack (list[int]): slack[U] = capacity[U] - players with mask ⊆ U.
+        blocked (int): Bit e set when a player of eligibility mask e no longer fits.
+        feasible (bool): False once a player was added that could not fit.
+    """
+
+    __slots__ = ("slack", "blocked", "feasible")
+
+    def __init__(self, roster_slots=None):
+        if roster_slots is None:
+            return
+        self.slack = list(roster_slots.capacity)
+        self.feasible = True
+        self.blocked = 1 # type 0 (no position) never fits
+        for u in range(1, N_TYPES):
+            if self.slack[u] <= 0:
+                self.blocked |= SUBSET_BITS[u]
+
+    def copy(self):
+        state = RosterState()
+        state.slack = list(self.slack)
+        state.blocked = self.blocked
+        state.feasible = self.feasible
+        return state
+
+    def fits(self, mask):
+        """
+        True if a player with eligibility `mask` can be added without stranding the roster.
+        """
+        return not (self.blocked >> mask) & 1
+
+    def add(self, mask):
+        """
+        Adds a player; O(number of supersets of `mask`).
+        """
+        if (self.blocked >> mask) & 1:
+            self.feasible = False
+        slack = self.slack
+        for u in SUPERSETS[mask]:
+            slack[u] -= 1
+            if slack[u] <= 0:
+                self.blocked |= SUBSET_BITS[u]
+        if mask == 0:
+            self.feasible = False
+
+    def allowed_types(self):
+        """
+        Boolean lookup table over eligibility masks 0..31: True where a player still fits.
+        Index it with a mask array to test a whole pool at once.
+        """
+        return ((~self.blocked >> np.arange(N_TYPES)) & 1).astype(bool)
@@ -0,0 +1,182 @@
+"""
+A small expression language for custom league scoring.
+
+Expressions use Python syntax over lowercase stat columns, e.g.
+
+    pts + 1.2*reb + 1.5*ast + 3*stl + 3*blk - tov + 5*dd2/gp_base
+
+Supported:
+- numbers and column names (pts, reb, fg3m, dd2, gp_base, ...)
+- + - * / ** and unary minus; division by zero yields 0 instead of inf/nan
+- comparisons (<, <=, >, >=, ==, !=) which yield 1.0 / 0.0, plus `and`, `or`, `not`
+- `a if cond else b`
+- functions: where(cond, a, b), min(a, b), max(a, b), clip(x, lo, hi), abs(x)
+
+An expression is parsed once and compiled into a tree of NumPy operations, cached by its
+text, so re-scoring is a handful of whole-column array operations with no per-row Python.
+"""
+import ast
+import operator
+from functools import lru_cache
+import numpy as np
+
+# Example presets. dd2/td3 are season totals while the other stats are per-game averages,
+# so the bonuses are divided by games played.
+LEAGUE_PRESETS = {
+    "default": "pts + 1.2*reb + 1.5*ast + 3*stl + 3*blk - tov",
+    "bonus": "pts + 1.2*reb + 1.5*ast + 3*stl + 3*blk - tov + 0.5*fg3m + (5*dd2 + 10*td3) / gp_base",
+    "efficiency": (
+        "pts + 1.2*reb + 1.5*ast + 3*stl + 3*blk - tov"
+        " + 2*(fgm_base - 0.47*fga_base) + 1.5*(ftm - 0.78*fta)"
+    ),
+    "min_games": "where(gp_base >= 20, pts + 1.2*reb + 1.5*ast + 3*stl + 3*blk - tov, 0)",
+}
+
+def _safe_divide(a, b):
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64))
+    return np.divide(a, b, out=np.zeros(a.shape), where=(b != 0))
+
+def _as_float(x):
+    return np.asarray(x, dtype=np.float64)
+
+_BINARY_OPS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: _safe_divide,
+    ast.Pow: np.power,
+}
+
+_COMPARE_OPS = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+
+_FUNCTIONS = {
+    "where": (3, lambda c, a, b: np.where(c != 0, a, b)),
+    "min": (2, np.minimum),
+    "max": (2, np.maximum),
+    "clip": (3, np.clip),
+    "abs": (1, np.abs),
+}
+
+class ScoringExpression:
+    """
+    A compiled scoring expression.
+
+    Attributes:
+        text (str): The source expression.
+        columns (tuple[str]): The stat columns the expression reads.
+    """
+
+    def __init__(self, text, plan, columns):
+        self.text = text
+        self._plan = plan
+        self.columns = tuple(sorted(columns))
+
+    def evaluate(self, df):
+        """
+        Evaluates the expression over every player in `df` and returns a float64 array.
+        Missing values in the referenced columns are treated as 0.
+        """
+        missing = [col for col in self.columns if col not in df.columns]
+        if missing:
+            raise ValueError(f"Scoring expression uses unknown column(s): {', '.join(missing)}")
+
+        env = {col: df[col].to_numpy(dtype=np.float64, na_value=0.0) for col in self.columns}
+        result = _as_float(self._plan(env))
+        return np.broadcast_to(result, (len(df),)).copy()
+
+    def __repr__(self):
+        return f"ScoringExpression({self.text!r})"
+
+def _compile_node(node, columns):
+    """
+    Turns an AST node into a function env -> array. Column names are collected in `columns`.
+    """
+    if isinstance(node, ast.Expression):
+        return _compile_node(node.body, columns)
+
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        value = float(node.value)
+        return lambda env: value
+
+    if isinstance(node, ast.Name):
+        name = node.id.lower()
+        columns.add(name)
+        return lambda env: env[name]
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        op = _BINARY_OPS[type(node.op)]
+        left, right = _compile_node(node.left, columns), _compile_node(node.right, columns)
+        return lambda env: op(left(env), right(env))
+
+    if isinstance(node, ast.UnaryOp):
+        operand = _compile_node(node.operand, columns)
+        if isinstance(node.op, ast.USub):
+            return lambda env: np.negative(operand(env))
+        if isinstance(node.op, ast.UAdd):
+            return operand
+        if isinstance(node.op, ast.Not):
+            return lambda env: _as_float(_as_float(operand(env)) == 0)
+
+    if isinstance(node, ast.Compare) and all(type(op) in _COMPARE_OPS for op in node.ops):
+        operands = [_compile_node(n, columns) for n in [node.left] + node.comparators]
+        ops = [_COMPARE_OPS[type(op)] for op in node.ops]
+
+        def compare(env):
+            values = [f(env) for f in operands]
+            result = True
+            for op, a, b in zip(ops, values, values[1:]):
+                result = np.logical_and(result, op(a, b))
+            return _as_float(result)
+        return compare
+
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile_node(n, columns) for n in node.values]
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+
+        def boolean(env):
+            result = _as_float(parts[0](env)) != 0
+            for part in parts[1:]:
+                result = combine(result, _as_float(part(env)) != 0)
+            return _as_float(result)
+        return boolean
+
+    if isinstance(node, ast.IfExp):
+        cond, body, orelse = (_compile_node(n, columns) for n in (node.test, node.body, node.orelse))
+        return lambda env: np.where(_as_float(cond(env)) != 0, body(env), orelse(env))
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        name = node.func.id.lower()
+        if name in _FUNCTIONS:
+            arity, func = _FUNCTIONS[name]
+            if len(node.args) != arity:
+                raise ValueError(f"{name}() takes {arity} argument(s), got {len(node.args)}")
+            args = [_compile_node(n, columns) for n in node.args]
+            return lambda env: func(*(_as_float(a(env)) for a in args))
+        raise ValueError(f"Unknown function in scoring expression: {name}()")
+
+    raise ValueError(f"Unsupported syntax in scoring expression: {ast.dump(node)[:60]}")
+
+@lru_cache(maxsize=256)
+def compile_scoring_expression(text):
+    """
+    Parses and compiles a scoring expression. Results are cached by the expression text,
+    so repeated re-scoring with the same league rules skips parsing entirely.
+
+    Raises:
+        ValueError: If the text is not a valid scoring expression.
+    """
+    try:
+        tree = ast.parse(text.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid scoring expression {text!r}: {e.msg}") from None
+
+    columns = set()
+    plan = _compile_node(tree, columns)
+    return ScoringExpression(text, plan, columns)
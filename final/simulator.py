@@ -0,0 +1,245 @@
+"""
+Headless Monte Carlo draft simulator for comparing AI strategies.
+
+Runs thousands of complete drafts between AI strategies with no input()/print, scores each
+finished draft with simulate_match and reports win rates with 95% confidence intervals.
+Drafts are spread over a process pool; the player score matrix is placed in shared memory
+once, and every worker maps it instead of receiving a pickled copy of the DataFrame.
+
+Usage:
+    python simulator.py --drafts 2000 --rounds 5
+"""
+import os
+import math
+import random
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+
+from ai_agent import ai_pick_easy, ai_pick_medium, ai_pick_hard
+from draft_pool import DraftPool
+from draft_schedule import DraftSchedule
+from fantasy_engine import simulate_match
+
+SCORE_COLUMNS = ("fantasy_score", "pred_score")
+# Shared with the workers but not ranked: the risk-aware hard AI reads pred_std
+EXTRA_COLUMNS = ("pred_std",)
+# MCTS iterations per 'hard' pick. A fixed iteration budget (not a time budget) keeps every
+# draft reproducible from its seed, whatever the load on the machine.
+TOURNAMENT_ITERATIONS = 200
+
+# Built-in strategies. A custom strategy is any picklable (top-level) function
+# strategy(pool, rng, state) -> player_id, where state holds the draft context
+# (schedule, pick_num, team, rosters, iterations).
+STRATEGIES = {
+    "easy": lambda pool, rng, state: ai_pick_easy(pool),
+    "medium": lambda pool, rng, state: ai_pick_medium(pool, None),
+    "hard": lambda pool, rng, state: ai_pick_hard(pool, None, rng=rng, n_workers=0, **state),
+}
+
+# Worker state, set up once per process by _init_worker
+_worker = {}
+
+def _resolve_strategy(strategy):
+    if callable(strategy):
+        return strategy
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}'. Choose one of: {', '.join(STRATEGIES)} or pass a function.")
+    return STRATEGIES[strategy]
+
+def _strategy_name(strategy):
+    return strategy if isinstance(strategy, str) else getattr(strategy, "__name__", repr(strategy))
+
+def _build_frame(ids, matrix, columns):
+    return pd.DataFrame(matrix, index=pd.Index(ids, name="player_id"), columns=list(columns), copy=False)
+
+def _init_worker(shm_name, n_players, columns):
+    """
+    Attaches to the shared player matrix: row 0 holds the ids, the other rows the score columns.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    data = np.ndarray((len(columns) + 1, n_players), dtype=np.float64, buffer=shm.buf)
+    frame = _build_frame(data[0].astype(np.int64), data[1:].T, columns)
+    _worker["shm"] = shm # keep the mapping alive for the life of the process
+    _worker["frame"] = frame
+    _worker["pool"] = DraftPool(frame, score_columns=SCORE_COLUMNS)
+
+def _init_local(matrix, columns):
+    frame = _build_frame(matrix[0].astype(np.int64), matrix[1:].T, columns)
+    _worker["frame"] = frame
+    _worker["pool"] = DraftPool(frame, score_columns=SCORE_COLUMNS)
+
+def run_draft(pool, schedule, strategies, rng, iterations=TOURNAMENT_ITERATIONS):
+    """
+    Runs one complete draft on an empty pool. Returns one roster (list of ids) per team.
+    `iterations` is the per-pick search budget given to search-based strategies.
+    """
+    rosters = [[] for _ in range(schedule.num_teams)]
+    for pick_num in range(schedule.total_picks):
+        team = schedule.team_for_pick(pick_num)
+        state = {"schedule": schedule, "pick_num": pick_num, "team": team, "rosters": rosters, "iterations": iterations}
+        player_id = strategies[team](pool, rng, state)
+        if player_id is None or not pool.is_available(player_id):
+            # A strategy that fails falls back to the easy pick, like draft_phase does
+            player_id = ai_pick_easy(pool)
+        if player_id is None:
+            break
+        pool.draft(player_id)
+        rosters[team].append(player_id)
+    return rosters
+
+def _run_batch(strategy_a, strategy_b, first_draft, n_drafts, num_rounds, draft_format, score_difficulty, seed, iterations):
+    """
+    Runs drafts [first_draft, first_draft + n_drafts) of one matchup in a worker.
+    Strategy A picks first in even drafts and second in odd ones.
+    Returns an array of (a_score, b_score) rows.
+    """
+    frame, base_pool = _worker["frame"], _worker["pool"]
+    schedule = DraftSchedule(2, num_rounds, draft_format)
+    pick_a, pick_b = _resolve_strategy(strategy_a), _resolve_strategy(strategy_b)
+
+    scores = np.empty((n_drafts, 2), dtype=np.float64)
+    for i in range(n_drafts):
+        draft_index = first_draft + i
+        rng = random.Random(seed * 1_000_003 + draft_index)
+        a_first = draft_index % 2 == 0
+        order = [pick_a, pick_b] if a_first else [pick_b, pick_a]
+        rosters = run_draft(base_pool.new_draft(), schedule, order, rng, iterations)
+        team_a, team_b = (rosters[0], rosters[1]) if a_first else (rosters[1], rosters[0])
+        result = simulate_match(team_a, team_b, frame, score_difficulty)
+        scores[i] = result["player_score"], result["ai_score"]
+    return scores
+
+def wilson_interval(successes, n, z=1.96):
+    """
+    Wilson score interval for a binomial proportion (95% by default).
+    """
+    if n == 0:
+        return 0.0, 1.0
+    p = successes / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+def _summarize(name_a, name_b, scores):
+    a, b = scores[:, 0], scores[:, 1]
+    wins, losses = int((a > b).sum()), int((a < b).sum())
+    draws = len(scores) - wins - losses
+    # Draws count as half a win, the usual convention for head-to-head win rates
+    win_rate = (wins + 0.5 * draws) / len(scores) if len(scores) else 0.0
+    low, high = wilson_interval(wins + 0.5 * draws, len(scores))
+    return {
+        "strategy_a": name_a,
+        "strategy_b": name_b,
+        "drafts": len(scores),
+        "wins": wins,
+        "losses": losses,
+        "draws": draws,
+        "win_rate": win_rate,
+        "ci_low": low,
+        "ci_high": high,
+        "mean_margin": float((a - b).mean()) if len(scores) else 0.0,
+    }
+
+def run_tournament(df, strategies=("easy", "medium", "hard"), n_drafts=1000, num_rounds=5,
+                   draft_format="snake", score_difficulty="medium", seed=0, n_workers=None, batch_size=250,
+                   iterations=TOURNAMENT_ITERATIONS):
+    """
+    Plays every pair of `strategies` against each other for `n_drafts` drafts and reports
+    the win rate of the first strategy of each pair.
+
+    Args:
+        df (pd.DataFrame): Player table indexed by player_id with 'fantasy_score' (and 'pred_score',
+            'pred_std').
+        strategies: Strategy names from STRATEGIES or picklable functions strategy(pool, rng, state).
+        score_difficulty: Passed to simulate_match to choose the score column ('easy' = fantasy_score).
+        seed: Base seed; each draft gets its own random.Random derived from it, so results do not
+            depend on how drafts are split across workers (search-based strategies run a fixed
+            number of iterations, not a time budget).
+        n_workers: Process count (default: CPU count). 0 runs everything in this process.
+        iterations: Per-pick MCTS iterations for search-based strategies such as 'hard';
+            kept small by default so thousands of drafts stay fast.
+
+    Returns:
+        list[dict]: One summary per pair with wins/losses/draws, win_rate and a 95% CI.
+    """
+    columns = [col for col in SCORE_COLUMNS + EXTRA_COLUMNS if col in df.columns]
+    ids = df.index.to_numpy(dtype=np.int64)
+    matrix = np.vstack([ids.astype(np.float64)] + [df[col].to_numpy(dtype=np.float64, na_value=0.0) for col in columns])
+    for strategy in strategies:
+        _resolve_strategy(strategy)
+
+    matchups = list(itertools.combinations(strategies, 2))
+    batch_matchup = []
+    batches = []
+    for m, (a, b) in enumerate(matchups):
+        for start in range(0, n_drafts, batch_size):
+            batch_matchup.append(m)
+            batches.append((a, b, start, min(batch_size, n_drafts - start), num_rounds, draft_format,
+                            score_difficulty, seed, iterations))
+
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+
+    if n_workers == 0:
+        _init_local(matrix, columns)
+        results = [_run_batch(*batch) for batch in batches]
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=matrix.nbytes)
+        try:
+            np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=shm.buf)[:] = matrix
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                     initargs=(shm.name, len(ids), tuple(columns))) as executor:
+                futures = [executor.submit(_run_batch, *batch) for batch in batches]
+                results = [future.result() for future in futures]
+        finally:
+            shm.close()
+            shm.unlink()
+
+    report = []
+    for m, (a, b) in enumerate(matchups):
+        per_matchup = [r for batch_m, r in zip(batch_matchup, results) if batch_m == m]
+        scores = np.vstack(per_matchup) if per_matchup else np.empty((0, 2))
+        report.append(_summarize(_strategy_name(a), _strategy_name(b), scores))
+    return report
+
+def format_report(report):
+    lines = [f"{'matchup':<20}{'drafts':>8}{'W-L-D':>16}{'win rate':>10}{'95% CI':>18}{'margin':>9}"]
+    for row in report:
+        matchup = f"{row['strategy_a']} vs {row['strategy_b']}"
+        record = f"{row['wins']}-{row['losses']}-{row['draws']}"
+        ci = f"[{row['ci_low']:.3f}, {row['ci_high']:.3f}]"
+        lines.append(f"{matchup:<20}{row['drafts']:>8}{record:>16}{row['win_rate']:>10.3f}{ci:>18}{row['mean_margin']:>9.2f}")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    import argparse
+    from data_loader import load_player_data, filter_nba_players
+    from feature_engineering import compute_fantasy_score, create_ml_features
+    from ml_models import train_draft_model, train_bootstrap_ensemble
+
+    parser = argparse.ArgumentParser(description="Run AI-vs-AI draft tournaments.")
+    parser.add_argument("--data", default="NBA_PlayerStats_202425.csv")
+    parser.add_argument("--drafts", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--format", default="snake")
+    parser.add_argument("--score", default="medium", help="difficulty passed to simulate_match")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--iterations", type=int, default=TOURNAMENT_ITERATIONS, help="MCTS iterations per pick for 'hard'")
+    args = parser.parse_args()
+
+    df = filter_nba_players(load_player_data(args.data))
+    df = compute_fantasy_score(df)
+    X, y, _ = create_ml_features(df)
+    draft_model = train_draft_model(X, y)
+    df['pred_score'] = np.maximum(0, draft_model.predict(X))
+    df['pred_std'] = train_bootstrap_ensemble(X, y, draft_model.alpha).prediction_frame(X)['pred_std']
+
+    report = run_tournament(df, n_drafts=args.drafts, num_rounds=args.rounds, draft_format=args.format,
+                            score_difficulty=args.score, seed=args.seed, n_workers=args.workers,
+                            iterations=args.iterations)
+    print(format_report(report))
@@ -0,0 +1,108 @@
+"""
+Speculative background computation of AI replies.
+
+While the human is choosing, the server would otherwise sit idle. A Speculator runs the
+AI's reply to each likely human pick in a small thread pool and caches the pending result
+under a key describing the resulting draft state, so when the human commits, the reply is
+usually already computed (or at least well under way).
+
+Tasks must be pure: they get everything they need as arguments, never touch Streamlit and
+never mutate shared objects. Given the same key they should return the same answer, which
+callers ensure by seeding the AI from the key (see stream.py); a wall-clock-budgeted search
+can still differ between runs, which only means the speculated reply is used instead of an
+equally valid one.
+
+Each session owns its Speculator (its cache and what it may cancel), while the worker
+threads come from one shared executor, so one session's speculations never cancel or
+replace another's. Because the shared threads may be busy with other sessions, get()
+waits for a speculated result only for a bounded time and otherwise computes the reply
+itself.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+SPECULATION_WORKERS = 2 # background threads
+SPECULATION_MAX_ENTRIES = 256 # cached replies kept (oldest evicted first)
+SPECULATION_WAIT = 0.5 # seconds get() waits for a running speculation before computing itself
+
+_shared_executor = None
+_shared_executor_lock = threading.Lock()
+
+def shared_executor(max_workers=SPECULATION_WORKERS):
+    """
+    The process-wide thread pool that session Speculators submit to.
+    """
+    global _shared_executor
+    with _shared_executor_lock:
+        if _shared_executor is None:
+            _shared_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="speculation")
+        return _shared_executor
+
+class Speculator:
+    """
+    Keyed cache of background futures, one per session.
+
+    Attributes:
+        hits (int): get() calls that found a speculated result.
+        misses (int): get() calls that did not.
+    """
+
+    def __init__(self, executor=None, max_entries=SPECULATION_MAX_ENTRIES, wait=SPECULATION_WAIT):
+        """
+        Args:
+            executor: Executor to run tasks on; defaults to shared_executor().
+            wait: Seconds get() waits for a speculation that is already running.
+        """
+        self._executor = executor if executor is not None else shared_executor()
+        self._futures = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_entries = max_entries
+        self.wait = wait
+        self.hits = 0
+        self.misses = 0
+
+    def speculate(self, key, fn, *args, **kwargs):
+        """
+        Starts fn(*args, **kwargs) in the background unless `key` is already cached.
+        """
+        with self._lock:
+            if key in self._futures:
+                self._futures.move_to_end(key)
+                return self._futures[key]
+            future = self._executor.submit(fn, *args, **kwargs)
+            self._futures[key] = future
+            while len(self._futures) > self.max_entries:
+                _, old = self._futures.popitem(last=False)
+                old.cancel() # no-op if it is already running
+            return future
+
+    def get(self, key, fn, *args, **kwargs):
+        """
+        Result for `key`: the speculated one if there is one, otherwise fn(*args, **kwargs)
+        computed right here in the caller's thread. A speculation still queued behind other
+        tasks is cancelled, and a running one is waited for at most `wait` seconds; a task
+        that failed or ran late is recomputed in the caller's thread.
+        """
+        with self._lock:
+            future = self._futures.pop(key, None)
+        if future is not None and not future.cancel():
+            try:
+                result = future.result(timeout=self.wait)
+                self.hits += 1
+                return result
+            except Exception:
+                pass
+        self.misses += 1
+        return fn(*args, **kwargs)
+
+    def discard_pending(self, keep=()):
+        """
+        Cancels this Speculator's queued tasks that have not started (e.g. after the human
+        committed a pick, the other candidates are no longer needed), except those under the
+        keys in `keep`. Finished results stay cached.
+        """
+        keep = set(keep)
+        with self._lock:
+            for key in [key for key, future in self._futures.items() if key not in keep and future.cancel()]:
+                del self._futures[key]
@@ -1,16 +1,26 @@
 import streamlit as st
-import pandas as pd
 import random
-import io
 import os # 引入 os 模組用於路徑檢查 (可選，但有助於除錯)
+import re
+import uuid
+import threading
+from collections import OrderedDict
 import numpy as np
 
 # 導入所有本地模組
-from data_loader import load_player_data, filter_nba_players, standardize_column_names
-from feature_engineering import compute_fantasy_score, create_ml_features
-from ml_models import train_draft_model
+from data_loader import load_player_data, filter_nba_players
+from feature_engineering import (compute_fantasy_score, create_ml_features, stat_matrix, SCORING_STATS,
+                                 ScoreBreakdown, CategoryValuation, CATEGORY_FORMATS)
+from ml_models import train_draft_model, train_bootstrap_ensemble, scoring_prediction_basis
 from fantasy_engine import simulate_match # draft_phase 保持在 engine.py 中
+from match_engine import MatchEngine
 from ai_agent import ai_pick_easy, ai_pick_medium, ai_pick_hard
+from draft_pool import DraftPool
+from draft_schedule import DraftSchedule, DRAFT_FORMATS
+from speculation import Speculator
+from draft_log import DraftLog
+from roster_slots import RosterSlots, roster_slots_for, add_position_columns, POSITION_COLUMN
+from vorp import VorpEngine, VORP_COLUMN
 
 # ----------------------------------------------------
 # 0. 固定配置與常數
@@ -19,87 +29,432 @@ from ai_agent import ai_pick_easy, ai_pick_medium, ai_pick_hard
 # 假設 NBA_PlayerStats_202425.csv 檔案與 stream.py 位於相同目錄
 DATA_FILEPATH = "NBA_PlayerStats_202425.csv"
 
-TOTAL_PICKS = 10 
+NUM_TEAMS = 2 # 玩家 vs. AI
+DEFAULT_ROUNDS = 5 # 每隊 5 名球員 = 10 順位
 SCORING_RULES = {"pts": 1, "reb": 1.2, "ast": 1.5, "stl": 3, "blk": 3, "tov": -1}
+PAGE_SIZE = 10 # 可選球員表每頁顯示的人數
+SCORE_BREAKDOWNS_KEPT = 16 # 保留最近幾組權重的 ScoreBreakdown，作為新權重差量更新的起點
+SPECULATE_TOP = 3 # 玩家回合時，預先計算 AI 對前 N 名 (加上目前選中的球員) 的回應
+DRAFT_LOG_DIR = ".draft_logs" # 每場選秀的事件紀錄 (<draft_id>.ndl)，用於中斷後續玩
+LEAGUE_TYPES = {"points": "積分制 (Points)", "9cat": "九類別 (9-Cat)", "8cat": "八類別 (8-Cat)"}
+# 數據沒有真實位置，Pos 欄是 infer_positions 依每分鐘數據推測的結果，表格中一律標示出來
+POSITION_DISPLAY = {'Pos': st.column_config.TextColumn(
+    "Pos (推測)", help="位置由每分鐘數據 (籃板、阻攻、助攻、三分出手比例) 推測，並非官方登錄的位置。")}
 
 # ----------------------------------------------------
-# 1. 初始化 Session State (保持不變)
+# 1. 初始化 Session State
 # ----------------------------------------------------
+# 球員表與模型由所有 session 共用 (見 load_shared_data)；
+# 每個 session 只保存選秀狀態：選秀事件紀錄 (DraftLog，選秀池由它重播還原)、難度與隨機種子
+def draft_log_path(draft_id):
+    return os.path.join(DRAFT_LOG_DIR, f"{draft_id}.ndl")
+
+def resume_draft(draft_id):
+    """
+    從磁碟上的選秀紀錄還原 session (例如重新整理頁面或伺服器重啟後)。成功時回傳 True。
+    """
+    if not re.fullmatch(r"[0-9a-f]{16}", draft_id):
+        return False
+    try:
+        log = DraftLog.load(draft_log_path(draft_id))
+    except (OSError, ValueError):
+        return False
+    meta = log.meta
+    st.session_state.difficulty = meta['difficulty']
+    st.session_state.player_gets_first_pick = meta['player_gets_first_pick']
+    st.session_state.seed = meta['seed']
+    st.session_state.num_rounds = meta['num_rounds']
+    st.session_state.draft_format = meta['draft_format']
+    st.session_state.league_type = meta.get('league_type', 'points')
+    st.session_state.punt = meta.get('punt')
+    st.session_state.use_positions = meta.get('use_positions', False)
+    st.session_state.use_vorp = meta.get('use_vorp', False)
+    # 計分權重影響球員表與 AI，一併還原 (在側邊欄的 slider 建立之前設定)
+    for stat, weight in zip(SCORING_STATS, meta['weights']):
+        st.session_state[f"weight_{stat}"] = weight
+    st.session_state.draft_log = log
+    st.session_state.draft_id = draft_id
+    st.session_state.app_state = 'FINISHED' if len(log) == meta['num_rounds'] * NUM_TEAMS else 'DRAFTING'
+    return True
+
 if 'app_state' not in st.session_state:
-    st.session_state.app_state = 'UPLOAD' # 狀態名稱不變，但代表自動載入
-if 'df' not in st.session_state:
-    st.session_state.df = pd.DataFrame()
-if 'draftable_players' not in st.session_state:
-    st.session_state.draftable_players = pd.DataFrame()
+    resumed = 'draft' in st.query_params and resume_draft(st.query_params['draft'])
+    if not resumed:
+        st.session_state.app_state = 'UPLOAD' # 狀態名稱不變，但代表自動載入
 if 'difficulty' not in st.session_state:
     st.session_state.difficulty = 'easy'
-if 'draft_model' not in st.session_state:
-    st.session_state.draft_model = None
-if 'player_team' not in st.session_state:
-    st.session_state.player_team = []
-if 'ai_team' not in st.session_state:
-    st.session_state.ai_team = []
 if 'player_gets_first_pick' not in st.session_state:
     st.session_state.player_gets_first_pick = None
-if 'current_pick' not in st.session_state:
-    st.session_state.current_pick = 0
+if 'draft_log' not in st.session_state:
+    st.session_state.draft_log = None # 選秀開始時建立
+if 'draft_id' not in st.session_state:
+    st.session_state.draft_id = None
+if 'seed' not in st.session_state:
+    st.session_state.seed = random.getrandbits(32)
+if 'num_rounds' not in st.session_state:
+    st.session_state.num_rounds = DEFAULT_ROUNDS
+if 'draft_format' not in st.session_state:
+    st.session_state.draft_format = 'snake'
+if 'use_vorp' not in st.session_state:
+    st.session_state.use_vorp = False # VORP 依推測的位置計算，預設不啟用
 
 # ----------------------------------------------------
 # 2. 數據處理函數
 # ----------------------------------------------------
 
-@st.cache_data(show_spinner="正在自動載入與處理數據...")
+@st.cache_resource(show_spinner="正在自動載入與處理數據...")
 # *** 修正點 2: 函數簽名變更，接受 filepath 而非 uploaded_file ***
-def process_data(filepath, selected_difficulty):
-    """執行數據載入、特徵工程和模型訓練/預測的步驟。"""
+def load_shared_data(filepath):
+    """
+    執行數據載入、特徵工程和模型訓練的步驟。每個程序只執行一次，結果由所有 session 共用，
+    因此回傳的內容一律視為唯讀。找不到或無法讀取數據時回傳 None。
+    """
     
-    # 讀取數據 (直接從路徑讀取)
+    # 讀取數據 (load_player_data 會使用二進位快取，並將 player_id 設為索引)
     try:
-        df = pd.read_csv(filepath)
-    except FileNotFoundError:
-        st.error(f"錯誤：找不到數據檔案於路徑: {filepath}。請確認檔案已存在於部署目錄中。")
-        return pd.DataFrame(), None # 回傳空 DataFrame 和 None model
+        df = load_player_data(filepath)
     except Exception as e:
-        st.error(f"讀取數據時發生錯誤: {e}")
-        return pd.DataFrame(), None
+        print(f"Error reading {filepath}: {e}")
+        return None
+
+    if df.empty:
+        return None
 
     # ---- 1. Data Loading and Filtering ----
-    df.columns = [c.lower() for c in df.columns] 
     df = filter_nba_players(df)
-    
-    # 確保 player_id 設置為索引
-    if 'player_id' not in df.columns:
-        df.insert(0, 'player_id', range(1, len(df) + 1))
-    df.set_index('player_id', inplace=True)
-    df.index.name = 'player_id'
 
     # ---- 2. Feature Engineering ----
     df = compute_fantasy_score(df, SCORING_RULES)
-    # 檢查數據是否足夠訓練模型
-    if df.shape[0] < 5: 
-        st.warning("數據不足，無法訓練模型。模型將被禁用。")
-
     X, y, _ = create_ml_features(df)
     
     # 修正：將 player_name 欄位重新命名為 Player (供顯示用)
     if 'player_name' in df.columns:
         df.rename(columns={'player_name': 'Player'}, inplace=True)
+    # 數據沒有位置欄位，依每分鐘數據推測位置資格 (位置限制用)
+    add_position_columns(df)
     
-    # ---- 3. Model Training and Prediction ----
+    # ---- 3. Model Training ----
+    # 模型只訓練一次並供所有難度使用 (EASY 不會用到 pred_score 以外的東西)
     draft_model = None
-    if selected_difficulty == "medium" or selected_difficulty == "hard":
+    projection = None
+    stats = stat_matrix(df)
+    if df.shape[0] >= 5:
         try:
             draft_model = train_draft_model(X, y)
-            pred_scores = draft_model.predict(X) 
-            df['pred_score'] = np.maximum(0, pred_scores)
+            # 每個計分數據欄的預測基底 (n_players x n_stats) 與 bootstrap 集成；
+            # 預設權重下 basis @ weights 與 draft_model.predict(X) 相同
+            # 各球員在 bootstrap 模型間的預測動差也只算一次，換權重時不必重新產生 B 個預測
+            ensemble = train_bootstrap_ensemble(X, stats, draft_model.alpha)
+            projection = {
+                'basis': scoring_prediction_basis(X, stats, draft_model.alpha),
+                'ensemble': ensemble,
+                'features': X,
+                'moments': ensemble.prediction_moments(X),
+            }
         except Exception as e:
-            st.warning(f"模型訓練或預測錯誤: {e}。 'pred_score' 將使用 'fantasy_score' 作為後備。")
-    
-    # 保護措施
-    if 'pred_score' not in df.columns:
-         df['pred_score'] = df['fantasy_score']
-
-    return df, draft_model
+            print(f"Model training failed ({e}); 'pred_score' falls back to 'fantasy_score'.")
+
+    # 比賽模擬用的每名球員抽樣參數 (出賽率與場均數據)
+    match_engine = MatchEngine(df)
+
+    return {'df': df, 'stats': stats, 'draft_model': draft_model, 'projection': projection,
+            'match_engine': match_engine}
+
+@st.cache_resource
+def score_base(filepath):
+    """
+    換計分權重時不會變的部分 (共用、唯讀)：顯示欄位、選單標籤的前半段，
+    以及最近用過的幾組權重的 ScoreBreakdown (見 score_breakdowns)。
+    """
+    df = load_shared_data(filepath)['df']
+    base = df[[col for col in ('Player', 'team_abbreviation', 'Pos', POSITION_COLUMN) if col in df.columns]].copy()
+    label_prefixes = (base['Player'].astype(str) + " (" + base['team_abbreviation'].astype(str) + ") - ID: "
+                      + base.index.astype(str) + " (FScore: ").tolist()
+    return {'table': base, 'label_prefixes': label_prefixes, 'breakdowns': OrderedDict(), 'lock': threading.Lock()}
+
+def score_breakdowns(filepath, weights):
+    """
+    某組權重下 fantasy_score 與 pred_score (未取下限) 的 ScoreBreakdown。
+    新的權重由最近用過、不同權重最少的一組複製後以差量更新 (只加上 Δw x 該數據欄，
+    排名由前一組的順序調整)，而不是重新計算；拉動一個 slider 只改變一個權重。
+    """
+    base = score_base(filepath)
+    rules = dict(zip(SCORING_STATS, weights))
+    with base['lock']:
+        recent = base['breakdowns']
+        if weights not in recent:
+            if recent:
+                nearest = min(recent, key=lambda key: sum(a != b for a, b in zip(key, weights)))
+                breakdowns = tuple(b.copy() if b is not None else None for b in recent[nearest])
+                for breakdown in breakdowns:
+                    if breakdown is not None:
+                        breakdown.update(rules)
+            else:
+                shared = load_shared_data(filepath)
+                projection = shared['projection']
+                breakdowns = (ScoreBreakdown(shared['df'], rules, stats=shared['stats']),
+                              ScoreBreakdown(shared['df'], rules, stats=projection['basis'])
+                              if projection is not None else None)
+            recent[weights] = breakdowns
+            while len(recent) > SCORE_BREAKDOWNS_KEPT:
+                recent.popitem(last=False)
+        recent.move_to_end(weights)
+        return recent[weights]
+
+@st.cache_resource(max_entries=64)
+def scored_table(filepath, weights):
+    """
+    某組計分權重下的顯示 / 計分用球員表、其 DraftPool 範本 (共用的排名索引)，
+    以及選秀選單用的球員標籤 (依 slot 順序，只產生一次)。
+    相同權重的 session 共用同一份；每個 session 以 pool.new_draft() 取得自己的選秀狀態。
+    分數與排名來自 score_breakdowns (差量更新)；預測的不確定性欄位由預先算好的動差計算。
+    """
+    shared = load_shared_data(filepath)
+    base = score_base(filepath)
+    fantasy, pred = score_breakdowns(filepath, weights)
+
+    table = base['table'].copy()
+    table['fantasy_score'] = fantasy.scores
+    pool = DraftPool(table, score_columns=())
+    pool.set_scores('fantasy_score', fantasy.scores, order=fantasy.order)
+    if pred is not None:
+        # 預測對目標是線性的：pred_score = max(0, basis @ w)，不確定性欄位 (pred_std、pred_q10、pred_q90) 同理
+        projection = shared['projection']
+        table['pred_score'] = np.maximum(0, pred.scores)
+        uncertainty = projection['ensemble'].prediction_frame(projection['features'], np.asarray(weights, dtype=np.float64),
+                                                              moments=projection['moments'])
+        for col in uncertainty.columns.drop('pred_mean'):
+            table[col] = uncertainty[col].to_numpy()
+        pool.set_scores('pred_score', table['pred_score'].to_numpy(), order=pred.clipped_order(0.0))
+    else:
+        table['pred_score'] = table['fantasy_score']
+        pool.set_scores('pred_score', fantasy.scores, order=fantasy.order)
+
+    labels = [f"{prefix}{score:.2f})" for prefix, score in zip(base['label_prefixes'], fantasy.scores.tolist())]
+    return table, pool, labels
+
+@st.cache_resource
+def category_valuation(filepath, league_type):
+    """
+    類別聯盟的 z-score 估值 (所有球員為參考池，共用、唯讀)；各 session 以 .at(剩餘球員) 取得目前的估值。
+    """
+    return CategoryValuation(load_shared_data(filepath)['df'], league_type)
+
+@st.cache_resource(max_entries=64)
+def vorp_template(filepath, weights, league_type, punt, num_rounds):
+    """
+    未選秀狀態的 VORP 引擎 (共用、唯讀)：替補水準由聯盟隊數與陣容位置決定。
+    積分制以 pred_score 為價值；類別聯盟以各類別 z-score (扣除 punt 的類別) 為價值，並分別追蹤各類別的替補水準。
+    各 session 以 session_vorp_engine 保存自己的引擎 (由範本 .new_draft() 建立，之後只 sync 改變的順位)。
+    """
+    table = scored_table(filepath, weights)[0]
+    components = None
+    if league_type != 'points':
+        valuation = category_valuation(filepath, league_type)
+        components = valuation.frame()[[f"z_{cat}" for cat in valuation.categories if cat != punt]]
+    return VorpEngine(table, NUM_TEAMS, roster_template(num_rounds), components=components)
+
+def valuation_column(punt):
+    return "cat_value" if punt is None else f"cat_value_punt_{punt}"
+
+@st.cache_resource
+def draft_schedule(num_teams, num_rounds, draft_format):
+    return DraftSchedule(num_teams, num_rounds, draft_format)
+
+@st.cache_resource
+def roster_template(num_rounds):
+    """
+    每隊的陣容位置 (依輪數取 PG/SG/SF/PF/C、G/F、UTIL 與板凳)。
+    """
+    return RosterSlots(roster_slots_for(num_rounds))
+
+def get_speculator():
+    """
+    這個 session 的 AI 回應快取 (執行緒池由所有 session 共用，但每個 session 只取消自己的預先計算)。
+    """
+    if 'speculator' not in st.session_state:
+        st.session_state.speculator = Speculator()
+    return st.session_state.speculator
+
+def pick_seed(seed, pick_num):
+    """
+    AI 在某個順位使用的隨機種子 (32 位元，與選秀紀錄中的 AI seed 相同)。
+    """
+    return (seed * 1_000_003 + pick_num) & 0xFFFFFFFF
+
+def compute_ai_pick(base_pool, picks, schedule, ai_team_index, difficulty, seed, draft_model,
+                    valuation=None, value_column="cat_value", roster_slots=None, vorp=None):
+    """
+    AI 在 `picks` 之後那一個順位的選擇。只依賴參數 (不讀寫 session state、不修改共用物件)，
+    所以也能在背景執行緒中預先計算。隨機性由 seed 與順位決定：easy / medium 預先計算與當下計算的結果相同；
+    hard 是有時間預算的搜尋，結果會隨機器負載而不同 (預先計算的回應同樣是合理的選擇，只是不保證一致)。
+    類別聯盟傳入 valuation (共用的 CategoryValuation)：medium / hard 改依剩餘球員池的 value_column 排名。
+    有位置限制時傳入 roster_slots：AI 只選自己陣容還放得下的球員。
+    傳入 vorp (某個選秀狀態的 VorpEngine 快照，不會被修改) 時，medium 依 VORP 排名，hard 依 VORP 決定要考慮的候選；
+    快照的副本只 sync 與 picks 不同的順位 (通常是最後一兩個)，不重播整場選秀。
+    """
+    pool = base_pool.new_draft()
+    rosters = [[] for _ in range(schedule.num_teams)]
+    for pick_num, player_id in enumerate(picks):
+        pool.draft(player_id)
+        rosters[schedule.team_for_pick(pick_num)].append(player_id)
+    current_pick = len(picks)
+    # 每個順位的隨機性由 session 的種子決定 (easy / medium 重新執行時結果相同)
+    rng = random.Random(pick_seed(seed, current_pick))
+    scoring = {'roster_slots': roster_slots}
+    slots = {'roster_slots': roster_slots, 'roster': rosters[ai_team_index]}
+    if valuation is not None:
+        # pool 與 valuation 的列順序相同 (都來自 shared['df'])；pred_std 不適用於 z-score，不使用
+        # 參考池的動差只扣掉已選球員 (O(已選人數))，不重新掃描整個球員池
+        remaining = valuation.copy()
+        remaining.exclude(picks)
+        remaining.register(pool, (value_column,))
+        scoring['score_column'] = value_column
+    if vorp is not None:
+        vorp.copy().sync(picks).register(pool, VORP_COLUMN)
+
+    # 呼叫 AI 邏輯
+    try:
+        if difficulty == "easy":
+            return ai_pick_easy(pool, **slots)
+        elif difficulty == "medium":
+            if vorp is not None:
+                scoring['score_column'] = VORP_COLUMN
+            return ai_pick_medium(pool, draft_model, roster=rosters[ai_team_index], **scoring)
+        elif difficulty == "hard":
+            # Hard 使用 MCTS，需要知道選秀順序與雙方目前的陣容
+            if valuation is not None:
+                scoring['std_column'] = None
+            return ai_pick_hard(pool, draft_model, rng=rng, schedule=schedule, pick_num=current_pick,
+                                team=ai_team_index, rosters=rosters,
+                                order_column=VORP_COLUMN if vorp is not None else None, **scoring)
+    except Exception:
+        pass
+    return ai_pick_easy(pool, **slots)
+
+def ai_pick_key(picks, context, pool, schedule, ai_team_index):
+    """
+    預先計算結果的 key：選秀後的狀態 (已選球員 bitmask 與 AI 陣容 bitmask)，
+    加上會影響 AI 的設定 (context = (計分權重, 難度, 種子, 聯盟類型, punt, 位置限制, VORP)、選秀順序)。
+    """
+    drafted, ai_roster = 0, 0
+    for pick_num, player_id in enumerate(picks):
+        bit = 1 << pool.slot(player_id)
+        drafted |= bit
+        if schedule.team_for_pick(pick_num) == ai_team_index:
+            ai_roster |= bit
+    return (context, schedule.num_rounds, schedule.draft_format, ai_team_index, len(picks), drafted, ai_roster)
+
+def speculate_ai_turn(speculator, picks, context, pool, schedule, ai_team_index, draft_model, valuation=None,
+                      roster_slots=None, vorp=None):
+    """
+    在背景計算 AI 在 picks 之後的回應 (若下一個順位屬於 AI)。
+    AI 連續選秀時 (蛇形轉折)，算完一個順位後接著預先計算下一個。
+    可以從背景執行緒呼叫 (不使用 session state)。
+    """
+    if len(picks) >= schedule.total_picks or schedule.team_for_pick(len(picks)) != ai_team_index:
+        return
+    _, difficulty, seed, _, punt, _, _ = context
+    future = speculator.speculate(ai_pick_key(picks, context, pool, schedule, ai_team_index), compute_ai_pick,
+                                  pool, picks, schedule, ai_team_index, difficulty, seed, draft_model,
+                                  valuation, valuation_column(punt), roster_slots, vorp)
+
+    def chain(done):
+        if not done.cancelled() and done.exception() is None and done.result() is not None:
+            speculate_ai_turn(speculator, picks + [done.result()], context, pool, schedule, ai_team_index,
+                              draft_model, valuation, roster_slots, vorp)
+    future.add_done_callback(chain)
+
+def start_draft_log(weights, league_type, punt, use_positions, use_vorp):
+    """
+    開始新的選秀紀錄，並把 draft_id 放進網址 (?draft=...) 以便之後續玩。
+    """
+    st.session_state.draft_log = DraftLog({
+        'difficulty': st.session_state.difficulty,
+        'player_gets_first_pick': st.session_state.player_gets_first_pick,
+        'seed': st.session_state.seed,
+        'num_rounds': st.session_state.num_rounds,
+        'draft_format': st.session_state.draft_format,
+        'league_type': league_type,
+        'punt': punt,
+        'use_positions': use_positions,
+        'use_vorp': use_vorp,
+        'weights': list(weights),
+    })
+    st.session_state.draft_id = uuid.uuid4().hex[:16]
+    st.query_params['draft'] = st.session_state.draft_id
+    save_draft_log()
+
+def save_draft_log():
+    try:
+        st.session_state.draft_log.save(draft_log_path(st.session_state.draft_id))
+    except OSError as e:
+        print(f"Could not save draft log: {e}")
+
+def session_vorp_engine(template):
+    """
+    這個 session 的 VORP 引擎，保存在 session state 中：每次重新執行只 sync 到目前的選秀紀錄
+    (新的順位各更新一次，悔棋只還原被撤銷的順位)，不重播整場選秀。範本改變 (權重、聯盟設定) 時才重新建立。
+    """
+    engine = st.session_state.get('vorp_engine')
+    if engine is None or st.session_state.get('vorp_engine_template') is not template:
+        engine = template.new_draft()
+        st.session_state.vorp_engine = engine
+        st.session_state.vorp_engine_template = template
+    return engine.sync(current_picks())
+
+def current_picks():
+    log = st.session_state.draft_log
+    return log.picks() if log is not None else []
+
+def session_pool(base_pool):
+    """
+    重播 session 的選秀紀錄到共用 DraftPool 範本的新副本上，還原這個 session 的選秀池。
+    """
+    pool = base_pool.new_draft()
+    if st.session_state.draft_log is not None:
+        st.session_state.draft_log.replay(pool)
+    return pool
+
+def team_rosters():
+    """
+    由選秀紀錄推出 (玩家陣容, AI 陣容)。
+    """
+    if st.session_state.draft_log is None:
+        return [], []
+    player_team_index = 0 if st.session_state.player_gets_first_pick else 1
+    rosters = st.session_state.draft_log.rosters(NUM_TEAMS)
+    return rosters[player_team_index], rosters[1 - player_team_index]
+
+def record_pick(pool, player_id, schedule, ai_seed=None):
+    """
+    記錄一次選秀 (AI 的選擇附上它使用的種子)，並在最後一個順位後結束選秀。
+    """
+    pool.draft(player_id)
+    log = st.session_state.draft_log
+    log.append(player_id, schedule.team_for_pick(len(log)), ai_seed)
+    save_draft_log()
+    if len(log) == schedule.total_picks:
+        st.session_state.app_state = 'FINISHED'
+
+def undo_turn():
+    """
+    悔棋：退回到玩家上一次選秀之前 (連同之後 AI 的選擇)。只移動紀錄的游標。
+    """
+    log = st.session_state.draft_log
+    human_picks = np.flatnonzero(log.events()['flags'] == 0)
+    if len(human_picks):
+        log.undo(len(log) - int(human_picks[-1]))
+
+def redo_turn():
+    """
+    重做：重新套用下一次玩家選秀，以及其後到玩家下一個回合之前的 AI 選擇。
+    """
+    log = st.session_state.draft_log
+    human_picks = np.flatnonzero(log.events(applied_only=False)['flags'] == 0)
+    upcoming = human_picks[human_picks >= len(log)]
+    target = int(upcoming[1]) if len(upcoming) > 1 else log.n_events
+    log.redo(target - len(log))
 
 # ----------------------------------------------------
 # 3. Streamlit 界面和邏輯
@@ -114,42 +469,97 @@ with st.sidebar:
     # *** 移除檔案上傳器 ***
     st.info(f"數據檔案 **{DATA_FILEPATH}** 將被自動載入。")
     
-    # 難度選擇保持不變
+    # 選秀開始後設定全部鎖定：選秀紀錄只在開始時記下這些設定 (meta)，續玩時照它還原，
+    # 中途變更會讓續玩的選秀與實際進行的不同。要換設定請重新開始。
+    settings_locked = st.session_state.app_state in ('DRAFTING', 'FINISHED')
+    if settings_locked:
+        st.caption("🔒 選秀進行中，設定已鎖定 (按「啟動遊戲 / 重新開始」後才能變更)。")
+    
+    # 難度選擇 (鎖定時顯示這場選秀實際使用的難度)
+    difficulties = ["easy", "medium", "hard"]
     selected_difficulty = st.selectbox(
         "選擇 AI 難度",
-        options=["easy", "medium", "hard"],
-        index=0
+        options=difficulties,
+        index=difficulties.index(st.session_state.difficulty) if settings_locked else 0,
+        disabled=settings_locked
     )
     
+    # 選秀規則：輪數與順序格式 (於開始選秀時套用)
+    selected_rounds = st.number_input("選秀輪數 (每隊球員數)", min_value=1, max_value=15,
+                                      value=st.session_state.num_rounds if settings_locked else DEFAULT_ROUNDS,
+                                      disabled=settings_locked)
+    selected_format = st.selectbox(
+        "選秀順序",
+        options=list(DRAFT_FORMATS),
+        format_func={"snake": "蛇形 (Snake)", "linear": "固定順序 (Linear)", "third_round_reversal": "第三輪反轉 (3RR)"}.get,
+        index=list(DRAFT_FORMATS).index(st.session_state.draft_format) if settings_locked else 0,
+        disabled=settings_locked
+    )
+    
+    # 聯盟類型：積分制依 pred_score 排名；類別聯盟依剩餘球員池的 z-score 總和排名 (可放棄一個類別)
+    league_type = st.selectbox("聯盟類型", options=list(LEAGUE_TYPES), format_func=LEAGUE_TYPES.get, key="league_type",
+                               disabled=settings_locked)
+    punt = None
+    if league_type != 'points':
+        punt = st.selectbox("放棄類別 (Punt)", options=[None, *CATEGORY_FORMATS[league_type]],
+                            format_func=lambda cat: "不放棄" if cat is None else cat.upper(), key="punt",
+                            disabled=settings_locked)
+    
+    # 位置限制：雙方只能選陣容位置還放得下的球員 (位置由數據推測)
+    use_positions = st.checkbox("位置限制", key="use_positions", disabled=settings_locked,
+                                help="每隊依輪數填 PG/SG/SF/PF/C、G/F、UTIL 與板凳位置；位置由每分鐘數據推測。")
+    
+    # VORP：相對於同位置替補水準 (聯盟隊數 x 陣容位置之後剩下的最佳球員) 的價值
+    use_vorp = st.checkbox("AI 依 VORP 選秀", key="use_vorp", disabled=settings_locked,
+                           help="選用。Medium 依 VORP 排名；Hard 依 VORP 決定要考慮的候選 (勝負仍以總分判斷)。"
+                                "VORP 的位置由每分鐘數據推測，並非真實位置。")
+    
+    # 自訂計分權重：只重新計算分數欄位 (相同權重的 session 共用結果)，不重新載入數據或訓練模型
+    # (續玩時權重已由 resume_draft 寫入 session state，此時不再傳入預設值)
+    with st.expander("自訂計分權重"):
+        scoring_weights = {
+            stat: st.slider(stat.upper(), -5.0, 5.0,
+                            None if f"weight_{stat}" in st.session_state else float(SCORING_RULES[stat]),
+                            0.1, key=f"weight_{stat}", disabled=settings_locked)
+            for stat in SCORING_STATS
+        }
+    
     if st.button("啟動遊戲 / 重新開始"):
         # 重置所有狀態
-        st.session_state.app_state = 'UPLOAD' # 設為 UPLOAD 狀態觸發重新載入
-        st.session_state.df = pd.DataFrame()
-        st.session_state.player_team = []
-        st.session_state.ai_team = []
+        st.session_state.app_state = 'UPLOAD' # 設為 UPLOAD 狀態重新開始
+        st.session_state.draft_log = None
+        st.session_state.draft_id = None
+        st.query_params.clear()
         st.session_state.player_gets_first_pick = None
-        st.session_state.current_pick = 0
+        st.session_state.seed = random.getrandbits(32)
         st.rerun()
 
 # --- 主要應用邏輯 ---
 
 # 階段 1: 數據自動載入
+# *** 修正點 3: 自動開始數據載入 (每個程序只載入一次) ***
+shared = load_shared_data(DATA_FILEPATH)
+
+if shared is None:
+    st.error(f"錯誤：找不到數據檔案於路徑: {DATA_FILEPATH}。請確認檔案已存在於部署目錄中。")
+    st.warning(f"等待數據載入，請確認檔案 {DATA_FILEPATH} 已在正確位置。")
+    st.stop()
+
 if st.session_state.app_state == 'UPLOAD':
-    
-    # *** 修正點 3: 自動開始數據載入 ***
-    if st.session_state.df.empty:
-        # 載入數據
-        st.session_state.df, st.session_state.draft_model = process_data(DATA_FILEPATH, selected_difficulty)
-
-    if not st.session_state.df.empty:
-        st.session_state.difficulty = selected_difficulty
-        st.session_state.app_state = 'READY'
-        st.success("數據載入與模型訓練完成！")
-        st.info("請在側邊欄選擇難度後點擊 '啟動遊戲 / 重新開始' 或直接進入猜拳階段。")
-    elif st.session_state.df.empty:
-        # 如果 process_data 因為找不到檔案而返回空 DF
-        st.warning(f"等待數據載入，請確認檔案 {DATA_FILEPATH} 已在正確位置。")
-        
+    st.session_state.difficulty = selected_difficulty
+    st.session_state.app_state = 'READY'
+    st.success("數據載入與模型訓練完成！")
+    st.info("請在側邊欄選擇難度後點擊 '啟動遊戲 / 重新開始' 或直接進入猜拳階段。")
+
+# 目前計分權重下的球員表 (共用、唯讀)
+weights_key = tuple(float(scoring_weights[stat]) for stat in SCORING_STATS)
+table, base_pool, player_labels = scored_table(DATA_FILEPATH, weights_key)
+speculator = get_speculator()
+ai_context = (weights_key, st.session_state.difficulty, st.session_state.seed, league_type, punt, use_positions,
+              use_vorp)
+# 類別聯盟的共用估值 (AI 以它對每個順位的剩餘球員池重新計算)
+shared_valuation = category_valuation(DATA_FILEPATH, league_type) if league_type != 'points' else None
+
 # 階段 2: 準備就緒 / 猜拳決定首選 (保持不變)
 if st.session_state.app_state == 'READY':
     st.header("🥊 決定首選：猜拳")
@@ -182,65 +592,70 @@ if st.session_state.app_state == 'READY':
                 st.session_state.app_state = 'DRAFTING'
         
     if st.session_state.app_state == 'DRAFTING':
-        st.session_state.draftable_players = st.session_state.df.copy()
-        st.session_state.draftable_players['is_drafted'] = False
+        st.session_state.num_rounds = int(selected_rounds)
+        st.session_state.draft_format = selected_format
+        start_draft_log(weights_key, league_type, punt, use_positions, use_vorp)
         st.rerun()
 
 
-# 階段 3 & 4: 選秀進行中 & 遊戲結束 (保持不變)
+# 階段 3 & 4: 選秀進行中 & 遊戲結束
+schedule = draft_schedule(NUM_TEAMS, st.session_state.num_rounds, st.session_state.draft_format)
+draft_pool = session_pool(base_pool)
+player_team, ai_team = team_rosters()
+# 類別聯盟：依目前剩餘球員池計算 z-score 總和，作為這個 session 選秀池的排名欄位
+value_column = valuation_column(punt)
+roster_slots = roster_template(schedule.num_rounds) if use_positions else None
+# 目前的 VORP (由選秀紀錄逐順位更新；顯示用，啟用時也交給 AI)
+shared_vorp = vorp_template(DATA_FILEPATH, weights_key, league_type, punt, schedule.num_rounds)
+session_vorp = session_vorp_engine(shared_vorp)
+# AI (包括背景的預先計算) 使用這個狀態的快照；session 的引擎之後還會被更新
+ai_vorp = session_vorp.copy() if use_vorp else None
+if shared_valuation is not None:
+    session_valuation = shared_valuation.copy()
+    session_valuation.exclude(current_picks()) # 增量更新參考池動差
+    session_valuation.register(draft_pool, (value_column,))
+
+# 悔棋 / 重做只移動選秀紀錄的游標，下一次重新執行時由紀錄重播選秀池
+if st.session_state.app_state in ('DRAFTING', 'FINISHED'):
+    with st.sidebar:
+        st.header("選秀紀錄")
+        log = st.session_state.draft_log
+        st.caption(f"已選 {len(log)} / {schedule.total_picks} 順位 · 續玩網址參數: ?draft={st.session_state.draft_id}")
+        undo_col, redo_col = st.columns(2)
+        undo_clicked = undo_col.button("↩️ 悔棋", disabled=not (log.events()['flags'] == 0).any())
+        redo_clicked = redo_col.button("↪️ 重做", disabled=not log.can_redo)
+        if undo_clicked or redo_clicked:
+            undo_turn() if undo_clicked else redo_turn()
+            save_draft_log()
+            speculator.discard_pending()
+            st.session_state.app_state = 'FINISHED' if len(log) == schedule.total_picks else 'DRAFTING'
+            st.rerun()
+
 def process_draft_pick():
     """處理單次選秀邏輯"""
-    # ... (與上次提供的版本保持一致，此處省略，請確保您使用了最新的 process_draft_pick 函數) ...
-    
-    current_pick = st.session_state.current_pick
-    # 決定當前是誰的回合 (邏輯與之前版本相同)
-    snake_round_number = current_pick // 2
-    is_player_picking_now = False
     
-    player_gets_first_pick = st.session_state.player_gets_first_pick
-
-    # ... (判斷 is_player_picking_now 的邏輯) ...
-    if player_gets_first_pick:
-        if snake_round_number % 2 == 0: # 順序輪 (P1 -> AI)
-            is_player_picking_now = (current_pick % 2 == 0)
-        else: # 逆序輪 (AI -> P1)
-            is_player_picking_now = (current_pick % 2 != 0)
-    else: # AI gets first pick
-        if snake_round_number % 2 == 0: # 順序輪 (AI -> P1)
-            is_player_picking_now = (current_pick % 2 != 0)
-        else: # 逆序輪 (P1 -> AI)
-            is_player_picking_now = (current_pick % 2 == 0)
-
-    draftable_players = st.session_state.draftable_players
+    current_pick = len(st.session_state.draft_log)
+    # 決定當前是誰的回合：查選秀順序表 (team 0 = 第一順位)
+    player_team_index = 0 if st.session_state.player_gets_first_pick else 1
+    is_player_picking_now = schedule.team_for_pick(current_pick) == player_team_index
 
     if is_player_picking_now:
         return True # 這是玩家回合，等待 Streamlit widget 輸入
     else: # AI 回合
         st.info(f"AI 回合... 正在思考中 (難度: {st.session_state.difficulty})...")
-        available_for_ai = draftable_players[draftable_players['is_drafted'] == False].copy()
-        ai_selected_id = None
-        
-        # 呼叫 AI 邏輯
-        try:
-            if st.session_state.difficulty == "easy":
-                ai_selected_id = ai_pick_easy(available_for_ai)
-            elif st.session_state.difficulty == "medium":
-                ai_selected_id = ai_pick_medium(available_for_ai, st.session_state.draft_model) 
-            elif st.session_state.difficulty == "hard":
-                ai_selected_id = ai_pick_hard(available_for_ai, st.session_state.draft_model)
-        except Exception:
-             ai_selected_id = ai_pick_easy(available_for_ai)
+        picks = st.session_state.draft_log.picks()
+        # 玩家回合時多半已在背景算好；沒有預先計算時才在這裡計算
+        ai_selected_id = speculator.get(
+            ai_pick_key(picks, ai_context, base_pool, schedule, 1 - player_team_index), compute_ai_pick,
+            base_pool, picks, schedule, 1 - player_team_index,
+            st.session_state.difficulty, st.session_state.seed, shared['draft_model'],
+            shared_valuation, value_column, roster_slots, ai_vorp)
 
         # 檢查選秀結果並更新狀態
-        if ai_selected_id is not None and ai_selected_id in draftable_players.index and not draftable_players.loc[ai_selected_id, 'is_drafted']:
-            st.session_state.ai_team.append(ai_selected_id)
-            draftable_players.loc[ai_selected_id, 'is_drafted'] = True
-            player_name = draftable_players.loc[ai_selected_id, 'Player']
+        if ai_selected_id is not None and draft_pool.is_available(ai_selected_id):
+            record_pick(draft_pool, ai_selected_id, schedule, ai_seed=pick_seed(st.session_state.seed, current_pick))
+            player_name = table.loc[ai_selected_id, 'Player']
             st.success(f"**AI** 選擇了：**{player_name}** (ID: {ai_selected_id})")
-            
-            # 推進選秀
-            st.session_state.current_pick += 1
-            st.session_state.draftable_players = draftable_players
             st.rerun()
         else:
             st.error("AI 選秀邏輯出錯或無可用球員，遊戲結束。")
@@ -250,8 +665,9 @@ def process_draft_pick():
     return is_player_picking_now
 
 
-if st.session_state.app_state == 'DRAFTING' and st.session_state.current_pick < TOTAL_PICKS:
-    st.header(f"Draft Pick {st.session_state.current_pick + 1} / {TOTAL_PICKS}")
+total_picks = schedule.total_picks
+if st.session_state.app_state == 'DRAFTING' and len(st.session_state.draft_log) < total_picks:
+    st.header(f"Draft Pick {len(st.session_state.draft_log) + 1} / {total_picks}")
 
     is_player_turn = process_draft_pick() 
 
@@ -259,62 +675,76 @@ if st.session_state.app_state == 'DRAFTING' and st.session_state.current_pick <
     team_col1, team_col2 = st.columns(2)
     with team_col1:
         st.subheader("你的隊伍 🧑 (Player)")
-        # 顯示玩家隊伍 (使用 .head(5) 可能會誤導，但保持與上次一致)
-        roster_to_display = st.session_state.df.loc[st.session_state.player_team, ['Player', 'team_abbreviation', 'fantasy_score', 'pred_score']].fillna(0)
-        st.write(roster_to_display)
+        roster_to_display = table.loc[player_team, ['Player', 'Pos', 'team_abbreviation', 'fantasy_score', 'pred_score']].fillna(0)
+        st.dataframe(roster_to_display, column_config=POSITION_DISPLAY)
     with team_col2:
         st.subheader("AI 隊伍 🤖")
-        roster_to_display = st.session_state.df.loc[st.session_state.ai_team, ['Player', 'team_abbreviation', 'fantasy_score', 'pred_score']].fillna(0)
-        st.write(roster_to_display)
+        roster_to_display = table.loc[ai_team, ['Player', 'Pos', 'team_abbreviation', 'fantasy_score', 'pred_score']].fillna(0)
+        st.dataframe(roster_to_display, column_config=POSITION_DISPLAY)
+    with st.expander("各位置替補水準 (VORP 基準)"):
+        st.dataframe(session_vorp.replacement_frame(), use_container_width=True)
 
 
     # 玩家選秀介面
     if is_player_turn:
         st.subheader("你的選秀回合 🎯")
         
-        available_players = st.session_state.draftable_players[
-            st.session_state.draftable_players['is_drafted'] == False
-        ].copy()
-        
-        if 'Player' in available_players.columns and 'fantasy_score' in available_players.columns:
+        if 'Player' in table.columns and 'fantasy_score' in table.columns:
             
-            AI_SORT_COLUMN = 'pred_score'
+            # 類別聯盟依 z-score 總和排名，積分制依 pred_score
+            AI_SORT_COLUMN = value_column if shared_valuation is not None else 'pred_score'
             
-            sorted_players_display = available_players.sort_values(by=AI_SORT_COLUMN, ascending=False)
+            # DraftPool 已維護排序，只需以 bitmask 濾掉已選球員 (不重新排序)
+            available_slots = draft_pool.available_slots(AI_SORT_COLUMN)
+            if roster_slots is not None:
+                # 位置限制：只列出陣容還放得下的球員 (每名球員一次查表)
+                allowed = roster_slots.state(table.loc[player_team, POSITION_COLUMN]).allowed_types()
+                available_slots = available_slots[allowed[table[POSITION_COLUMN].to_numpy()[available_slots]]]
+                if not len(available_slots):
+                    st.error("沒有球員能放進你剩下的陣容位置。")
+                    st.stop()
             
-            player_options = sorted_players_display.apply(
-                lambda row: f"{row['Player']} ({row['team_abbreviation']}) - ID: {row.name} (FScore: {row['fantasy_score']:.2f})", 
-                axis=1
-            ).tolist()
-            
-            player_selection = st.selectbox(
+            # 選單以 player_id 為值，標籤已預先產生，不需要從字串解析 ID
+            player_selected_id = st.selectbox(
                 "選擇要選秀的球員 (FScore = 傳統夢幻分數)",
-                options=player_options,
+                options=draft_pool.ids[available_slots].tolist(),
+                format_func=lambda player_id: player_labels[draft_pool.slot(player_id)],
                 index=0
             )
             
-            selected_player_id_str = player_selection.split(' - ID: ')[1].split(' (FScore:')[0].strip()
-            player_selected_id = int(selected_player_id_str)
+            # 玩家思考時，在背景預先計算 AI 對最可能的幾個選擇的回應
+            candidates = draft_pool.ids[available_slots[:SPECULATE_TOP]].tolist()
+            if player_selected_id not in candidates:
+                candidates.append(player_selected_id)
+            for candidate in candidates:
+                speculate_ai_turn(speculator, current_picks() + [candidate], ai_context, base_pool, schedule,
+                                  1 if st.session_state.player_gets_first_pick else 0, shared['draft_model'],
+                                  shared_valuation, roster_slots, ai_vorp)
             
-            # 顯示可用球員 (僅前 10 位)
+            # 顯示可用球員 (分頁，只建立目前這一頁的表格)
+            n_pages = max(1, -(-len(available_slots) // PAGE_SIZE))
+            page = st.number_input(f"頁數 (共 {n_pages} 頁)", min_value=1, max_value=n_pages, value=1, step=1)
+            page_slots = available_slots[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+            page_table = table.iloc[page_slots][['Player', 'Pos', 'team_abbreviation', 'fantasy_score', 'pred_score']]
+            if shared_valuation is not None:
+                page_table = page_table.assign(Cat_Value=draft_pool.scores(value_column)[page_slots])
+            page_vorp = session_vorp.frame().iloc[page_slots]
+            page_table = page_table.assign(VORP=page_vorp['vorp'].to_numpy(), VORP_Pos=page_vorp['vorp_pos'].to_numpy())
             st.dataframe(
-                sorted_players_display[['Player', 'team_abbreviation', 'fantasy_score', 'pred_score']]
-                .rename(columns={'fantasy_score': 'Display_Score (FScore)', 'pred_score': 'AI_Pred_Score (Hidden)'}) 
-                .head(10),
-                use_container_width=True
+                page_table.rename(columns={'fantasy_score': 'Display_Score (FScore)', 'pred_score': 'AI_Pred_Score (Hidden)'}),
+                use_container_width=True, column_config=POSITION_DISPLAY
             )
+            st.caption("Pos 與 VORP_Pos 是依每分鐘數據推測的位置，並非真實位置。")
 
-            if st.button(f"Draft {sorted_players_display.loc[player_selected_id, 'Player']}"):
+            if st.button(f"Draft {table.loc[player_selected_id, 'Player']}"):
                 # 執行選秀
-                if not st.session_state.draftable_players.loc[player_selected_id, 'is_drafted']:
-                    st.session_state.player_team.append(player_selected_id)
-                    st.session_state.draftable_players.loc[player_selected_id, 'is_drafted'] = True
-                    st.success(f"你選擇了：**{sorted_players_display.loc[player_selected_id, 'Player']}**")
-                    
-                    st.session_state.current_pick += 1
-                    
-                    if st.session_state.current_pick == TOTAL_PICKS:
-                        st.session_state.app_state = 'FINISHED'
+                if draft_pool.is_available(player_selected_id):
+                    record_pick(draft_pool, player_selected_id, schedule)
+                    # 其他候選的預先計算已用不到；保留 AI 對這次選擇的回應
+                    ai_team_index = 1 if st.session_state.player_gets_first_pick else 0
+                    speculator.discard_pending(keep=(ai_pick_key(current_picks(), ai_context, base_pool, schedule,
+                                                                 ai_team_index),))
+                    st.success(f"你選擇了：**{table.loc[player_selected_id, 'Player']}**")
                     st.rerun()
                 else:
                     st.warning("該球員已被選秀！請選擇另一位。")
@@ -325,18 +755,30 @@ if st.session_state.app_state == 'DRAFTING' and st.session_state.current_pick <
 if st.session_state.app_state == 'FINISHED':
     st.header("🎉 選秀結束 - 比賽模擬結果")
 
+    # 隨機模擬多場對戰 (種子固定，重新執行時結果不變)；勝負由勝率決定，而非兩個平均分數的比較
+    # 類別制比賽使用聯盟的類別 (八類別不含 TOV；積分制聯盟以九類別作為參考)
+    match_format = league_type if league_type != 'points' else '9cat'
+    match_scoring = st.radio("計分方式", options=["points", "categories"], horizontal=True,
+                             index=0 if league_type == 'points' else 1,
+                             format_func={"points": LEAGUE_TYPES['points'], "categories": f"{LEAGUE_TYPES[match_format]} H2H"}.get)
     result = simulate_match(
-        st.session_state.player_team, 
-        st.session_state.ai_team, 
-        st.session_state.df, 
-        st.session_state.difficulty
+        player_team, 
+        ai_team, 
+        table, 
+        st.session_state.difficulty,
+        engine=shared['match_engine'],
+        scoring=match_scoring,
+        scoring_rules=weights_key,
+        seed=st.session_state.seed,
+        categories=CATEGORY_FORMATS[match_format]
     )
 
-    st.subheader(f"計分模式: **{result['score_type'].upper()}**")
+    st.subheader(f"計分模式: **{result['score_type'].upper()}** ({result['n_sims']} 場模擬)")
     
-    col_p, col_a = st.columns(2)
-    col_p.metric("你的隊伍得分 (Player)", f"{result['player_score']:.2f}")
-    col_a.metric("AI 隊伍得分 (AI)", f"{result['ai_score']:.2f}")
+    col_p, col_a, col_w = st.columns(3)
+    col_p.metric("你的隊伍平均得分 (Player)", f"{result['player_score']:.2f}")
+    col_a.metric("AI 隊伍平均得分 (AI)", f"{result['ai_score']:.2f}")
+    col_w.metric("你的勝率", f"{result['win_prob']:.1%}", help=f"平手 {result['tie_prob']:.1%}")
 
     if result['winner'] == 'Player':
         st.balloons()
@@ -345,13 +787,22 @@ if st.session_state.app_state == 'FINISHED':
         st.error(f"👎 **AI 獲勝！** 繼續努力！")
     else:
         st.info("🤝 **平手！**")
+
+    dist_col, margin_col = st.columns(2)
+    with dist_col:
+        st.caption("得分分布 (分位數)")
+        st.dataframe(result['score_quantiles'].rename(columns={'team_a': 'Player', 'team_b': 'AI'}),
+                     use_container_width=True)
+    with margin_col:
+        st.caption("各類別差距 (Player - AI) 與類別勝率")
+        st.dataframe(result['category_margins'], use_container_width=True)
         
     st.subheader("最終隊伍陣容與分數")
     
-    roster_df = st.session_state.df.loc[
-        st.session_state.player_team + st.session_state.ai_team, 
-        ['Player', 'team_abbreviation', 'fantasy_score', 'pred_score']
+    roster_df = table.loc[
+        player_team + ai_team, 
+        ['Player', 'Pos', 'team_abbreviation', 'fantasy_score', 'pred_score']
     ].copy()
-    roster_df['Team'] = ['Player'] * len(st.session_state.player_team) + ['AI'] * len(st.session_state.ai_team)
+    roster_df['Team'] = ['Player'] * len(player_team) + ['AI'] * len(ai_team)
     
-    st.dataframe(roster_df, use_container_width=True)
\ No newline at end of file
+    st.dataframe(roster_df, use_container_width=True, column_config=POSITION_DISPLAY)
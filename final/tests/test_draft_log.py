@@ -0,0 +1,112 @@
+"""
+DraftLog: replay (from periodic snapshots) against a live DraftPool, undo / redo and the
+binary encoding.
+"""
+import pickle
+import random
+import numpy as np
+import pandas as pd
+import pytest
+
+from draft_log import DraftLog, SNAPSHOT_INTERVAL, FLAG_AI
+from draft_pool import DraftPool
+
+@pytest.fixture
+def pool():
+    rng = np.random.default_rng(0)
+    ids = rng.choice(np.arange(1, 5000), size=400, replace=False)
+    return DraftPool(pd.DataFrame({"fantasy_score": rng.normal(size=400)}, index=pd.Index(ids, name="player_id")))
+
+def _replayed(log, pool):
+    return log.replay(pool.new_draft()).drafted
+
+@pytest.mark.parametrize("seed", range(4))
+def test_replay_matches_live_pool_through_undo_and_redo(pool, seed):
+    picker = random.Random(seed)
+    log = DraftLog({"seed": seed})
+    live = pool.new_draft()
+    applied = []
+    for step in range(400):
+        roll = picker.random()
+        if roll < 0.15 and log.can_undo:
+            n = log.undo(picker.randint(1, 2 * SNAPSHOT_INTERVAL))
+            for player_id in applied[len(applied) - n:]:
+                live.restore(player_id)
+            del applied[len(applied) - n:]
+        elif roll < 0.25 and log.can_redo:
+            redo = log.events(applied_only=False)["player_id"][len(applied):].tolist()
+            n = log.redo(picker.randint(1, 2 * SNAPSHOT_INTERVAL))
+            for player_id in redo[:n]:
+                live.draft(player_id)
+                applied.append(player_id)
+        elif len(live):
+            player_id = picker.choice(live.available_ids().tolist())
+            live.draft(player_id)
+            applied.append(player_id)
+            log.append(player_id, step % 4, ai_seed=step if step % 2 else None)
+        assert len(log) == len(applied)
+        assert log.picks() == applied
+        np.testing.assert_array_equal(_replayed(log, pool), live.drafted)
+        assert log.drafted_bitmask(pool) == live.drafted_bitmask()
+
+def test_append_after_undo_discards_the_redo_tail(pool):
+    ids = pool.ids.tolist()
+    log = DraftLog()
+    for i in range(2 * SNAPSHOT_INTERVAL + 5):
+        log.append(ids[i], i % 2)
+    log.drafted_bitmask(pool) # builds snapshots past the point we undo to
+    assert log.undo(SNAPSHOT_INTERVAL + 10) == SNAPSHOT_INTERVAL + 10
+    assert log.can_redo
+    log.append(ids[300], 1)
+    assert not log.can_redo
+    assert log.n_events == len(log) == SNAPSHOT_INTERVAL - 4
+    expected = ids[:SNAPSHOT_INTERVAL - 5] + [ids[300]]
+    assert log.picks() == expected
+    assert log.redo() == 0
+    live = pool.new_draft()
+    for player_id in expected:
+        live.draft(player_id)
+    np.testing.assert_array_equal(_replayed(log, pool), live.drafted)
+    assert log.undo(1000) == len(expected) and not log.can_undo
+
+def test_rosters_and_event_fields():
+    log = DraftLog()
+    log.append(10, 0)
+    log.append(20, 1, ai_seed=0xDEADBEEF)
+    log.append(30, 1, ai_seed=0)
+    events = log.events()
+    assert events["flags"].tolist() == [0, FLAG_AI, FLAG_AI]
+    assert events["seed"].tolist() == [0, 0xDEADBEEF, 0]
+    assert log.rosters(2) == [[10], [20, 30]]
+
+def test_binary_round_trip(pool, tmp_path):
+    ids = pool.ids.tolist()
+    log = DraftLog({"difficulty": "hard", "weights": [1.0, 1.2], "punt": None}, start_time=1_700_000_000.5)
+    for i in range(70):
+        log.append(ids[i], i % 3, ai_seed=i * 7 if i % 3 else None)
+    log.undo(5)
+    data = log.to_bytes()
+    for copy in (DraftLog.from_bytes(data), pickle.loads(pickle.dumps(log))):
+        assert copy.meta == log.meta
+        assert copy.start_time == log.start_time
+        assert (len(copy), copy.n_events) == (65, 70)
+        assert copy.events(applied_only=False).tobytes() == log.events(applied_only=False).tobytes()
+        np.testing.assert_array_equal(_replayed(copy, pool), _replayed(log, pool))
+        assert copy.redo(5) == 5 and copy.picks() == ids[:70]
+
+    path = tmp_path / "logs" / "draft.ndl"
+    log.save(str(path))
+    loaded = DraftLog.load(str(path))
+    assert loaded.to_bytes() == data
+    assert len(data) < 64 + 70 * 14 + len(b'{"difficulty":"hard","weights":[1.0,1.2],"punt":null}')
+
+def test_from_bytes_rejects_bad_data():
+    data = DraftLog({"a": 1}).to_bytes()
+    with pytest.raises(ValueError):
+        DraftLog.from_bytes(data[:5])
+    with pytest.raises(ValueError):
+        DraftLog.from_bytes(b"XXXX" + data[4:])
+    log = DraftLog()
+    log.append(1, 0)
+    with pytest.raises(ValueError):
+        DraftLog.from_bytes(log.to_bytes()[:-1])
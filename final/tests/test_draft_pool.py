@@ -0,0 +1,107 @@
+"""
+DraftPool / RankingIndex (lazy block-by-block ranking, per-column cursors) against a full
+stable argsort of the available players.
+"""
+import random
+import numpy as np
+import pandas as pd
+import pytest
+
+from draft_pool import DraftPool, RankingIndex
+
+def _table(rng, n, ties=True):
+    # Rounded scores give plenty of ties; ties must be ranked in slot order
+    fantasy = np.round(rng.normal(20, 8, n), 0 if ties else 6)
+    pred = np.round(rng.normal(20, 8, n), 1)
+    ids = rng.choice(np.arange(10_000, 10_000 + 20 * n), size=n, replace=False)
+    return pd.DataFrame({"fantasy_score": fantasy, "pred_score": pred}, index=pd.Index(ids, name="player_id"))
+
+def _expected(pool, col, allowed=None):
+    order = np.argsort(-pool.scores(col), kind="stable")
+    keep = ~pool.drafted[order]
+    if allowed is not None:
+        keep &= allowed[order]
+    return pool.ids[order[keep]].tolist()
+
+@pytest.mark.parametrize("n,block", [(1, 64), (7, 2), (150, 8), (400, 64)])
+def test_ranking_index_matches_stable_argsort(n, block):
+    rng = np.random.default_rng(n)
+    scores = np.round(rng.normal(0, 3, n))
+    expected = np.argsort(-scores, kind="stable")
+    lazy = RankingIndex(scores, block=block)
+    # Reading positions in order extends the ranking a block at a time
+    for position in range(n):
+        assert lazy.slot_at(position) == expected[position]
+        assert lazy.rank(expected[position]) == position
+    assert lazy.slot_at(n) is None
+    np.testing.assert_array_equal(RankingIndex(scores, block=block).full_order(), expected)
+    np.testing.assert_array_equal(RankingIndex(scores, order=expected).full_order(), expected)
+
+@pytest.mark.parametrize("seed", range(8))
+def test_best_available_and_top_k_after_random_picks(seed):
+    rng = np.random.default_rng(seed)
+    picker = random.Random(seed)
+    table = _table(rng, 200)
+    pool = DraftPool(table)
+    for col in pool.score_columns:
+        pool.ranking(col).block = picker.choice([1, 4, 16])
+    drafted = []
+    for _ in range(300):
+        if drafted and picker.random() < 0.25:
+            player_id = drafted.pop(picker.randrange(len(drafted)))
+            pool.restore(player_id)
+        elif len(pool):
+            player_id = picker.choice(pool.available_ids().tolist())
+            pool.draft(player_id)
+            drafted.append(player_id)
+        assert len(pool) == len(table) - len(drafted)
+        col = picker.choice(["fantasy_score", "pred_score"])
+        expected = _expected(pool, col)
+        assert pool.best_available(col) == (expected[0] if expected else None)
+        k = picker.randrange(1, 12)
+        assert pool.top_k(col, k) == expected[:k]
+        allowed = rng.random(len(table)) < 0.3
+        expected_allowed = _expected(pool, col, allowed)
+        assert pool.best_available(col, allowed) == (expected_allowed[0] if expected_allowed else None)
+        assert pool.top_k(col, k, allowed) == expected_allowed[:k]
+        assert pool.available_ids(col).tolist() == expected
+        assert sorted(pool.available_ids().tolist()) == sorted(expected)
+
+def test_drafted_bitmask_round_trip():
+    rng = np.random.default_rng(5)
+    for n in (1, 8, 9, 63, 64, 65, 300):
+        table = _table(rng, n)
+        pool = DraftPool(table)
+        drafted = rng.random(n) < 0.4
+        for player_id in pool.ids[drafted].tolist():
+            pool.draft(player_id)
+        mask = pool.drafted_bitmask()
+        assert mask == sum(1 << slot for slot in np.flatnonzero(drafted).tolist())
+        other = pool.new_draft()
+        other.best_available("pred_score") # move a cursor before loading
+        other.load_drafted_bitmask(mask)
+        np.testing.assert_array_equal(other.drafted, drafted)
+        assert len(other) == n - int(drafted.sum())
+        assert other.top_k("fantasy_score", 5) == _expected(pool, "fantasy_score")[:5]
+
+def test_new_draft_shares_rankings_not_state():
+    table = _table(np.random.default_rng(9), 50)
+    pool = DraftPool(table)
+    first = pool.best_available("fantasy_score")
+    pool.draft(first)
+    fresh = pool.new_draft()
+    assert fresh.best_available("fantasy_score") == first
+    assert fresh.ranking("fantasy_score") is pool.ranking("fantasy_score")
+    assert pool.is_drafted(first) and fresh.is_available(first)
+    with pytest.raises(ValueError):
+        pool.draft(first)
+    with pytest.raises(KeyError):
+        pool.draft(-1)
+
+def test_set_scores_with_known_order():
+    table = _table(np.random.default_rng(11), 80)
+    pool = DraftPool(table)
+    custom = np.round(np.random.default_rng(12).normal(size=80), 1)
+    pool.set_scores("custom", custom, order=np.argsort(-custom, kind="stable"))
+    pool.draft(pool.best_available("custom"))
+    assert pool.top_k("custom", 10) == _expected(pool, "custom")[:10]
@@ -0,0 +1,70 @@
+"""
+ScoreBreakdown's delta updates (delta_w x stat column, adaptive re-rank) against recomputing
+the scores and a full stable sort from scratch.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_engineering import ScoreBreakdown, SCORING_STATS, DEFAULT_SCORING_RULES, compute_fantasy_score
+
+def _stat_table(rng, n, integer=False):
+    values = rng.integers(0, 6, (n, len(SCORING_STATS))) if integer else rng.gamma(2.0, 3.0, (n, len(SCORING_STATS)))
+    return pd.DataFrame(values.astype(np.float64), columns=SCORING_STATS,
+                        index=pd.Index(np.arange(100, 100 + n), name="player_id"))
+
+def _full(df, rules):
+    scores = compute_fantasy_score(df.copy(), rules)["fantasy_score"].to_numpy()
+    return scores, np.argsort(-scores, kind="stable")
+
+@pytest.mark.parametrize("seed", range(5))
+def test_delta_updates_match_full_recompute(seed):
+    rng = np.random.default_rng(seed)
+    df = _stat_table(rng, 300)
+    breakdown = ScoreBreakdown(df)
+    for _ in range(40):
+        rules = breakdown.scoring_rules
+        if rng.random() < 0.3:
+            rules = {stat: float(rng.uniform(-5, 5)) for stat in SCORING_STATS}
+        else:
+            rules[SCORING_STATS[rng.integers(len(SCORING_STATS))]] = float(np.round(rng.uniform(-5, 5), 1))
+        derived = breakdown.copy()
+        derived.update(rules)
+        scores, order = _full(df, rules)
+        np.testing.assert_allclose(derived.scores, scores, rtol=1e-9, atol=1e-9)
+        np.testing.assert_array_equal(derived.order, order)
+        np.testing.assert_allclose(derived.contributions.sum(axis=1), scores, rtol=1e-9, atol=1e-9)
+        breakdown = derived
+
+def test_ties_are_ranked_in_row_order():
+    # Small integer stats and binary-fraction weights: scores are exact, with many ties
+    df = _stat_table(np.random.default_rng(7), 200, integer=True)
+    breakdown = ScoreBreakdown(df, {"pts": 1, "reb": 1.25, "ast": 1.5, "stl": 3, "blk": 3, "tov": -1})
+    for stat, weight in [("reb", 0.5), ("tov", 0.0), ("pts", 2.0), ("ast", -0.25), ("reb", 1.0)]:
+        assert breakdown.set_weight(stat, weight)
+        scores, order = _full(df, breakdown.scoring_rules)
+        np.testing.assert_array_equal(breakdown.scores, scores)
+        np.testing.assert_array_equal(breakdown.order, order)
+        np.testing.assert_array_equal(breakdown.ranked_ids(), df.index[order])
+    assert not breakdown.set_weight("reb", 1.0)
+
+def test_copy_leaves_the_original_unchanged():
+    df = _stat_table(np.random.default_rng(1), 50)
+    breakdown = ScoreBreakdown(df)
+    before = breakdown.scores.copy(), breakdown.order.copy()
+    derived = breakdown.copy()
+    derived.update({"blk": -4.0})
+    np.testing.assert_array_equal(breakdown.scores, before[0])
+    np.testing.assert_array_equal(breakdown.order, before[1])
+    assert breakdown.scoring_rules == {stat: float(w) for stat, w in DEFAULT_SCORING_RULES.items()}
+
+def test_custom_matrix_and_clipped_order():
+    rng = np.random.default_rng(3)
+    df = _stat_table(rng, 120)
+    basis = rng.normal(0, 2, (120, len(SCORING_STATS)))
+    breakdown = ScoreBreakdown(df, stats=basis)
+    breakdown.update({"pts": 0.5, "tov": 2.0})
+    weights = np.array([breakdown.scoring_rules[stat] for stat in SCORING_STATS])
+    clipped = np.maximum(0, basis @ weights)
+    assert (clipped == 0).sum() > 10
+    np.testing.assert_array_equal(breakdown.clipped_order(0.0), np.argsort(-clipped, kind="stable"))
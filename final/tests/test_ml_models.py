@@ -0,0 +1,104 @@
+"""
+Closed-form model code in ml_models against direct computation.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from sklearn.linear_model import Ridge
+
+from ml_models import BootstrapRidge, RidgeSolver
+
+@pytest.fixture
+def regression_problem():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(60, 4))
+    Y = X @ rng.normal(size=(4, 3)) + rng.normal(scale=0.5, size=(60, 3))
+    return X, Y
+
+def test_prediction_moments_match_bootstrap_samples(regression_problem):
+    X, Y = regression_problem
+    ensemble = BootstrapRidge(alpha=0.5, n_boot=40, seed=1).fit(X, Y)
+    moments = ensemble.prediction_moments(X)
+    for weights in ([1.0, 0.0, 0.0], [1.0, -2.5, 0.3], [0.0, 0.0, 0.0]):
+        direct = ensemble.prediction_frame(X, weights)
+        from_moments = ensemble.prediction_frame(X, weights, moments=moments)
+        pd.testing.assert_frame_equal(from_moments, direct, rtol=1e-9, atol=1e-9)
+
+@pytest.mark.parametrize("n,p", [(30, 5), (12, 20)])
+def test_solve_matches_sklearn_ridge(n, p):
+    rng = np.random.default_rng(n)
+    X = rng.normal(size=(n, p))
+    Y = X @ rng.normal(size=(p, 2)) + rng.normal(size=(n, 2)) + 3.0
+    solver = RidgeSolver(X)
+    for alpha in (0.01, 1.0, 50.0):
+        reference = Ridge(alpha=alpha).fit(X, Y)
+        coef, intercept = solver.solve(Y, alpha)
+        np.testing.assert_allclose(coef.T, reference.coef_, rtol=1e-6, atol=1e-8)
+        np.testing.assert_allclose(intercept, reference.intercept_, rtol=1e-6, atol=1e-8)
+        single = solver.fit(Y[:, 0], alpha)
+        np.testing.assert_allclose(single.predict(X), reference.predict(X)[:, 0], rtol=1e-6, atol=1e-8)
+        np.testing.assert_allclose(solver.fitted(Y, alpha), reference.predict(X), rtol=1e-6, atol=1e-8)
+    coefs, intercepts = solver.solve_path(Y, (0.01, 1.0, 50.0))
+    for j, alpha in enumerate((0.01, 1.0, 50.0)):
+        coef, intercept = solver.solve(Y, alpha)
+        np.testing.assert_allclose(coefs[j], coef, rtol=1e-6, atol=1e-8)
+        np.testing.assert_allclose(intercepts[j], intercept, rtol=1e-6, atol=1e-8)
+
+@pytest.mark.parametrize("n,p", [(25, 4), (15, 30)])
+def test_cv_path_matches_brute_force_leave_one_out(n, p):
+    rng = np.random.default_rng(p)
+    X = rng.normal(size=(n, p))
+    y = X @ rng.normal(size=p) + rng.normal(scale=2.0, size=n)
+    alphas = (1e-3, 0.1, 1.0, 10.0, 1e3)
+    results = RidgeSolver(X).cv_path(y, alphas)
+
+    loo_mse, gcv_mse = [], []
+    Xc = X - X.mean(axis=0)
+    for alpha in alphas:
+        errors = [y[i] - Ridge(alpha=alpha).fit(np.delete(X, i, 0), np.delete(y, i)).predict(X[i:i + 1])[0]
+                  for i in range(n)]
+        loo_mse.append(np.mean(np.square(errors)))
+        # GCV from the explicit hat matrix (the intercept is not penalized)
+        hat = Xc @ np.linalg.solve(Xc.T @ Xc + alpha * np.eye(p), Xc.T) + 1.0 / n
+        residuals = y - Ridge(alpha=alpha).fit(X, y).predict(X)
+        gcv_mse.append(np.mean(residuals ** 2) / (1 - np.trace(hat) / n) ** 2)
+    np.testing.assert_allclose(results["loo_mse"], loo_mse, rtol=1e-6)
+    np.testing.assert_allclose(results["gcv_mse"], gcv_mse, rtol=1e-6)
+
+    for criterion, expected in (("loo", loo_mse), ("gcv", gcv_mse)):
+        alpha, selected = RidgeSolver(X).select_alpha(y, alphas, criterion)
+        assert alpha == alphas[int(np.argmin(expected))]
+        assert selected["best_index"] == int(np.argmin(expected))
+    with pytest.raises(ValueError):
+        RidgeSolver(X).select_alpha(y, alphas, "aic")
+
+def test_bootstrap_ridge_matches_weighted_sklearn_fits(regression_problem):
+    X, Y = regression_problem
+    n_boot, seed, alpha = 25, 3, 2.0
+    ensemble = BootstrapRidge(alpha=alpha, n_boot=n_boot, seed=seed).fit(X, Y)
+
+    # The same resampling counts, each replicate fitted as a weighted ridge
+    counts = np.random.default_rng(seed).multinomial(len(X), np.full(len(X), 1.0 / len(X)), size=n_boot)
+    oob_residuals = []
+    for b in range(n_boot):
+        reference = Ridge(alpha=alpha).fit(X, Y, sample_weight=counts[b])
+        np.testing.assert_allclose(ensemble.coefs_[b].T, reference.coef_, rtol=1e-6, atol=1e-9)
+        np.testing.assert_allclose(ensemble.intercepts_[b], reference.intercept_, rtol=1e-6, atol=1e-9)
+        oob = counts[b] == 0
+        oob_residuals.append(Y[oob] - reference.predict(X[oob]))
+    oob_residuals = np.concatenate(oob_residuals)
+    np.testing.assert_allclose(ensemble.residual_cov_, oob_residuals.T @ oob_residuals / len(oob_residuals),
+                               rtol=1e-6, atol=1e-9)
+
+    samples = ensemble.predict_distribution(X, [1.0, 0.5, -1.0])
+    expected = np.column_stack([Ridge(alpha=alpha).fit(X, Y, sample_weight=counts[b]).predict(X) @ [1.0, 0.5, -1.0]
+                                for b in range(n_boot)])
+    np.testing.assert_allclose(samples, expected, rtol=1e-6, atol=1e-8)
+
+def test_single_target_bootstrap_ridge(regression_problem):
+    X, Y = regression_problem
+    ensemble = BootstrapRidge(alpha=1.0, n_boot=10, seed=0).fit(X, Y[:, 0])
+    assert ensemble.predict_distribution(X).shape == (len(X), 10)
+    with pytest.raises(ValueError):
+        BootstrapRidge(n_boot=10).fit(X, Y).predict_distribution(X)
@@ -0,0 +1,84 @@
+"""
+RosterState's Hall's-condition bookkeeping against an exhaustive search for a matching of
+players to distinct slots, over random slot templates and rosters.
+"""
+import random
+import numpy as np
+import pandas as pd
+import pytest
+
+from roster_slots import (SLOT_POSITIONS, DEFAULT_ROSTER_SLOTS, N_TYPES, RosterSlots, infer_positions,
+                          roster_slots_for)
+
+def _has_matching(slot_masks, player_masks):
+    """
+    True if every player can be given a distinct slot whose mask intersects theirs
+    (tries every assignment, players in order).
+    """
+    def place(i, used):
+        if i == len(player_masks):
+            return True
+        for j, slot in enumerate(slot_masks):
+            if not used >> j & 1 and slot & player_masks[i] and place(i + 1, used | 1 << j):
+                return True
+        return False
+
+    return place(0, 0)
+
+def _random_template(rng):
+    if rng.random() < 0.3:
+        return roster_slots_for(rng.randint(1, 10))
+    return tuple(rng.choice(list(SLOT_POSITIONS)) for _ in range(rng.randint(1, 8)))
+
+@pytest.mark.parametrize("seed", range(20))
+def test_state_matches_exhaustive_matching(seed):
+    rng = random.Random(seed)
+    for _ in range(25):
+        slots = _random_template(rng)
+        roster = RosterSlots(slots)
+        slot_masks = [SLOT_POSITIONS[slot] for slot in slots]
+        state = roster.state()
+        players = []
+        # Mostly single or dual positions, like infer_positions; sometimes any mask incl. 0
+        for _ in range(rng.randint(0, len(slots) + 1)):
+            mask = rng.randrange(N_TYPES) if rng.random() < 0.2 else rng.choice([1, 2, 4, 8, 16, 3, 6, 12, 24])
+            players.append(mask)
+            state.add(mask)
+            assert state.feasible == _has_matching(slot_masks, players)
+            assert roster.is_feasible(players) == state.feasible
+            if state.feasible:
+                allowed = state.allowed_types()
+                for candidate in range(N_TYPES):
+                    expected = _has_matching(slot_masks, players + [candidate])
+                    assert state.fits(candidate) == expected, (slots, players, candidate)
+                    assert bool(allowed[candidate]) == expected
+
+def test_copy_is_independent():
+    roster = RosterSlots(("PG", "C"))
+    state = roster.state([1])
+    clone = state.copy()
+    clone.add(16)
+    assert state.fits(16) and not clone.fits(16)
+
+def test_unknown_slot_rejected():
+    with pytest.raises(ValueError):
+        RosterSlots(("PG", "XX"))
+
+def test_inferred_positions_fill_a_default_roster():
+    rng = np.random.default_rng(0)
+    n = 200
+    df = pd.DataFrame({
+        "min_base": rng.uniform(10, 36, n), "reb": rng.uniform(1, 12, n), "oreb": rng.uniform(0, 4, n),
+        "blk": rng.uniform(0, 2, n), "ast": rng.uniform(0, 9, n), "fg3a": rng.uniform(0, 8, n),
+        "fga_base": rng.uniform(8, 20, n),
+    })
+    masks = infer_positions(df)
+    assert masks.shape == (n,) and (masks > 0).all() and (masks < N_TYPES).all()
+    # Every band gets players, and taking every player that still fits fills the whole roster
+    assert all((masks >> p & 1).any() for p in range(5))
+    state, filled = RosterSlots(DEFAULT_ROSTER_SLOTS).state(), 0
+    for mask in masks.tolist():
+        if state.fits(mask):
+            state.add(mask)
+            filled += 1
+    assert state.feasible and filled == len(DEFAULT_ROSTER_SLOTS)
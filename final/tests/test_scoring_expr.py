@@ -0,0 +1,84 @@
+"""
+The scoring expression compiler: presets against the weight-dict scoring, the allowed
+syntax, rejected syntax and safe division.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_engineering import compute_fantasy_score, DEFAULT_SCORING_RULES
+from scoring_expr import compile_scoring_expression, LEAGUE_PRESETS
+
+@pytest.fixture
+def stats():
+    rng = np.random.default_rng(0)
+    n = 50
+    df = pd.DataFrame({col: rng.gamma(2.0, 2.0, n) for col in
+                       ("pts", "reb", "ast", "stl", "blk", "tov", "fg3m", "fgm_base", "fga_base", "ftm", "fta")})
+    df["dd2"] = rng.integers(0, 30, n).astype(float)
+    df["td3"] = rng.integers(0, 5, n).astype(float)
+    df["gp_base"] = rng.integers(0, 82, n).astype(float)
+    df.loc[:4, "gp_base"] = 0.0
+    return df
+
+def test_default_preset_equals_compute_fantasy_score(stats):
+    expected = compute_fantasy_score(stats.copy(), DEFAULT_SCORING_RULES)["fantasy_score"].to_numpy()
+    np.testing.assert_allclose(compile_scoring_expression(LEAGUE_PRESETS["default"]).evaluate(stats), expected)
+    from_text = compute_fantasy_score(stats.copy(), LEAGUE_PRESETS["default"])["fantasy_score"].to_numpy()
+    np.testing.assert_allclose(from_text, expected)
+
+def test_every_preset_compiles_and_evaluates(stats):
+    for text in LEAGUE_PRESETS.values():
+        scores = compile_scoring_expression(text).evaluate(stats)
+        assert scores.shape == (len(stats),) and np.isfinite(scores).all()
+
+def test_safe_divide_returns_zero_on_zero_denominator(stats):
+    result = compile_scoring_expression("dd2 / gp_base").evaluate(stats)
+    zero = stats["gp_base"].to_numpy() == 0
+    assert zero.any()
+    np.testing.assert_array_equal(result[zero], 0.0)
+    np.testing.assert_allclose(result[~zero], (stats["dd2"] / stats["gp_base"]).to_numpy()[~zero])
+    np.testing.assert_array_equal(compile_scoring_expression("1 / 0 + 0 / 0").evaluate(stats), 0.0)
+
+def test_operators_and_functions(stats):
+    pts, reb, gp = (stats[col].to_numpy() for col in ("pts", "reb", "gp_base"))
+    cases = {
+        "-pts + +reb ** 2": -pts + reb ** 2,
+        "(pts > 5) + (pts <= reb)": (pts > 5).astype(float) + (pts <= reb),
+        "1 < pts < 6": ((1 < pts) & (pts < 6)).astype(float),
+        "pts > 3 and not reb > 3 or gp_base == 0": ((pts > 3) & ~(reb > 3) | (gp == 0)).astype(float),
+        "pts if gp_base >= 20 else 0": np.where(gp >= 20, pts, 0),
+        "where(gp_base != 0, pts, -1)": np.where(gp != 0, pts, -1),
+        "min(pts, reb) + max(pts, 2) + abs(reb - pts) + clip(pts, 1, 4)":
+            np.minimum(pts, reb) + np.maximum(pts, 2) + np.abs(reb - pts) + np.clip(pts, 1, 4),
+        "PTS + 3": pts + 3, # names are case-insensitive
+        "7": np.full(len(pts), 7.0),
+    }
+    for text, expected in cases.items():
+        np.testing.assert_allclose(compile_scoring_expression(text).evaluate(stats), expected, err_msg=text)
+    assert compile_scoring_expression("pts + 2*reb / gp_base").columns == ("gp_base", "pts", "reb")
+
+@pytest.mark.parametrize("text", [
+    "pts.real",                      # attribute access
+    "__import__('os').system('x')",  # call of a non-whitelisted function
+    "open('f')",
+    "pts.__class__",
+    "pts[0]",                        # subscript
+    "(lambda: 1)()",
+    "[pts for pts in reb]",
+    "'pts'",                         # string constant
+    "True + pts",                    # bool constant
+    "pts // 2",                      # operator outside the whitelist
+    "pts % 2",
+    "max(pts)",                      # wrong arity
+    "max(pts, reb, key=abs)",        # keyword arguments
+    "pts +",                         # syntax error
+])
+def test_disallowed_syntax_is_rejected(text):
+    with pytest.raises(ValueError):
+        compile_scoring_expression(text)
+
+def test_names_that_are_not_stats_are_rejected(stats):
+    expression = compile_scoring_expression("pts + os + secret")
+    with pytest.raises(ValueError, match="os, secret"):
+        expression.evaluate(stats)
@@ -0,0 +1,133 @@
+"""
+VorpEngine's incremental replacement levels (Fenwick trees per position) against a full
+re-sort of the available players after random draft / undo sequences.
+"""
+import random
+import numpy as np
+import pandas as pd
+import pytest
+
+from roster_slots import POSITIONS, POSITION_COLUMN, DEFAULT_ROSTER_SLOTS
+from vorp import VorpEngine, TYPE_POSITIONS, slot_demand
+
+def _player_table(rng, n):
+    ids = rng.choice(np.arange(1000, 1000 + 10 * n), size=n, replace=False)
+    # Mostly one or two positions; some ties in score to exercise the stable order
+    masks = rng.choice([1, 2, 4, 8, 16, 3, 6, 12, 24, 31, 5], size=n)
+    table = pd.DataFrame({"pred_score": np.round(rng.normal(30, 10, n), 1), POSITION_COLUMN: masks},
+                         index=pd.Index(ids, name="player_id"))
+    components = pd.DataFrame(rng.normal(0, 1, (n, 3)), index=table.index, columns=["pts", "reb", "ast"])
+    return table, components
+
+def _brute_replacement(engine, drafted_ids):
+    """
+    Replacement score and components per position, recomputed from scratch.
+    """
+    demand = engine.demand.copy()
+    drafted = np.zeros(len(engine.score), dtype=bool)
+    for player_id in drafted_ids:
+        row = engine.index.get_loc(player_id)
+        drafted[row] = True
+        positions = TYPE_POSITIONS[int(engine.masks[row])]
+        demand[positions] -= 1 / len(positions)
+    order = np.argsort(-engine.score, kind="stable")
+    replacement = np.full(len(POSITIONS), np.inf)
+    components = np.zeros((len(POSITIONS), engine.components.shape[1]))
+    for p in range(len(POSITIONS)):
+        available = [row for row in order if engine.masks[row] >> p & 1 and not drafted[row]]
+        if not available:
+            continue
+        start = min(int(max(round(demand[p], 9), 0.0)), len(available) - 1)
+        rows = available[start:start + engine.window]
+        replacement[p] = engine.score[rows].mean()
+        components[p] = engine.components[rows].mean(axis=0)
+    return replacement, components, drafted
+
+def _check(engine, drafted_ids):
+    replacement, components, drafted = _brute_replacement(engine, drafted_ids)
+    np.testing.assert_allclose(engine.replacement, replacement)
+    if len(engine.component_names) > 1:
+        frame = engine.replacement_frame()[engine.component_names]
+        np.testing.assert_allclose(frame.to_numpy(), components, atol=1e-12)
+    np.testing.assert_array_equal(engine.drafted, drafted)
+    best = np.array([min(replacement[TYPE_POSITIONS[m]]) for m in engine.masks])
+    np.testing.assert_allclose(engine.values(), engine.score - best)
+
+@pytest.mark.parametrize("seed", range(12))
+def test_replacement_matches_full_resort(seed):
+    rng = np.random.default_rng(seed)
+    picker = random.Random(seed)
+    n = int(rng.integers(8, 80))
+    table, components = _player_table(rng, n)
+    num_teams = picker.choice([2, 4, 8, 12])
+    engine = VorpEngine(table, num_teams, components=components, window=picker.choice([1, 3, 5]))
+    np.testing.assert_allclose(engine.demand, slot_demand(DEFAULT_ROSTER_SLOTS, num_teams))
+    drafted = []
+    _check(engine, drafted)
+    for _ in range(3 * n):
+        if drafted and picker.random() < 0.35:
+            player_id = drafted.pop(picker.randrange(len(drafted)))
+            engine.restore(player_id)
+        else:
+            available = [pid for pid in table.index.tolist() if pid not in drafted]
+            if not available:
+                continue
+            player_id = picker.choice(available)
+            engine.draft(player_id)
+            drafted.append(player_id)
+        _check(engine, drafted)
+
+def test_new_draft_shares_players_not_state():
+    rng = np.random.default_rng(0)
+    table, _ = _player_table(rng, 30)
+    engine = VorpEngine(table, 4)
+    engine.draft_many(table.index[:5].tolist())
+    fresh = engine.new_draft()
+    _check(fresh, [])
+    _check(engine, table.index[:5].tolist())
+
+def test_draft_twice_and_unknown_id_raise():
+    rng = np.random.default_rng(1)
+    table, _ = _player_table(rng, 10)
+    engine = VorpEngine(table, 2)
+    engine.draft(table.index[0])
+    with pytest.raises(ValueError):
+        engine.draft(table.index[0])
+    with pytest.raises(KeyError):
+        engine.draft(-1)
+    assert engine.values().shape == (10,)
+
+@pytest.mark.parametrize("seed", range(6))
+def test_sync_follows_appends_undos_and_branches(seed):
+    rng = np.random.default_rng(seed)
+    picker = random.Random(seed)
+    table, components = _player_table(rng, 60)
+    engine = VorpEngine(table, 4, components=components)
+    ids = table.index.tolist()
+    picks = []
+    for _ in range(80):
+        roll = picker.random()
+        if roll < 0.5 and len(picks) < len(ids):
+            picks = picks + [picker.choice([pid for pid in ids if pid not in picks])]
+        elif roll < 0.8:
+            picks = picks[:picker.randrange(len(picks) + 1)] # undo back to an earlier pick
+        else:
+            # A different pick history sharing a prefix (e.g. undo, then pick someone else)
+            keep = picks[:picker.randrange(len(picks) + 1)]
+            rest = [pid for pid in ids if pid not in keep]
+            picks = keep + picker.sample(rest, min(len(rest), picker.randrange(4)))
+        engine.sync(picks)
+        assert engine.history == picks
+        _check(engine, picks)
+
+def test_copy_is_an_independent_snapshot():
+    rng = np.random.default_rng(2)
+    table, _ = _player_table(rng, 40)
+    ids = table.index.tolist()
+    engine = VorpEngine(table, 4).draft_many(ids[:6])
+    snapshot = engine.copy()
+    engine.sync(ids[:3] + ids[10:14])
+    _check(snapshot, ids[:6])
+    _check(snapshot.copy().sync(ids[:7]), ids[:7])
+    _check(snapshot, ids[:6])
+    _check(engine, ids[:3] + ids[10:14])
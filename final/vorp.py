@@ -0,0 +1,334 @@
+"""
+Incremental value over replacement player (VORP) for N-team leagues.
+
+A player's raw score says little on its own: what matters is how much better they are than
+the player a team could still get at the same position once every other roster spot in the
+league is filled. The replacement level of a position is therefore set by league demand:
+
+- every roster slot (times the number of teams) needs one player; a slot accepting several
+  positions (G, F, UTIL, BENCH) spreads its demand evenly over them, since every rostered
+  player counts in the matchup (see simulate_match);
+- a drafted player fills demand at the positions they are eligible for, split the same way;
+- the replacement level of position p is the mean score of the `window` best available
+  players at p ranked just past the remaining demand.
+
+A player's VORP is their score minus the lowest replacement level among their positions
+(a multi-position player is valued where the replacement is weakest). Scores can be the sum
+of several components (e.g. category z-scores), and replacement levels are tracked per
+component too, so the UI can show VORP per category.
+
+Each position keeps its eligible players in score order with a Fenwick tree over their
+availability, so finding the k-th best available player is O(log n). A pick only changes the
+positions the player is eligible for: their trees, remaining demand and replacement levels
+are updated, then the best replacement of the eligibility types that contain one of those
+positions (at most 31). Per-player values are a single gather over that type table, so a
+pick costs the same however large the pool is.
+
+An engine remembers the picks it has applied, so sync(picks) brings it to a new pick list by
+undoing only the picks past the common prefix and drafting only the new ones: a session keeps
+one engine across reruns (one draft per new pick, one restore per undone pick) instead of
+replaying the whole draft, and copy() hands a frozen snapshot to background threads.
+"""
+import copy
+import numpy as np
+import pandas as pd
+from roster_slots import (POSITIONS, SLOT_POSITIONS, N_TYPES, DEFAULT_ROSTER_SLOTS, POSITION_COLUMN,
+                          RosterSlots, infer_positions)
+
+REPLACEMENT_WINDOW = 3 # replacement level = mean of this many players past the demand line
+VORP_COLUMN = "vorp" # score column registered on a DraftPool
+
+# TYPE_POSITIONS[e]: position indices of eligibility mask e
+TYPE_POSITIONS = [[p for p in range(len(POSITIONS)) if e >> p & 1] for e in range(N_TYPES)]
+
+class _RankTree:
+    """
+    Fenwick tree over the availability flags of one position's players (in score order):
+    remove / add back and "k-th best available" in O(log n).
+    """
+
+    __slots__ = ("tree", "count", "top")
+
+    def __init__(self, size):
+        tree = [0] * (size + 1)
+        for i in range(1, size + 1):
+            tree[i] += 1
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self.tree = tree
+        self.count = size
+        self.top = 1 << size.bit_length() if size else 0
+
+    def copy(self):
+        tree = _RankTree.__new__(_RankTree)
+        tree.tree, tree.count, tree.top = list(self.tree), self.count, self.top
+        return tree
+
+    def add(self, i, delta):
+        tree = self.tree
+        i += 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+        self.count += delta
+
+    def kth(self, k):
+        """
+        Position (0-based, in score order) of the k-th (0-based) available player.
+        """
+        tree, pos, bit = self.tree, 0, self.top
+        while bit:
+            nxt = pos + bit
+            if nxt < len(tree) and tree[nxt] <= k:
+                pos = nxt
+                k -= tree[nxt]
+            bit >>= 1
+        return pos
+
+def slot_demand(roster_slots, num_teams):
+    """
+    Players needed per position (array over POSITIONS) to fill `roster_slots` for every team.
+    """
+    slots = roster_slots.slots if isinstance(roster_slots, RosterSlots) else roster_slots
+    demand = np.zeros(len(POSITIONS), dtype=np.float64)
+    for slot in slots:
+        if slot not in SLOT_POSITIONS:
+            raise ValueError(f"Unknown slot '{slot}'. Choose from: {', '.join(SLOT_POSITIONS)}")
+        positions = TYPE_POSITIONS[SLOT_POSITIONS[slot]]
+        demand[positions] += num_teams / len(positions)
+    return demand
+
+class VorpEngine:
+    """
+    Replacement levels and VORP of a player table, updated pick by pick.
+
+    Attributes:
+        index (pd.Index): Player ids, in row order of the arrays.
+        components (np.ndarray): (n_players x n_components) values that sum to a player's score.
+        component_names (list[str]): Names of the components.
+        score (np.ndarray): Row sums of `components`.
+        masks (np.ndarray): Eligibility masks (see roster_slots).
+        demand (np.ndarray): Players needed per position for the whole league.
+        drafted (np.ndarray): Drafted mask, in row order.
+        replacement (np.ndarray): Current replacement score per position (inf when no
+            eligible player is left).
+    """
+
+    def __init__(self, df, num_teams, roster_slots=DEFAULT_ROSTER_SLOTS, components=None,
+                 score_column="pred_score", position_column=POSITION_COLUMN, window=REPLACEMENT_WINDOW):
+        """
+        Args:
+            df: Player table indexed by player_id.
+            num_teams: Teams in the league.
+            roster_slots: Slot names per team, or a RosterSlots.
+            components: DataFrame indexed by player_id whose columns sum to the score being
+                valued (e.g. category z-scores); defaults to df[[score_column]].
+            position_column: Eligibility mask column; inferred from stats when missing.
+            window: Players averaged into a replacement level.
+        """
+        if components is None:
+            components = df[[score_column]]
+        components = components.reindex(df.index)
+        self.index = df.index
+        self.component_names = [str(col) for col in components.columns]
+        self.components = components.to_numpy(dtype=np.float64, na_value=0.0)
+        self.score = self.components.sum(axis=1)
+        if position_column in df.columns:
+            self.masks = df[position_column].to_numpy(dtype=np.int64)
+        else:
+            self.masks = infer_positions(df).astype(np.int64)
+        self.num_teams = num_teams
+        self.demand = slot_demand(roster_slots, num_teams)
+        self.window = window
+        self._row_of = {player_id: row for row, player_id in enumerate(self.index.tolist())}
+        self._pool_rows = (None, None) # (pool id array, its rows here), see register
+
+        # Per position: eligible rows best first, and each row's place in that order
+        order = np.argsort(-self.score, kind="stable")
+        self._orders = []
+        self._ranks = np.full((len(POSITIONS), len(self.score)), -1, dtype=np.int64)
+        for p in range(len(POSITIONS)):
+            rows = order[(self.masks[order] >> p) & 1 == 1]
+            self._orders.append(rows)
+            self._ranks[p, rows] = np.arange(len(rows))
+        self._reset()
+
+    def _reset(self):
+        self.history = [] # applied picks, in order
+        self.drafted = np.zeros(len(self.score), dtype=bool)
+        self._filled = np.zeros(len(POSITIONS), dtype=np.float64)
+        self._trees = [_RankTree(len(rows)) for rows in self._orders]
+        self.replacement = np.zeros(len(POSITIONS), dtype=np.float64)
+        self._replacement_components = np.zeros((len(POSITIONS), self.components.shape[1]), dtype=np.float64)
+        self._type_replacement = np.full(N_TYPES, np.inf, dtype=np.float64) # type 0 fits no slot
+        self._type_position = np.zeros(N_TYPES, dtype=np.int64)
+        for p in range(len(POSITIONS)):
+            self._refresh_position(p)
+        self._refresh_types((1 << len(POSITIONS)) - 1)
+
+    def new_draft(self):
+        """
+        An undrafted engine sharing this one's player arrays (only the draft state is new).
+        """
+        engine = copy.copy(self)
+        engine._reset()
+        return engine
+
+    def copy(self):
+        """
+        An engine with an independent copy of this one's draft state (player arrays shared).
+        """
+        engine = copy.copy(self)
+        engine.history = list(self.history)
+        engine.drafted = self.drafted.copy()
+        engine._filled = self._filled.copy()
+        engine._trees = [tree.copy() for tree in self._trees]
+        engine.replacement = self.replacement.copy()
+        engine._replacement_components = self._replacement_components.copy()
+        engine._type_replacement = self._type_replacement.copy()
+        engine._type_position = self._type_position.copy()
+        return engine
+
+    def remaining_demand(self):
+        """
+        Players still needed per position.
+        """
+        return np.maximum(self.demand - self._filled, 0.0)
+
+    def _refresh_position(self, p):
+        tree = self._trees[p]
+        if tree.count == 0:
+            self.replacement[p] = np.inf
+            self._replacement_components[p] = 0.0
+            return
+        # Demand is a sum of fractions (e.g. 12 + 6 + 4.8 + 7.2 = 29.999...); round off the float
+        # error before flooring so the line does not move up a player
+        start = min(int(round(max(self.demand[p] - self._filled[p], 0.0), 9)), tree.count - 1)
+        stop = min(start + self.window, tree.count)
+        rows = self._orders[p][[tree.kth(k) for k in range(start, stop)]]
+        self.replacement[p] = self.score[rows].mean()
+        self._replacement_components[p] = self.components[rows].mean(axis=0)
+
+    def _refresh_types(self, changed):
+        """
+        Best (lowest) replacement of every eligibility type containing a position in `changed`.
+        """
+        for e in range(1, N_TYPES):
+            if e & changed:
+                positions = TYPE_POSITIONS[e]
+                best = min(positions, key=self.replacement.__getitem__)
+                self._type_position[e] = best
+                self._type_replacement[e] = self.replacement[best]
+
+    def _apply(self, player_id, sign):
+        row = self._row_of[player_id]
+        mask = int(self.masks[row])
+        positions = TYPE_POSITIONS[mask]
+        for p in positions:
+            self._trees[p].add(int(self._ranks[p, row]), sign)
+            self._filled[p] -= sign / len(positions)
+            self._refresh_position(p)
+        self._refresh_types(mask)
+        self.drafted[row] = sign < 0
+
+    def draft(self, player_id):
+        """
+        Marks a player as drafted; updates only the positions they are eligible for.
+
+        Raises:
+            KeyError: If the id is not in the player table.
+            ValueError: If the player was already drafted.
+        """
+        if self.drafted[self._row_of[player_id]]:
+            raise ValueError(f"Player {player_id} has already been drafted.")
+        self._apply(player_id, -1)
+        self.history.append(player_id)
+
+    def draft_many(self, player_ids):
+        for player_id in player_ids:
+            self.draft(player_id)
+        return self
+
+    def restore(self, player_id):
+        """
+        Puts a drafted player back (used to undo a pick).
+        """
+        if self.drafted[self._row_of[player_id]]:
+            self._apply(player_id, 1)
+            if self.history[-1] == player_id:
+                self.history.pop()
+            else:
+                self.history.remove(player_id)
+
+    def sync(self, picks):
+        """
+        Brings the drafted set to `picks` (in pick order, e.g. DraftLog.picks()): picks past
+        the common prefix with the applied history are restored, newer ones drafted. Costs
+        one update per changed pick, not a replay of the draft.
+        """
+        picks, history = list(picks), self.history
+        common = len(history)
+        if picks[:common] != history: # not just new picks appended
+            common, limit = 0, min(len(history), len(picks))
+            while common < limit and history[common] == picks[common]:
+                common += 1
+        for player_id in history[common:][::-1]:
+            self.restore(player_id)
+        for player_id in picks[common:]:
+            self.draft(player_id)
+        return self
+
+    def values(self):
+        """
+        VORP of every player (row order), against the current replacement levels.
+        """
+        return self.score - self._type_replacement[self.masks]
+
+    def best_positions(self):
+        """
+        Index into POSITIONS of the position each player is valued at.
+        """
+        return self._type_position[self.masks]
+
+    def frame(self):
+        """
+        vorp, vorp_pos and (with several components) vorp_<component> columns, indexed by player_id.
+        """
+        best = self.best_positions()
+        frame = pd.DataFrame({"vorp": self.values(), "vorp_pos": np.asarray(POSITIONS)[best]}, index=self.index)
+        if len(self.component_names) > 1:
+            per_component = self.components - self._replacement_components[best]
+            for j, name in enumerate(self.component_names):
+                frame[f"vorp_{name}"] = per_component[:, j]
+        return frame
+
+    def replacement_frame(self):
+        """
+        Demand, remaining demand and replacement levels (total and per component) per position.
+        """
+        frame = pd.DataFrame({"demand": self.demand, "remaining": self.remaining_demand(),
+                              "replacement": self.replacement}, index=list(POSITIONS))
+        if len(self.component_names) > 1:
+            for j, name in enumerate(self.component_names):
+                frame[name] = self._replacement_components[:, j]
+        return frame
+
+    def register(self, pool, col=VORP_COLUMN):
+        """
+        Adds current VORP as a score column of a DraftPool (matched by player id), so the
+        AI pickers can rank by it, e.g. ai_pick_medium(pool, None, score_column='vorp').
+        """
+        ids, rows = self._pool_rows
+        if ids is not pool.ids:
+            # Pools from new_draft() share their id array, so the lookup is done once per template
+            rows = self.index.get_indexer(pool.ids)
+            self._pool_rows = (pool.ids, rows)
+        values = self.values()
+        scores = np.full(len(rows), -np.inf)
+        scores[rows >= 0] = values[rows[rows >= 0]]
+        pool.set_scores(col, scores)
+        return pool
+
+    def __repr__(self):
+        return f"VorpEngine({self.num_teams} teams, {int(self.drafted.sum())} drafted)"